@@ -0,0 +1,125 @@
+"""Authentication classes for tap-powerbi-metadata."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from singer_sdk.authenticators import OAuthAuthenticator
+
+# Refresh tokens this many seconds before they expire, so in-flight requests never carry a stale token.
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+DEFAULT_TOKEN_LIFETIME_SECONDS = 3600
+# Authenticators for different tenants share one token cache file.
+_TOKEN_CACHE_LOCK = threading.Lock()
+
+
+class OAuthActiveDirectoryAuthenticator(OAuthAuthenticator):
+    """Password-grant authenticator for Azure Active Directory.
+
+    A single instance per tenant is shared by every stream in the tap. `credentials` holds the
+    tenant's `tenant_id`, `client_id`, `username` and `password`, and defaults to the tap config.
+    Tokens are refreshed proactively before expiry, refreshes are serialized across worker threads,
+    and when `token_cache_path` is configured the token is persisted on disk so back-to-back runs can
+    skip the password grant.
+    """
+    # https://pivotalbi.com/automate-your-power-bi-dataset-refresh-with-python
+
+    def __init__(self, *args, credentials: Optional[dict] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.credentials = credentials or self.config
+        self._lock = threading.RLock()
+        self._token_expires_at = 0.0
+
+    @property
+    def oauth_request_body(self) -> dict:
+        return {
+            'grant_type': 'password',
+            'scope': 'https://api.powerbi.com',
+            'resource': 'https://analysis.windows.net/powerbi/api',
+            'client_id': self.credentials["client_id"],
+            'username': self.credentials["username"],
+            'password': self.credentials["password"],
+        }
+
+    @property
+    def auth_headers(self) -> dict:
+        with self._lock:
+            if not self.is_token_valid():
+                self.update_access_token()
+            return {"Authorization": f"Bearer {self.access_token}"}
+
+    def is_token_valid(self) -> bool:
+        return bool(self.access_token) and time.time() < self._token_expires_at - TOKEN_REFRESH_MARGIN_SECONDS
+
+    def update_access_token(self) -> None:
+        with self._lock:
+            if self._load_cached_token():
+                self.logger.info("Reusing cached OAuth token.")
+                return
+            request_time = time.time()
+            super().update_access_token()
+            self._token_expires_at = request_time + float(self.expires_in or DEFAULT_TOKEN_LIFETIME_SECONDS)
+            self._store_cached_token()
+
+    @property
+    def token_cache_path(self) -> Optional[Path]:
+        cache_path = self.config.get("token_cache_path")
+        return Path(cache_path).expanduser() if cache_path else None
+
+    @property
+    def token_cache_key(self) -> str:
+        """Return a cache key identifying the tenant, client and user without storing them in clear text."""
+        credentials = self.credentials
+        identity = "|".join([credentials["tenant_id"], credentials["client_id"], credentials["username"]])
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def _read_token_cache(self) -> dict:
+        """Return the cached tokens, ignoring a missing or corrupt cache file and malformed entries."""
+        try:
+            token_cache = json.loads(self.token_cache_path.read_text())
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(token_cache, dict):
+            return {}
+        return {
+            key: value
+            for key, value in token_cache.items()
+            if isinstance(value, dict) and "access_token" in value and isinstance(value.get("expires_at"), (int, float))
+        }
+
+    def _load_cached_token(self) -> bool:
+        if not self.token_cache_path:
+            return False
+        cached = self._read_token_cache().get(self.token_cache_key)
+        if not cached or time.time() >= cached["expires_at"] - TOKEN_REFRESH_MARGIN_SECONDS:
+            return False
+        self.access_token = cached["access_token"]
+        self._token_expires_at = cached["expires_at"]
+        return True
+
+    def _store_cached_token(self) -> None:
+        if not self.token_cache_path:
+            return
+        with _TOKEN_CACHE_LOCK:
+            self._write_token_cache()
+
+    def _write_token_cache(self) -> None:
+        token_cache = {
+            key: value for key, value in self._read_token_cache().items() if value["expires_at"] > time.time()
+        }
+        token_cache[self.token_cache_key] = {
+            "access_token": self.access_token,
+            "expires_at": self._token_expires_at,
+        }
+        self.token_cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # A per-process name, so that taps sharing the cache never write to the same temporary file.
+        tmp_path = self.token_cache_path.with_name(self.token_cache_path.name + f".{os.getpid()}.tmp")
+        # The cache holds bearer tokens, so keep it readable by the current user only.
+        fd = os.open(str(tmp_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(token_cache, f)
+        os.replace(str(tmp_path), str(self.token_cache_path))
@@ -0,0 +1,264 @@
+"""Sharded backfill of activity event history across several tap processes.
+
+A backfill is planned into a shard ledger: a JSON file listing every (partition, time range) shard
+of the range to load. Any number of tap processes, on one machine or on several sharing the file,
+then run with `backfill_ledger_path` set; each claims pending shards from the ledger until none are
+left. Once every shard is done, the ledger is merged into a normal incremental state:
+
+    tap-powerbi-metadata-backfill plan --config config.json --ledger shards.json --start-date 2021-03-01
+    tap-powerbi-metadata --config config.json --catalog catalog.json  # with backfill_ledger_path, on each node
+    tap-powerbi-metadata-backfill merge --config config.json --ledger shards.json > state.json
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows.
+    fcntl = None
+
+SHARD_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+SHARD_PENDING = "pending"
+SHARD_CLAIMED = "claimed"
+SHARD_DONE = "done"
+
+
+def plan_shards(
+    start: datetime, end: datetime, partitions: Optional[List[Optional[dict]]] = None, shard_hours: float = 24
+) -> List[dict]:
+    """Return the shards covering [start, end) for each partition, in time order.
+
+    Shards never cross a UTC day boundary, since each activity events request covers a single day.
+    """
+    if not 0 < shard_hours <= 24:
+        raise ValueError(f"shard_hours must be between 0 and 24, got {shard_hours}.")
+    step = timedelta(seconds=math.ceil(shard_hours * 3600))
+    ranges = []
+    shard_start = start
+    while shard_start < end:
+        day_end = shard_start.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        shard_end = min(shard_start + step, day_end, end)
+        ranges.append((shard_start, shard_end))
+        shard_start = shard_end
+    shards = []
+    for shard_start, shard_end in ranges:
+        for partition in partitions or [None]:
+            shards.append(
+                {
+                    "id": len(shards),
+                    "partition": partition,
+                    "start": shard_start.strftime(SHARD_DATE_FORMAT),
+                    "end": shard_end.strftime(SHARD_DATE_FORMAT),
+                    "status": SHARD_PENDING,
+                }
+            )
+    return shards
+
+
+def parse_shard_date(value: str) -> datetime:
+    return datetime.strptime(value, SHARD_DATE_FORMAT)
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardLedger:
+    """A shard manifest which several processes update under an exclusive lock.
+
+    The lock is an `flock` on a sibling `.lock` file, so it works across processes and, on a shared
+    filesystem which supports `flock` (e.g. NFSv4), across nodes. The kernel drops the lock when its
+    holder exits, so a crashed process never leaves the ledger locked. A claimed shard is leased to its
+    worker for `lease_seconds`, renewed while the worker makes progress; if the worker dies, the shard
+    is claimed again by another worker once the lease has expired.
+    """
+
+    def __init__(self, path: Path, lease_seconds: float = 3600) -> None:
+        if not fcntl:
+            raise RuntimeError("The shard ledger requires `fcntl.flock`, which is not available on this platform.")
+        self.path = Path(path).expanduser()
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.lease_seconds = lease_seconds
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        # Each call opens its own file description, so threads of one process also exclude each other.
+        with open(str(self.lock_path), "a") as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def read(self) -> dict:
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def _write(self, ledger: dict) -> None:
+        tmp_path = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(ledger, indent=2), encoding="utf-8")
+        os.replace(str(tmp_path), str(self.path))
+
+    def _update(self, update: Callable[[dict], Optional[dict]]) -> Optional[dict]:
+        """Apply `update` to the ledger under the lock, saving it, and return what `update` returned."""
+        with self._locked():
+            ledger = self.read()
+            result = update(ledger)
+            self._write(ledger)
+            return result
+
+    def create(self, stream_name: str, shards: List[dict]) -> None:
+        """Write a new ledger, refusing to overwrite one which is in progress."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            if self.path.exists():
+                raise RuntimeError(f"Shard ledger {self.path} already exists.")
+            self._write({"stream": stream_name, "shards": shards})
+
+    def claim(self, worker_id: str, partition: Optional[dict] = None) -> Optional[dict]:
+        """Claim the earliest pending (or abandoned) shard of a partition, or return None if none are left."""
+
+        def claim_shard(ledger: dict) -> Optional[dict]:
+            now = time.time()
+            for shard in ledger["shards"]:
+                if shard["partition"] != partition or shard["status"] == SHARD_DONE:
+                    continue
+                if shard["status"] == SHARD_CLAIMED and shard["leaseExpires"] > now:
+                    continue
+                shard.update(status=SHARD_CLAIMED, worker=worker_id, leaseExpires=now + self.lease_seconds)
+                return dict(shard)
+            return None
+
+        return self._update(claim_shard)
+
+    def renew(self, shard_id: int, worker_id: str) -> bool:
+        """Extend this worker's lease on a shard, returning False if the shard is no longer leased to it."""
+
+        def renew_shard(ledger: dict) -> bool:
+            shard = ledger["shards"][shard_id]
+            if shard["status"] != SHARD_CLAIMED or shard.get("worker") != worker_id:
+                return False
+            shard["leaseExpires"] = time.time() + self.lease_seconds
+            return True
+
+        return self._update(renew_shard)
+
+    def complete(self, shard_id: int, worker_id: str, events: int) -> None:
+        """Mark a shard done, recording its event count for the merged volume estimate."""
+
+        def complete_shard(ledger: dict) -> None:
+            shard = ledger["shards"][shard_id]
+            if shard["status"] == SHARD_DONE:
+                return
+            shard.update(status=SHARD_DONE, worker=worker_id, events=events)
+            shard.pop("leaseExpires", None)
+
+        self._update(complete_shard)
+
+    def release(self, shard_id: int, worker_id: str) -> None:
+        """Return a shard this worker failed to finish to the pending pool."""
+
+        def release_shard(ledger: dict) -> None:
+            shard = ledger["shards"][shard_id]
+            if shard["status"] == SHARD_CLAIMED and shard.get("worker") == worker_id:
+                shard["status"] = SHARD_PENDING
+                shard.pop("leaseExpires", None)
+
+        self._update(release_shard)
+
+    def summary(self) -> Dict[str, int]:
+        """Return the number of shards in each status."""
+        counts = {SHARD_PENDING: 0, SHARD_CLAIMED: 0, SHARD_DONE: 0}
+        for shard in self.read()["shards"]:
+            counts[shard["status"]] += 1
+        return counts
+
+
+def merge_ledger_state(ledger: dict, get_partition_state: Callable[[Optional[dict]], dict], replication_key: str) -> None:
+    """Fold a fully completed ledger into each partition's incremental state.
+
+    Each partition's bookmark moves to the end of its last shard, unless the state is already further
+    ahead, and its volume estimate becomes the average over its shards.
+    """
+    pending = [shard["id"] for shard in ledger["shards"] if shard["status"] != SHARD_DONE]
+    if pending:
+        raise RuntimeError(f"Cannot merge a backfill with {len(pending)} unfinished shards (first: {pending[0]}).")
+    by_partition: Dict[str, List[dict]] = {}
+    for shard in ledger["shards"]:
+        by_partition.setdefault(json.dumps(shard["partition"], sort_keys=True), []).append(shard)
+    for shards in by_partition.values():
+        state = get_partition_state(shards[0]["partition"])
+        bookmark = max(parse_shard_date(shard["end"]) for shard in shards)
+        current = state.get("replication_key_value")
+        if not current or current[:19] < bookmark.strftime(SHARD_DATE_FORMAT):
+            state["replication_key"] = replication_key
+            state["replication_key_value"] = bookmark.strftime(SHARD_DATE_FORMAT) + "Z"
+        hours = sum((parse_shard_date(s["end"]) - parse_shard_date(s["start"])).total_seconds() for s in shards) / 3600
+        if hours:
+            state["eventsPerHour"] = round(sum(shard["events"] for shard in shards) / hours, 2)
+        state.pop("checkpoint", None)
+
+
+def _load_tap(config_path: str, state_path: Optional[str] = None):
+    from tap_powerbi_metadata.tap import TapPowerBIMetadata
+
+    state = json.loads(Path(state_path).read_text()) if state_path else None
+    return TapPowerBIMetadata(config=json.loads(Path(config_path).read_text()), state=state)
+
+
+def _parse_date(value: str) -> datetime:
+    """Parse a command-line UTC date, given as a day or to the second."""
+    if len(value) == 10:
+        return datetime.strptime(value, "%Y-%m-%d")
+    return parse_shard_date(value[:19])
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Plan, monitor and merge a sharded ActivityEvents backfill.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    plan = commands.add_parser("plan", help="Split a date range into shards and write the shard ledger.")
+    plan.add_argument("--config", required=True)
+    plan.add_argument("--ledger", required=True)
+    plan.add_argument("--start-date", required=True, help="UTC start of the backfill, e.g. 2021-03-01.")
+    plan.add_argument("--end-date", help="UTC end of the backfill (exclusive). Defaults to now.")
+    plan.add_argument("--shard-hours", type=float, default=24, help="Length of each shard, at most a day.")
+
+    status = commands.add_parser("status", help="Show how many shards are pending, claimed and done.")
+    status.add_argument("--ledger", required=True)
+
+    merge = commands.add_parser("merge", help="Print the incremental state of a completed backfill.")
+    merge.add_argument("--config", required=True)
+    merge.add_argument("--ledger", required=True)
+    merge.add_argument("--state", help="Existing state to merge the backfill into.")
+
+    args = parser.parse_args(argv)
+    ledger = ShardLedger(Path(args.ledger))
+    if args.command == "status":
+        print(json.dumps(ledger.summary()))
+        return
+    tap = _load_tap(args.config, getattr(args, "state", None))
+    stream = tap.streams["ActivityEvents"]
+    if args.command == "plan":
+        start = _parse_date(args.start_date)
+        end = _parse_date(args.end_date) if args.end_date else datetime.utcnow().replace(second=0, microsecond=0)
+        shards = plan_shards(start, end, stream.partitions, args.shard_hours)
+        ledger.create(stream.name, shards)
+        print(f"Planned {len(shards)} shards from {start} to {end} in {ledger.path}.", file=sys.stderr)
+        return
+    merge_ledger_state(ledger.read(), stream.get_stream_or_partition_state, stream.replication_key)
+    print(json.dumps(tap.state, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Batch file output, as an alternative to one Singer RECORD message per record."""
+
+import gzip
+import json
+import sys
+import uuid
+from collections import deque
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Deque, List, Optional, Tuple
+
+# pyarrow is slow to import and only needed for Parquet output, so it is imported on first use.
+pyarrow = None
+
+BATCH_FORMAT_JSONL = "jsonl"
+BATCH_FORMAT_PARQUET = "parquet"
+BATCH_FORMATS = (BATCH_FORMAT_JSONL, BATCH_FORMAT_PARQUET)
+# Parquet rows are buffered and written as a row group once this many have been collected.
+PARQUET_ROW_GROUP_SIZE = 10000
+
+
+def write_message(message: dict, flush: bool = True) -> None:
+    """Write a Singer message to stdout."""
+    sys.stdout.write(json.dumps(message) + "\n")
+    if flush:
+        sys.stdout.flush()
+
+
+def _import_pyarrow() -> None:
+    global pyarrow
+    if pyarrow is None:
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet batch output requires the `pyarrow` package to be installed.")
+
+
+def jsonschema_to_arrow(schema: dict):
+    """Return the pyarrow type for a JSON Schema. Date-times are kept as ISO 8601 strings."""
+    _import_pyarrow()
+    types = schema.get("type", ["string"])
+    types = [types] if isinstance(types, str) else types
+    if "object" in types:
+        return pyarrow.struct(
+            [pyarrow.field(name, jsonschema_to_arrow(child)) for name, child in schema.get("properties", {}).items()]
+        )
+    if "array" in types:
+        return pyarrow.list_(jsonschema_to_arrow(schema.get("items", {})))
+    if "integer" in types:
+        return pyarrow.int64()
+    if "number" in types:
+        return pyarrow.float64()
+    if "boolean" in types:
+        return pyarrow.bool_()
+    return pyarrow.string()
+
+
+class BatchWriter:
+    """Writes a stream's records to rolling, size-bounded batch files.
+
+    A new file is started whenever the batch key (e.g. the record's UTC day) changes or the current
+    file reaches `max_bytes`, and each completed file is announced in a BATCH message. `flush`
+    completes and announces the current file, and must run at the end of the stream.
+
+    STATE messages go through `write_state`, which holds each one back until every record written
+    before it is in an announced file, so state never advances past records a loader has not been
+    told about.
+    """
+
+    def __init__(
+        self,
+        stream_name: str,
+        schema: dict,
+        output_dir: Path,
+        batch_format: str = BATCH_FORMAT_JSONL,
+        max_bytes: int = 100 * 1024 * 1024,
+        emit: Callable[[dict], None] = write_message,
+    ) -> None:
+        if batch_format not in BATCH_FORMATS:
+            raise ValueError(f"Unknown batch format '{batch_format}'. Expected one of: {', '.join(BATCH_FORMATS)}.")
+        if batch_format == BATCH_FORMAT_PARQUET:
+            _import_pyarrow()
+        self.stream_name = stream_name
+        self.schema = schema
+        self.output_dir = Path(output_dir).expanduser() / stream_name
+        self.batch_format = batch_format
+        self.max_bytes = max_bytes
+        self.emit = emit
+        self._batch_key: Optional[str] = None
+        self._path: Optional[Path] = None
+        self._file = None
+        self._rows: List[dict] = []
+        self._bytes = 0
+        self._records_written = 0
+        self._records_announced = 0
+        # STATE values not yet emitted, each with the number of records written before it.
+        self._pending_states: Deque[Tuple[int, dict]] = deque()
+
+    @property
+    def encoding(self) -> dict:
+        if self.batch_format == BATCH_FORMAT_PARQUET:
+            return {"format": BATCH_FORMAT_PARQUET, "compression": "snappy"}
+        return {"format": BATCH_FORMAT_JSONL, "compression": "gzip"}
+
+    def _open(self, batch_key: str) -> None:
+        extension = "parquet" if self.batch_format == BATCH_FORMAT_PARQUET else "jsonl.gz"
+        self._path = self.output_dir / batch_key / f"{self.stream_name}-{batch_key}-{uuid.uuid4().hex}.{extension}"
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        if self.batch_format == BATCH_FORMAT_PARQUET:
+            arrow_schema = pyarrow.schema(list(jsonschema_to_arrow(self.schema)))
+            self._file = pyarrow.parquet.ParquetWriter(str(self._path), arrow_schema)
+        else:
+            self._file = gzip.open(str(self._path), "wt", encoding="utf-8")
+        self._batch_key = batch_key
+        self._bytes = 0
+
+    def _write_row_group(self) -> None:
+        if not self._rows:
+            return
+        arrow_schema = self._file.schema
+        columns = {name: [row.get(name) for row in self._rows] for name in arrow_schema.names}
+        self._file.write_table(pyarrow.Table.from_pydict(columns, schema=arrow_schema))
+        self._rows = []
+
+    def _close(self) -> None:
+        """Complete the current file, and announce it in a BATCH message."""
+        if self._path is None:
+            return
+        if self.batch_format == BATCH_FORMAT_PARQUET:
+            self._write_row_group()
+        self._file.close()
+        self._file = None
+        self.emit({
+            "type": "BATCH",
+            "stream": self.stream_name,
+            "encoding": self.encoding,
+            "manifest": [self._path.resolve().as_uri()],
+        })
+        self._records_announced = self._records_written
+        self._path = None
+        self._batch_key = None
+        self._emit_announced_state()
+
+    def write(self, record: dict, batch_key: str) -> None:
+        """Append a record to the current file for `batch_key`."""
+        if self._path is not None and (batch_key != self._batch_key or self._bytes >= self.max_bytes):
+            self._close()
+        if self._path is None:
+            self._open(batch_key)
+        line = json.dumps(record)
+        # Sizes are measured on the uncompressed records, so files land at or under `max_bytes`.
+        self._bytes += len(line) + 1
+        self._records_written += 1
+        if self.batch_format == BATCH_FORMAT_PARQUET:
+            self._rows.append(record)
+            if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+                self._write_row_group()
+        else:
+            self._file.write(line + "\n")
+
+    def write_state(self, state: dict) -> None:
+        """Emit a STATE message, once every record written so far is in an announced file."""
+        self._pending_states.append((self._records_written, deepcopy(state)))
+        self._emit_announced_state()
+
+    def _emit_announced_state(self) -> None:
+        # Only the latest state covered by the announced files needs to be sent.
+        covered_state = None
+        while self._pending_states and self._pending_states[0][0] <= self._records_announced:
+            covered_state = self._pending_states.popleft()[1]
+        if covered_state is not None:
+            self.emit({"type": "STATE", "value": covered_state})
+
+    def flush(self) -> None:
+        """Complete and announce the current file, then emit any STATE messages held back for it."""
+        self._close()
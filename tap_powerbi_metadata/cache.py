@@ -0,0 +1,176 @@
+"""On-disk record/replay cache of activity event pages."""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+CACHE_MODE_RECORD = "record"
+CACHE_MODE_REPLAY = "replay"
+CACHE_MODES = (CACHE_MODE_RECORD, CACHE_MODE_REPLAY)
+
+
+class PageCacheMiss(RuntimeError):
+    """Raised in replay mode when a requested page has not been recorded."""
+
+
+class PageCache:
+    """A gzip-compressed, size- and age-bounded store of response bodies.
+
+    Each page is stored in its own file, named by a hash of its key. Entries older than `ttl_seconds`
+    are ignored and removed, and once the store exceeds `max_bytes` the oldest entries are evicted.
+    In `replay` mode a miss raises `PageCacheMiss` rather than letting the request reach the API.
+    """
+
+    def __init__(
+        self, cache_dir: Path, mode: str = CACHE_MODE_RECORD, max_bytes: int = 1024 ** 3, ttl_seconds: Optional[float] = None
+    ) -> None:
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown page cache mode '{mode}'. Expected one of: {', '.join(CACHE_MODES)}.")
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[Path, Tuple[int, float]]] = None
+        self._total_bytes = 0
+
+    @property
+    def replay(self) -> bool:
+        return self.mode == CACHE_MODE_REPLAY
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json.gz"
+
+    def _load_entries(self) -> Dict[Path, Tuple[int, float]]:
+        if self._entries is None:
+            self._entries = {}
+            for path in self.cache_dir.glob("*/*.json.gz"):
+                stat = path.stat()
+                self._entries[path] = (stat.st_size, stat.st_mtime)
+            self._total_bytes = sum(size for size, _ in self._entries.values())
+        return self._entries
+
+    def _remove(self, path: Path) -> None:
+        size, _ = self._entries.pop(path)
+        self._total_bytes -= size
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored body for `key`, or None if it is missing or expired."""
+        path = self._path(key)
+        with self._lock:
+            entry = self._load_entries().get(path)
+            if entry and self.ttl_seconds and time.time() - entry[1] > self.ttl_seconds:
+                self._remove(path)
+                entry = None
+            if not entry:
+                self.misses += 1
+                if self.replay:
+                    raise PageCacheMiss(f"Page {key} has not been recorded in the page cache at {self.cache_dir}.")
+                return None
+            self.hits += 1
+        return gzip.decompress(path.read_bytes())
+
+    def open_writer(self, key: str) -> Optional["PageCacheWriter"]:
+        """Return a writer which streams a body into the entry for `key`, or None in replay mode."""
+        if self.replay:
+            return None
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return PageCacheWriter(self, path)
+
+    def put(self, key: str, body: bytes) -> None:
+        """Store `body` under `key`, evicting the oldest entries if the store is over its size limit."""
+        writer = self.open_writer(key)
+        if writer:
+            writer.write(body)
+            writer.commit()
+
+    def _add_entry(self, path: Path) -> None:
+        stat = path.stat()
+        with self._lock:
+            entries = self._load_entries()
+            if path in entries:
+                self._total_bytes -= entries[path][0]
+            entries[path] = (stat.st_size, stat.st_mtime)
+            self._total_bytes += stat.st_size
+            if self._total_bytes > self.max_bytes:
+                for old_path, _ in sorted(entries.items(), key=lambda item: item[1][1]):
+                    if self._total_bytes <= self.max_bytes:
+                        break
+                    self._remove(old_path)
+
+
+class PageCacheWriter:
+    """Compresses a body into a temporary file, which replaces the cache entry only once committed."""
+
+    def __init__(self, cache: PageCache, path: Path) -> None:
+        self.cache = cache
+        self.path = path
+        self.tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        self._file = gzip.open(str(self.tmp_path), "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def commit(self) -> None:
+        self._file.close()
+        os.replace(str(self.tmp_path), str(self.path))
+        self.cache._add_entry(self.path)
+
+    def abort(self) -> None:
+        self._file.close()
+        try:
+            self.tmp_path.unlink()
+        except OSError:
+            pass
+
+
+class CachingReader:
+    """Wraps a response's raw stream, copying the decoded body into the page cache as it is read.
+
+    The entry is committed once the body has been read to the end, and discarded if the stream is
+    closed before that, so a partially read page is never cached.
+    """
+
+    def __init__(self, raw, writer: PageCacheWriter) -> None:
+        self._raw = raw
+        self._writer: Optional[PageCacheWriter] = writer
+
+    def read(self, amt: Optional[int] = None, *args, **kwargs) -> bytes:
+        chunk = self._raw.read(amt, decode_content=True)
+        if self._writer:
+            if chunk:
+                self._writer.write(chunk)
+            elif amt != 0:
+                self._writer.commit()
+                self._writer = None
+        return chunk
+
+    def readinto(self, buffer) -> int:
+        chunk = self.read(len(buffer))
+        buffer[: len(chunk)] = chunk
+        return len(chunk)
+
+    def close(self) -> None:
+        if self._writer:
+            self._writer.abort()
+            self._writer = None
+        self._raw.close()
+
+    def __getattr__(self, name: str):
+        return getattr(self._raw, name)
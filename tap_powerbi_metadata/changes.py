@@ -0,0 +1,74 @@
+"""Content hashing used to emit only new or changed events when re-scanning recent days."""
+
+import hashlib
+import json
+import os
+import threading
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+
+def _canonical_number(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Cannot hash a value of type {type(value).__name__}.")
+
+
+def content_hash(value) -> str:
+    """Return a short, stable hash of a JSON-like value.
+
+    The value is hashed in a canonical form: keys sorted, no whitespace, and numbers as JSON writes ints
+    and floats. Every decoder yields ints and floats (`ijson` is run with `use_float`), so a page hashes the
+    same whichever backend decoded it; Decimals from elsewhere are normalised to match.
+    """
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=_canonical_number)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class PageHashIndex:
+    """The content hashes of the activity event pages seen by earlier runs, grouped by UTC day.
+
+    Hashes are loaded from and saved to a JSON file, rather than state, so they are not repeated in
+    every STATE message. A page whose hash was seen before holds exactly the events an earlier run
+    already processed, so it can be skipped without looking at its events. Pages may be checked and
+    added from several fetch threads; hashes added during a run only take effect once saved, i.e.
+    once the run's records have all been emitted. `seen_pages` seeds an index with no file yet.
+    """
+
+    def __init__(self, index_path: Path, earliest_day: str, seen_pages: Optional[Dict[str, List[str]]] = None) -> None:
+        self.index_path = Path(index_path).expanduser()
+        self.earliest_day = earliest_day
+        if self.index_path.exists():
+            seen_pages = json.loads(self.index_path.read_text())
+        seen_pages = seen_pages or {}
+        self.seen_pages = {day: list(hashes) for day, hashes in seen_pages.items() if day >= earliest_day}
+        self._seen: Set[str] = {page_hash for hashes in self.seen_pages.values() for page_hash in hashes}
+        self._new_pages: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.unchanged_pages = 0
+
+    def check(self, day: str, page_hash: str) -> bool:
+        """Record a fetched page, returning False if it is unchanged since an earlier run."""
+        with self._lock:
+            if page_hash in self._seen:
+                self.unchanged_pages += 1
+                return False
+            if day >= self.earliest_day:
+                self._new_pages.setdefault(day, set()).add(page_hash)
+            return True
+
+    def get_seen_pages(self) -> Dict[str, List[str]]:
+        """Return the seen page hashes by day, including this run's."""
+        with self._lock:
+            seen_pages = {day: set(hashes) for day, hashes in self.seen_pages.items()}
+            for day, hashes in self._new_pages.items():
+                seen_pages.setdefault(day, set()).update(hashes)
+        return {day: sorted(hashes) for day, hashes in sorted(seen_pages.items())}
+
+    def save(self) -> None:
+        """Write the seen page hashes, including this run's, to the index file."""
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.get_seen_pages()))
+        os.replace(tmp_path, self.index_path)
@@ -0,0 +1,101 @@
+"""Record conformers compiled from a stream's JSON Schema.
+
+Rather than walking the schema for every record, `compile_conformer` generates a Python function
+once per sync. The generated function copies only the selected properties, and only calls a
+coercion helper on the `date-time`, `integer` and `boolean` leaves; every other value is copied
+as-is.
+"""
+
+from datetime import date, datetime
+from typing import Callable, Dict, List, Tuple
+
+Breadcrumb = Tuple[str, ...]
+
+
+def _conform_datetime(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _conform_integer(value):
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _conform_boolean(value):
+    if isinstance(value, str):
+        lowered = value.lower()
+        if lowered in ("true", "false"):
+            return lowered == "true"
+    return value
+
+
+def _leaf_converter(schema: dict):
+    types = schema.get("type", [])
+    types = [types] if isinstance(types, str) else types
+    if schema.get("format") == "date-time":
+        return "_conform_datetime"
+    if "integer" in types:
+        return "_conform_integer"
+    if "boolean" in types:
+        return "_conform_boolean"
+    return None
+
+
+class _ConformerCompiler:
+    def __init__(self, is_selected: Callable[[Breadcrumb], bool]) -> None:
+        self.is_selected = is_selected
+        self.namespace: Dict[str, object] = {
+            "_conform_datetime": _conform_datetime,
+            "_conform_integer": _conform_integer,
+            "_conform_boolean": _conform_boolean,
+        }
+        self.sources: List[str] = []
+
+    def value_expression(self, schema: dict, expression: str) -> str:
+        """Return an expression conforming `expression` to `schema`, or `expression` itself if no work is needed."""
+        types = schema.get("type", [])
+        types = [types] if isinstance(types, str) else types
+        if "object" in types and "properties" in schema:
+            function_name = self.compile_object(schema["properties"])
+            return f"({function_name}({expression}) if isinstance({expression}, dict) else {expression})"
+        if "array" in types:
+            item_expression = self.value_expression(schema.get("items", {}), "item")
+            if item_expression == "item":
+                return expression
+            return f"([{item_expression} for item in {expression}] if isinstance({expression}, list) else {expression})"
+        converter = _leaf_converter(schema)
+        return f"{converter}({expression})" if converter else expression
+
+    def compile_object(self, properties: dict, breadcrumb: Breadcrumb = ()) -> str:
+        """Generate a function conforming an object with the given properties, and return its name."""
+        function_name = f"_conform_object_{len(self.sources)}"
+        self.sources.append("")
+        lines = [f"def {function_name}(record):", "    result = {}"]
+        for name, child_schema in properties.items():
+            if breadcrumb == () and not self.is_selected((name,)):
+                continue
+            key = repr(name)
+            value = self.value_expression(child_schema, "value")
+            lines.append(f"    if {key} in record:")
+            if value == "value":
+                lines.append(f"        result[{key}] = record[{key}]")
+            else:
+                lines.append(f"        value = record[{key}]")
+                lines.append(f"        result[{key}] = {value}")
+        lines.append("    return result")
+        self.sources[int(function_name.rsplit("_", 1)[1])] = "\n".join(lines)
+        return function_name
+
+
+def compile_conformer(schema: dict, is_selected: Callable[[Breadcrumb], bool] = lambda breadcrumb: True):
+    """Compile a function which conforms records to `schema`, keeping only selected top-level properties."""
+    compiler = _ConformerCompiler(is_selected)
+    root_name = compiler.compile_object(schema.get("properties", {}))
+    exec(compile("\n\n".join(compiler.sources), "<record conformer>", "exec"), compiler.namespace)
+    return compiler.namespace[root_name]
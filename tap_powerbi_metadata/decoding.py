@@ -0,0 +1,91 @@
+"""Response decoding for tap-powerbi-metadata.
+
+Each page is decoded exactly once, and the result is shared between `parse_response` and
+`get_next_page_token`. `orjson` is used when installed, and `ijson` enables an incremental
+mode which yields entities while the body is still being read from the socket.
+"""
+
+import json
+from typing import Any, Callable, Iterable, Optional
+
+import requests
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:
+    ijson = None
+
+# Attribute used to cache the decoded page on the response object.
+_DECODED_ATTR = "_decoded_page"
+_SCALAR_EVENTS = {"null", "boolean", "integer", "double", "number", "string"}
+
+
+def _get_json_loads() -> Callable[[bytes], Any]:
+    if orjson:
+        return orjson.loads
+    return json.loads
+
+
+class PageDecoder:
+    """Decode Power BI response pages once, optionally streaming entities out of the body."""
+
+    def __init__(self, incremental: bool = False) -> None:
+        if incremental and not ijson:
+            raise RuntimeError("Incremental decoding requires the `ijson` package to be installed.")
+        self.incremental = incremental
+        self.loads = _get_json_loads()
+
+    @property
+    def backend_name(self) -> str:
+        if self.incremental:
+            return "ijson"
+        return "orjson" if orjson else "json"
+
+    def decode(self, response: requests.Response) -> dict:
+        """Return the decoded page, parsing the body only on first access.
+
+        In incremental mode the page holds only the top-level scalar fields (e.g. `continuationToken`),
+        and is populated once `iter_records` has consumed the body.
+        """
+        page = getattr(response, _DECODED_ATTR, None)
+        if page is None:
+            page = self.loads(response.content)
+            setattr(response, _DECODED_ATTR, page)
+        return page
+
+    def iter_records(self, response: requests.Response, records_key: str) -> Iterable[dict]:
+        """Return an iterator of the entities held under `records_key`."""
+        if self.incremental and response.raw is not None and not response._content_consumed:
+            yield from self._iter_records_incremental(response, records_key)
+            return
+        # Release the entity list once yielded; pagination only needs the remaining fields.
+        records = self.decode(response).pop(records_key, None) or []
+        yield from records
+
+    def _iter_records_incremental(self, response: requests.Response, records_key: str) -> Iterable[dict]:
+        page = {}
+        setattr(response, _DECODED_ATTR, page)
+        item_prefix = records_key + ".item"
+        builder: Optional[ObjectBuilder] = None
+        response.raw.decode_content = True
+        try:
+            # `use_float` yields the same ints and floats as `json`/`orjson`, rather than Decimals.
+            for prefix, event, value in ijson.parse(response.raw, use_float=True):
+                if builder is not None:
+                    builder.event(event, value)
+                    if prefix == item_prefix and event == "end_map":
+                        yield builder.value
+                        builder = None
+                elif prefix == item_prefix and event == "start_map":
+                    builder = ObjectBuilder()
+                    builder.event(event, value)
+                elif prefix and "." not in prefix and event in _SCALAR_EVENTS:
+                    page[prefix] = value
+        finally:
+            response.close()
@@ -0,0 +1,138 @@
+"""Bounded-memory deduplication of emitted activity events."""
+
+import hashlib
+import math
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+_HEADER = struct.Struct("<QII")
+# Cap on hash functions per filter; beyond this extra hashing costs more than it saves.
+MAX_HASH_FUNCTIONS = 16
+
+
+class BloomFilter:
+    """A fixed-size Bloom filter over string keys."""
+
+    def __init__(self, num_bits: int, num_hashes: int, bits: Optional[bytearray] = None, count: int = 0) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, size_bytes: int, expected_items: int) -> "BloomFilter":
+        """Return a filter of `size_bytes`, with the hash count tuned for `expected_items` entries."""
+        num_bits = max(size_bytes, 1) * 8
+        num_hashes = round(num_bits / max(expected_items, 1) * math.log(2))
+        return cls(num_bits, min(max(num_hashes, 1), MAX_HASH_FUNCTIONS))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        num_bits, num_hashes, count = _HEADER.unpack_from(data)
+        return cls(num_bits, num_hashes, bytearray(data[_HEADER.size:]), count)
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(self.num_bits, self.num_hashes, self.count) + bytes(self.bits)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str) -> bool:
+        """Add `key`, returning False if it was (probably) already present."""
+        added = False
+        for position in self._positions(key):
+            byte_index, mask = position >> 3, 1 << (position & 7)
+            if not self.bits[byte_index] & mask:
+                self.bits[byte_index] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Return the estimated probability that a new key is reported as already present."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class DedupIndex:
+    """Per-day Bloom filters of emitted event Ids, persisted between runs.
+
+    Only days within `lookback_days` of today are indexed, since older days are never re-requested
+    by an incremental run; records from older days always pass through. The memory cap is shared
+    evenly between the indexed days. Being a Bloom filter, the index may very occasionally report
+    a new event as a duplicate; the estimated rate is available from `false_positive_rate`.
+
+    With `track_content`, each event's content hash is indexed alongside its Id, so an event which
+    has changed since it was emitted passes through again. Only days indexed with content from the
+    start (marked by a `.content` file) are compared by content; days indexed before are compared by
+    Id alone until they age out, so switching it on never re-emits the events already indexed.
+    """
+
+    def __init__(
+        self, index_dir: Path, memory_bytes: int, lookback_days: int, expected_items_per_day: int, track_content: bool = False
+    ) -> None:
+        self.index_dir = Path(index_dir).expanduser()
+        self.lookback_days = lookback_days
+        self.filter_bytes = memory_bytes // (lookback_days + 1)
+        self.expected_items_per_day = expected_items_per_day
+        self.earliest_day = (datetime.utcnow() - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+        self.track_content = track_content
+        self.filters: Dict[str, BloomFilter] = {}
+        self.content_days: Set[str] = set()
+        self.duplicates = 0
+
+    def _get_filter(self, day: str) -> BloomFilter:
+        if day not in self.filters:
+            filter_path = self.index_dir / f"{day}.bloom"
+            if filter_path.exists():
+                self.filters[day] = BloomFilter.from_bytes(filter_path.read_bytes())
+                tracks_content = (self.index_dir / f"{day}.content").exists()
+            else:
+                self.filters[day] = BloomFilter.for_capacity(self.filter_bytes, self.expected_items_per_day)
+                tracks_content = True
+            if tracks_content and self.track_content:
+                self.content_days.add(day)
+        return self.filters[day]
+
+    def add(self, record_id: str, creation_time: str, content_hash: Optional[str] = None) -> bool:
+        """Record an event, returning False if it was already emitted and should be dropped."""
+        day = creation_time[:10]
+        if day < self.earliest_day:
+            return True
+        bloom = self._get_filter(day)
+        added = bloom.add(record_id)
+        if self.track_content and content_hash:
+            changed = bloom.add(f"{record_id}:{content_hash}")
+            added = added or (changed and day in self.content_days)
+        if added:
+            return True
+        self.duplicates += 1
+        return False
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Return the worst estimated false-positive rate across the indexed days."""
+        return max((bloom.false_positive_rate for bloom in self.filters.values()), default=0.0)
+
+    def save(self) -> None:
+        """Persist the indexed days and delete filters which have aged out of the lookback window."""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for day, bloom in self.filters.items():
+            tmp_path = self.index_dir / f"{day}.bloom.tmp"
+            tmp_path.write_bytes(bloom.to_bytes())
+            tmp_path.replace(self.index_dir / f"{day}.bloom")
+            marker_path = self.index_dir / f"{day}.content"
+            if day in self.content_days:
+                marker_path.touch()
+            elif marker_path.exists():
+                # Events added without their content would otherwise count as changed later.
+                marker_path.unlink()
+        for index_path in [*self.index_dir.glob("*.bloom"), *self.index_dir.glob("*.content")]:
+            if index_path.stem < self.earliest_day:
+                index_path.unlink()
@@ -0,0 +1,174 @@
+"""Request engines used to fetch activity event windows concurrently."""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from tap_powerbi_metadata.pipeline import PagePrefetcher
+
+# aiohttp is slow to import and only needed by the async engine, so it is imported on first use.
+aiohttp = None
+URL = None
+
+MAX_REQUEST_TRIES = 5
+MAX_THROTTLED_RETRIES = 10
+
+
+def _import_aiohttp() -> None:
+    global aiohttp, URL
+    if aiohttp is None:
+        try:
+            import aiohttp as aiohttp_module
+            from yarl import URL as url_class
+        except ImportError:
+            raise RuntimeError("The async request engine requires the `aiohttp` package to be installed.")
+        aiohttp, URL = aiohttp_module, url_class
+
+
+def build_response(
+    status_code: int, body: bytes, headers: Optional[dict] = None, prepared_request: Optional[requests.PreparedRequest] = None
+) -> requests.Response:
+    """Return a `requests.Response` wrapping a body which was not fetched through `requests`."""
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = body
+    if prepared_request is not None:
+        response.url = prepared_request.url
+        response.request = prepared_request
+    return response
+
+
+class ThreadedRequestEngine:
+    """Fetch request windows, each on its own thread, using the stream's `requests` session.
+
+    Every window is paged through by a `PagePrefetcher`, which buffers at most `prefetch_pages`
+    decoded pages before waiting for the stream to emit them.
+    """
+
+    # The transport windows' requests are sent with, or None for the stream's session.
+    send: Optional[Callable[[requests.PreparedRequest], requests.Response]] = None
+
+    def __init__(self, stream, partition: Optional[dict], prefetch_pages: int) -> None:
+        self.stream = stream
+        self.partition = partition
+        self.prefetch_pages = prefetch_pages
+        self._window_fetchers: List[PagePrefetcher] = []
+
+    def __enter__(self) -> "ThreadedRequestEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for window_fetcher in self._window_fetchers:
+            window_fetcher.stop()
+
+    def submit_window(self, window_start: datetime, window_end: datetime) -> PagePrefetcher:
+        """Start fetching a window, returning an iterator of its `(window, rows, next_page_token)` pages."""
+        self._window_fetchers = [fetcher for fetcher in self._window_fetchers if not fetcher.done]
+        window_fetcher = PagePrefetcher(
+            self.stream, self.partition, [(window_start, window_end)], self.prefetch_pages, send=self.send
+        )
+        window_fetcher.start()
+        self._window_fetchers.append(window_fetcher)
+        return window_fetcher
+
+
+class AsyncRequestEngine(ThreadedRequestEngine):
+    """Fetch request windows with their requests sent on a background asyncio loop.
+
+    Requests share a pool of HTTP/1.1 keep-alive connections, and at most `max_connections`
+    requests are in flight at once. Each window is paged through on its own thread, as by
+    `ThreadedRequestEngine`, and hands its requests to the loop with `send`; pages within a window
+    are fetched in sequence, since each depends on the previous continuationToken, but pages from
+    different windows overlap freely. Pages are decoded on the window threads, so the event loop
+    only does I/O.
+    """
+
+    def __init__(self, stream, partition: Optional[dict], max_connections: int, prefetch_pages: int) -> None:
+        _import_aiohttp()
+        super().__init__(stream, partition, prefetch_pages)
+        self.max_connections = max_connections
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="powerbi-async-engine", daemon=True)
+        self._session = None
+        self._in_flight = None
+
+    def __enter__(self) -> "AsyncRequestEngine":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        super().__exit__(*exc_info)
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _open(self) -> None:
+        connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60)
+        self._session = aiohttp.ClientSession(connector=connector)
+        self._in_flight = asyncio.Semaphore(self.max_connections)
+
+    def send(self, prepared_request: requests.PreparedRequest) -> requests.Response:
+        """Send a prepared request on the event loop, blocking the calling window thread until it completes."""
+        return asyncio.run_coroutine_threadsafe(self._send(prepared_request), self._loop).result()
+
+    async def _send(self, prepared_request: requests.PreparedRequest) -> requests.Response:
+        """Send a prepared request through the rate controller.
+
+        Connection errors are retried with exponential backoff, and throttled responses are retried
+        once the rate controller's `Retry-After` pause has elapsed.
+        """
+        stream = self.stream
+        rate_controller = stream.get_rate_controller(self.partition)
+        metrics = stream.metrics
+        connection_attempts = 0
+        throttled_attempts = 0
+        while True:
+            started = time.perf_counter()
+            await rate_controller.acquire_async()
+            if metrics:
+                sent = time.perf_counter()
+                metrics.observe("throttle_wait_seconds", sent - started, stream=stream.name)
+            try:
+                async with self._in_flight:
+                    async with self._session.request(
+                        prepared_request.method,
+                        URL(prepared_request.url, encoded=True),
+                        headers=dict(prepared_request.headers),
+                        data=prepared_request.body,
+                    ) as client_response:
+                        body = await client_response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                rate_controller.release()
+                connection_attempts += 1
+                if connection_attempts == MAX_REQUEST_TRIES:
+                    raise
+                if metrics:
+                    metrics.increment("request_retries", stream=stream.name)
+                await asyncio.sleep(2 ** connection_attempts)
+                continue
+            if metrics:
+                metrics.observe("request_seconds", time.perf_counter() - sent, stream=stream.name)
+                metrics.increment("requests", stream=stream.name, status=str(client_response.status))
+            if not rate_controller.release(client_response.status, client_response.headers):
+                break
+            throttled_attempts += 1
+            if throttled_attempts > MAX_THROTTLED_RETRIES:
+                break
+            stream.logger.warning(
+                f"Request throttled with status {client_response.status}, retrying ({throttled_attempts}/{MAX_THROTTLED_RETRIES})."
+            )
+            if metrics:
+                metrics.increment("throttled_retries", stream=stream.name)
+        response = build_response(client_response.status, body, client_response.headers, prepared_request)
+        stream.validate_response(response)
+        if metrics:
+            metrics.increment("response_bytes", len(body), stream=stream.name)
+        return response
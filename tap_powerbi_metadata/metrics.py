@@ -0,0 +1,170 @@
+"""Sync instrumentation: latency histograms and counters, exported as log lines and a Prometheus textfile."""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+METRIC_PREFIX = "tap_powerbi_metadata"
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+HISTOGRAM_BUCKETS = {
+    "records_per_page": (0, 1, 10, 50, 100, 500, 1000, 5000, 10000),
+    "records_per_window": (0, 100, 1000, 10000, 50000, 100000, 500000, 1000000),
+    "prefetch_queue_depth": (0, 1, 2, 4, 8, 16, 32, 64),
+}
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+class Histogram:
+    """A fixed-bucket histogram, as exported by Prometheus clients."""
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        # The last slot counts observations above the largest bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return the upper bound of the bucket holding the `q` quantile, or None if it is above every bucket."""
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    """Thread-safe counters and histograms for one tap run.
+
+    Call sites only reach this class when metrics are enabled, so a disabled run pays for nothing
+    but an `if` per instrumented call. `maybe_export` is called from the hot path and exports at
+    most once per `log_interval_seconds`: a `METRIC:` log line with a JSON summary and, if
+    `textfile_path` is set, a Prometheus textfile for the node exporter's textfile collector.
+    """
+
+    def __init__(self, logger, log_interval_seconds: float = 60.0, textfile_path: Optional[Path] = None) -> None:
+        self.logger = logger
+        self.log_interval_seconds = log_interval_seconds
+        self.textfile_path = Path(textfile_path).expanduser() if textfile_path else None
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = {}
+        self._histograms: Dict[MetricKey, Histogram] = {}
+        self._export_lock = threading.Lock()
+        self._next_export = time.monotonic() + log_interval_seconds
+
+    def increment(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(HISTOGRAM_BUCKETS.get(name, SECONDS_BUCKETS))
+            histogram.observe(value)
+
+    def timed_iter(self, records: Iterable[dict], name: str, count_name: str, **labels: str) -> Iterator[dict]:
+        """Yield from `records`, observing the time spent producing them (not consuming them) and their count."""
+        elapsed = 0.0
+        count = 0
+        iterator = iter(records)
+        while True:
+            started = time.perf_counter()
+            try:
+                record = next(iterator)
+            except StopIteration:
+                elapsed += time.perf_counter() - started
+                break
+            elapsed += time.perf_counter() - started
+            count += 1
+            yield record
+        self.observe(name, elapsed, **labels)
+        self.observe(count_name, count, **labels)
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable summary of every metric."""
+        with self._lock:
+            return {
+                "counters": {
+                    name + _format_labels(labels): round(value, 6) for (name, labels), value in sorted(self._counters.items())
+                },
+                "histograms": {
+                    name + _format_labels(labels): histogram.summary()
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        typed = set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = f"{METRIC_PREFIX}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} histogram")
+                    typed.add(metric)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{metric}_bucket{_format_labels(labels, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{metric}_bucket{_format_labels(labels, (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self) -> None:
+        self.textfile_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.textfile_path.with_name(self.textfile_path.name + ".tmp")
+        tmp_path.write_text(self.to_prometheus(), encoding="utf-8")
+        # The textfile collector may read at any time, so the file is replaced atomically.
+        os.replace(str(tmp_path), str(self.textfile_path))
+
+    def export(self) -> None:
+        """Log a summary of every metric, and rewrite the Prometheus textfile."""
+        with self._export_lock:
+            self._next_export = time.monotonic() + self.log_interval_seconds
+            self.logger.info("METRIC: " + json.dumps(self.snapshot()))
+            if self.textfile_path:
+                self.write_textfile()
+
+    def maybe_export(self) -> None:
+        if time.monotonic() >= self._next_export:
+            self.export()
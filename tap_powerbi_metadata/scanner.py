@@ -0,0 +1,159 @@
+"""Workspace inventory using the Power BI admin scanner API."""
+
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+# The scanner API accepts at most 100 workspaces per getInfo call.
+SCAN_BATCH_SIZE = 100
+# Entity collections nested under each workspace in a scan result.
+SCAN_ENTITY_TYPES = ("datasets", "reports", "dashboards", "dataflows")
+MIN_POLL_SECONDS = 1.0
+MAX_POLL_SECONDS = 15.0
+# `modifiedSince` may be at most 30 days in the past.
+MAX_MODIFIED_SINCE_AGE = timedelta(days=30)
+MODIFIED_SINCE_FORMAT = "%Y-%m-%dT%H:%M:%S.0000000Z"
+
+
+class WorkspaceScanner:
+    """Runs the asynchronous workspace scan once, and shares the results between streams.
+
+    Workspace ids are listed with `workspaces/modified` and split into batches of 100. Up to
+    `max_concurrent_scans` batches are in flight at once, each going through `getInfo`, polling
+    `scanStatus` and finally `scanResult`. Entities are spilled to temporary files as batches
+    complete, so memory use does not grow with the size of the tenant.
+
+    Requests are made as the tenant of `partition`. Given `modified_since` (the scan time up to which
+    every syncing stream has already emitted the inventory), the scan is incremental: only workspaces
+    modified since then, or missing from `indexed_ids` (the workspaces listed by an earlier scan), are
+    scanned. Indexed workspaces which have disappeared from the tenant are reported as deleted. The
+    scan records nothing itself: streams save `scan_time` once they have emitted its entities.
+    """
+
+    def __init__(
+        self,
+        stream,
+        max_concurrent_scans: int = 16,
+        exclude_personal_workspaces: bool = False,
+        modified_since: Optional[str] = None,
+        indexed_ids: Optional[Iterable[str]] = None,
+        partition: Optional[dict] = None,
+    ) -> None:
+        self.stream = stream
+        self.partition = partition
+        self.max_concurrent_scans = max_concurrent_scans
+        self.exclude_personal_workspaces = exclude_personal_workspaces
+        self.modified_since = modified_since
+        self.indexed_ids = set(indexed_ids) if indexed_ids is not None else None
+        # Set by `run`: when the scan started, and the ids of every workspace in the tenant, if listed.
+        self.scan_time: Optional[str] = None
+        self.workspace_ids: Optional[List[str]] = None
+        self.deleted_workspace_ids: List[str] = []
+        self._entity_files = {}
+        self._run_lock = threading.Lock()
+        self._completed = False
+
+    @property
+    def logger(self):
+        return self.stream.logger
+
+    def list_workspace_ids(self, modified_since: Optional[str] = None) -> List[str]:
+        """Return the ids of workspaces to scan, optionally only those modified since a timestamp."""
+        params = {}
+        if modified_since:
+            params["modifiedSince"] = modified_since
+        if self.exclude_personal_workspaces:
+            params["excludePersonalWorkspaces"] = "True"
+        workspaces = self.stream.request_json("GET", "/admin/workspaces/modified", params=params, partition=self.partition)
+        return [workspace["id"] for workspace in workspaces]
+
+    def plan_workspace_ids(self, scan_started: datetime) -> List[str]:
+        """Return the ids of workspaces to scan, diffing against the index when scanning incrementally."""
+        all_ids = self.list_workspace_ids()
+        self.workspace_ids = all_ids
+        if self.indexed_ids is not None:
+            self.deleted_workspace_ids = sorted(self.indexed_ids - set(all_ids))
+        if not self.modified_since:
+            return all_ids
+        last_scan = datetime.strptime(self.modified_since, MODIFIED_SINCE_FORMAT)
+        if scan_started - last_scan > MAX_MODIFIED_SINCE_AGE:
+            self.logger.info(f"Last scan at {self.modified_since} is too old for modifiedSince, scanning every workspace.")
+            return all_ids
+        modified_ids = set(self.list_workspace_ids(modified_since=self.modified_since))
+        new_ids = set(all_ids) - self.indexed_ids if self.indexed_ids is not None else set()
+        self.logger.info(
+            f"{len(modified_ids)} workspaces modified since {self.modified_since}, {len(new_ids)} new, "
+            f"{len(self.deleted_workspace_ids)} deleted."
+        )
+        return sorted((modified_ids | new_ids) & set(all_ids))
+
+    def scan_batch(self, workspace_ids: List[str]) -> dict:
+        """Scan a batch of workspaces and return the scan result."""
+        scan = self.stream.request_json(
+            "POST",
+            "/admin/workspaces/getInfo",
+            params={"lineage": "True", "datasourceDetails": "True"},
+            json_body={"workspaces": workspace_ids},
+            partition=self.partition,
+        )
+        poll_seconds = MIN_POLL_SECONDS
+        while True:
+            status = self.stream.request_json(
+                "GET", f"/admin/workspaces/scanStatus/{scan['id']}", partition=self.partition
+            )["status"]
+            if status == "Succeeded":
+                break
+            if status not in ("NotStarted", "Running"):
+                raise RuntimeError(f"Workspace scan {scan['id']} finished with status '{status}'.")
+            time.sleep(poll_seconds)
+            poll_seconds = min(poll_seconds * 2, MAX_POLL_SECONDS)
+        return self.stream.request_json("GET", f"/admin/workspaces/scanResult/{scan['id']}", partition=self.partition)
+
+    def _write_entities(self, entity_type: str, entities: Iterable[dict]) -> None:
+        entity_file = self._entity_files.get(entity_type)
+        if entity_file is None:
+            entity_file = self._entity_files[entity_type] = tempfile.TemporaryFile("w+", encoding="utf-8")
+        for entity in entities:
+            entity_file.write(json.dumps(entity) + "\n")
+
+    def write_scan_result(self, scan_result: dict) -> None:
+        """Split a scan result into its workspaces and their nested entities."""
+        for workspace in scan_result.get("workspaces") or []:
+            workspace = dict(workspace)
+            for entity_type in SCAN_ENTITY_TYPES:
+                entities = workspace.pop(entity_type, None) or []
+                self._write_entities(entity_type, (dict(entity, workspaceId=workspace["id"]) for entity in entities))
+            self._write_entities("workspaces", [workspace])
+
+    def run(self, workspace_ids: Optional[List[str]] = None) -> None:
+        """Scan the given workspaces (by default every workspace in the tenant), once per tap run."""
+        with self._run_lock:
+            if self._completed:
+                return
+            scan_started = datetime.utcnow()
+            if workspace_ids is None:
+                workspace_ids = self.plan_workspace_ids(scan_started)
+            batches = [workspace_ids[i:i + SCAN_BATCH_SIZE] for i in range(0, len(workspace_ids), SCAN_BATCH_SIZE)]
+            self.logger.info(f"Scanning {len(workspace_ids)} workspaces in {len(batches)} batches.")
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_scans) as executor:
+                # Results are written as each batch completes, while later batches are still scanning.
+                for scan_result in executor.map(self.scan_batch, batches):
+                    self.write_scan_result(scan_result)
+            self._write_entities(
+                "workspaces", ({"id": workspace_id, "isDeleted": True} for workspace_id in self.deleted_workspace_ids)
+            )
+            self.scan_time = scan_started.strftime(MODIFIED_SINCE_FORMAT)
+            self._completed = True
+
+    def iter_entities(self, entity_type: str) -> Iterable[dict]:
+        """Return an iterator of the scanned entities of one type."""
+        entity_file = self._entity_files.get(entity_type)
+        if entity_file is None:
+            return
+        entity_file.seek(0)
+        for line in entity_file:
+            yield json.loads(line)
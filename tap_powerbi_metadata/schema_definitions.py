@@ -0,0 +1,492 @@
+"""Stream schema definitions for tap-powerbi-metadata.
+
+These definitions are the source of the JSON Schema files under `schemas/`, which the streams load
+at runtime instead of building a `PropertiesList` on every import. After changing a schema here,
+regenerate the files with:
+
+    python -m tap_powerbi_metadata.schema_definitions
+"""
+
+import json
+
+from singer_sdk.typing import (
+    ArrayType,
+    BooleanType,
+    DateTimeType,
+    IntegerType,
+    ObjectType,
+    PropertiesList,
+    Property,
+    StringType,
+)
+
+from tap_powerbi_metadata.schemas import SCHEMAS_DIR
+
+ACTIVITY_EVENTS_SCHEMA = PropertiesList(
+    # Keys
+    Property("Id", StringType, required=True),
+    Property("CreationTime", DateTimeType, required=True),
+    # Properties
+    Property("AccessRequestMessage", StringType),
+    Property("AccessRequestType", StringType),
+    Property("Activity", StringType),
+    Property("ActivityId", StringType),
+    Property(
+        "AggregatedWorkspaceInformation",
+        ObjectType(
+            Property("WorkspaceCount", IntegerType),
+            Property("WorkspacesByCapacitySku", StringType),
+            Property("WorkspacesByType", StringType),
+        )
+    ),
+    Property("AppName", StringType),
+    Property("AppId", StringType),
+    Property("AppReportId", StringType),
+    Property("ArtifactId", StringType),
+    Property("ArtifactKind", StringType),
+    Property("ArtifactName", StringType),
+    Property("ArtifactObjectId", StringType),
+    Property("AuditedArtifactInformation",
+        ObjectType(
+            Property("AnnotatedItemType", StringType),
+            Property("ArtifactObjectId", StringType),
+            Property("Id", StringType),
+            Property("Name", StringType),
+        )
+    ),
+    Property("CapacityId", StringType),
+    Property("CapacityName", StringType),
+    Property("CapacityState", StringType),
+    Property("CapacityUsers", StringType),
+    Property("ClientIP", StringType),
+    Property("ConsumptionMethod", StringType),
+    Property("CopiedReportId", StringType),
+    Property("CopiedReportName", StringType),
+    Property("CredentialSetupMode", StringType),
+    Property("CustomVisualAccessTokenResourceId", StringType),
+    Property("CustomVisualAccessTokenSiteUri", StringType),
+    Property("DashboardId", StringType),
+    Property("DashboardName", StringType),
+    Property("DataConnectivityMode", StringType),
+    Property(
+        "DataflowAccessTokenRequestParameters",
+        ObjectType(
+            Property("entityName", StringType),
+            Property("partitionUri", StringType),
+            Property("permissions", IntegerType),
+            Property("tokenLifetimeInMinutes", IntegerType),
+        )
+    ),
+    Property("DataflowAllowNativeQueries", BooleanType),
+    Property("DataflowId", StringType),
+    Property("DataflowName", StringType),
+    Property("DataflowRefreshScheduleType", StringType),
+    Property("DataflowType", StringType),
+    Property("DatasetCertificationStage", StringType),
+    Property("DatasetId", StringType),
+    Property("DatasetName", StringType),
+    Property(
+        "Datasets",
+        ArrayType(
+            ObjectType(
+                Property("DatasetId", StringType),
+                Property("DatasetName", StringType),
+            )
+        )
+    ),
+    Property("DatasourceId", StringType),
+    Property("DatasourceObjectIds", ArrayType(StringType)),
+    Property("Datasources",  
+        ArrayType(
+            ObjectType(
+                Property("ConnectionDetails", StringType),
+                Property("DatasourceType", StringType),
+            )
+        )
+    ),
+    Property("DatasourceType", StringType),
+    Property(
+        "DeploymentPipelineAccesses",
+        ArrayType(
+            ObjectType(
+                Property("RolePermissions", StringType),
+                Property("UserObjectId", StringType),
+            )
+        )
+    ),
+    Property("DeploymentPipelineDisplayName", StringType),
+    Property("DeploymentPipelineId", IntegerType),
+    Property("DeploymentPipelineObjectId", StringType),
+    Property("DeploymentPipelineStageOrder", IntegerType),
+    Property("DistributionMethod", StringType),
+    Property("EndPoint", StringType),
+    Property("Experience", StringType),
+    Property(
+        "ExportedArtifactInfo",
+        ObjectType(
+            Property("ArtifactId", IntegerType),
+            Property("ArtifactType", StringType),
+            Property("ExportType", StringType),
+        )
+    ),
+    Property("ExportEventActivityTypeParameter", StringType),
+    Property("ExportEventEndDateTimeParameter", DateTimeType),
+    Property("ExportEventStartDateTimeParameter", DateTimeType),
+    Property("ExternalSubscribeeInformation", StringType),
+    Property(
+       "ExternalSubscribeeInformation",
+        ArrayType(
+            ObjectType(
+                Property("RecipientEmail", StringType),
+            )
+        )
+    ),
+    Property(
+        "FolderAccessRequests",
+        ArrayType(
+            ObjectType(
+                Property("RolePermissions", StringType),
+                Property("UserObjectId", StringType),
+            )
+        )
+    ),
+    Property("FolderDisplayName", StringType),
+    Property("FolderObjectId", StringType),
+    Property("GatewayClusterId", StringType),
+    Property(
+        "GatewayClusters",
+        ArrayType(
+            ObjectType(
+                Property("id", StringType),
+                Property("memberGatewaysIds", ArrayType(StringType)),
+                Property(
+                    "permissions",
+                    ArrayType(
+                        ObjectType(
+                            Property("allowedDataSources", ArrayType(StringType)),
+                            Property("id", StringType),
+                            Property("principalType", StringType),
+                            Property("role", StringType),
+                        )
+                    )
+                ),
+                Property("type", StringType),
+            )
+        )
+    ),
+    Property("GatewayId", StringType),
+    Property("GatewayMemberId", StringType),
+    Property("GatewayType", StringType),
+    Property(
+        "GenerateScreenshotInformation",
+        ObjectType(
+            Property("ExportFormat", StringType),
+            Property("ExportType", IntegerType),
+            Property("ExportUrl", StringType),
+            Property("ScreenshotEngineType", IntegerType),
+        )
+    ),
+    Property("HasFullReportAttachment", BooleanType),
+    Property("ImportDisplayName", StringType),
+    Property("ImportId", StringType),
+    Property("ImportSource", StringType),
+    Property("ImportType", StringType),
+    Property("InstallTeamsAnalyticsInformation",
+        ObjectType(
+            Property("ModelId", StringType),
+            Property("TenantId", StringType),
+            Property("UserId", StringType),
+        )
+    ),
+    Property("IsSuccess", BooleanType),
+    Property("IsTemplateAppFromMarketplace", BooleanType),
+    Property("IsTenantAdminApi", BooleanType),
+    Property("IsUpdateAppActivity", BooleanType),
+    Property("ItemName", StringType),
+    Property("LastRefreshTime", StringType),
+    Property("MembershipInformation", 
+        ArrayType(
+            ObjectType(
+                Property("MemberEmail", StringType),
+            )
+        )
+    ),
+    Property("MentionedUsersInformation", StringType),
+    Property("ModelId", StringType),
+    Property("ModelsSnapshots", ArrayType(IntegerType)),
+    Property("Monikers", ArrayType(StringType)),
+    Property("ObjectDisplayName", StringType),
+    Property("ObjectId", StringType),
+    Property("ObjectType", StringType),
+    Property("Operation", StringType),
+    Property("OrganizationId", StringType),
+    Property(
+        "OrgAppPermission",
+        ObjectType(
+            Property("permissions", StringType),
+            Property("recipients", StringType),
+        )
+    ),
+    Property("OriginalOwner", StringType),
+    Property(
+        "PaginatedReportDataSources",
+        ArrayType(
+            ObjectType(
+                Property("connectionString", StringType),
+                Property("credentialRetrievalType", StringType),
+                Property("", StringType),
+                Property("name", StringType),
+                Property("provider", StringType),
+            )
+        )
+    ),
+    Property("PinReportToTabInformation", 
+        ObjectType(
+            Property("ChannelId", StringType),
+            Property("ChannelName", StringType),
+            Property("DatasetId", StringType),
+            Property("DatasetName", StringType),
+            Property("ReportId", StringType),
+            Property("ReportName", StringType),
+            Property("TabName", StringType),
+            Property("TeamId", StringType),
+            Property("TeamName", StringType),
+            Property("TeamsAppId", StringType),
+            Property("UserId", StringType),
+        )
+    ),
+    Property("RecordType", IntegerType),
+    Property("RefreshType", StringType),
+    Property("ReportCertificationStage", StringType),
+    Property("ReportId", StringType),
+    Property("ReportName", StringType),
+    Property("ReportType", StringType),
+    Property("RequestId", StringType),
+    Property("ResultStatus", StringType),
+    Property(
+        "Schedules",
+        ObjectType(
+            Property("Days", ArrayType(StringType)),
+            Property("RefreshFrequency", StringType),
+            Property("Time", ArrayType(StringType)),
+            Property("TimeZone", StringType),
+        )
+    ),
+    Property("ShareLinkId", StringType),
+    Property("SharingAction", StringType),
+    Property(
+        "SharingInformation",
+        ArrayType(
+            ObjectType(
+                Property("RecipientEmail", StringType),
+                Property("ResharePermission", StringType),
+            )
+        )
+    ),
+    Property("SharingScope", StringType),
+    Property("SwitchState", StringType),
+    Property(
+        "SubscribeeInformation",
+        ArrayType(
+            ObjectType(
+                Property("ObjectId", StringType),
+                Property("RecipientEmail", StringType),
+                Property("RecipientName", StringType),
+            )
+        )
+    ),
+    Property(
+        "SubscriptionSchedule",
+        ObjectType(
+            Property("DaysOfTheMonth",StringType),
+            Property("EndDate", DateTimeType),
+            Property("StartDate", DateTimeType),
+            Property(
+                "Time",
+                ArrayType(StringType)
+            ),
+            Property("TimeZone", StringType),
+            Property("Type", StringType),
+            Property(
+                "WeekDays",
+                ArrayType(StringType)
+            ),
+        )
+    ),
+    Property("TableName", StringType),
+    Property("TakingOverOwner", StringType),
+    Property("TargetWorkspaceId", StringType),
+    Property("TemplateAppFolderObjectId", StringType),
+    Property("TemplateAppIsInstalledWithAutomation", BooleanType),
+    Property("TemplateAppObjectId", StringType),
+    Property("TemplateAppOwnerTenantObjectId", StringType),
+    Property("TemplateAppVersion", StringType),
+    Property("TemplatePackageName", StringType),
+    Property("TenantId", StringType),
+    Property("TileText", StringType),
+    Property(
+        "UpdateFeaturedTables",
+        ArrayType(
+            ObjectType(
+                Property("State", StringType),
+                Property("TableName", StringType),
+            )
+        )
+    ),
+    Property("UserAgent", StringType),
+    Property("UserId", StringType),
+    Property(
+        "UserInformation",
+        ObjectType(
+            Property(
+                "UsersAdded",
+                ArrayType(StringType)
+            ),
+            Property(
+                "UsersRemoved",
+                ArrayType(StringType)
+            ),
+        )
+    ),
+    Property("UserKey", StringType),
+    Property("UserType", IntegerType),
+    Property("Workload", StringType),
+    Property(
+        "WorkspaceAccessList", 
+        ArrayType(
+            ObjectType(
+                Property(
+                    "UserAccessList",
+                    ArrayType(
+                        ObjectType(
+                            Property("GroupUserAccessRight", StringType),
+                            Property("Identifier", StringType),
+                            Property("PrincipalType", StringType),
+                            Property("UserEmailAddress", StringType),
+                        )
+                    ),
+                ),
+                Property("WorkspaceId", StringType),
+            )
+        )
+    ),
+    Property("WorkspaceId", StringType),
+    Property("WorkSpaceName", StringType),
+    Property("WorkspacesSemicolonDelimitedList", StringType),
+)
+
+WORKSPACES_SCHEMA = PropertiesList(
+    Property("id", StringType, required=True),
+    Property("name", StringType),
+    Property("description", StringType),
+    Property("type", StringType),
+    Property("state", StringType),
+    Property("isOnDedicatedCapacity", BooleanType),
+    Property("capacityId", StringType),
+    Property("defaultDatasetStorageFormat", StringType),
+    Property("isDeleted", BooleanType),
+    Property("tenantId", StringType),
+)
+
+DATASETS_SCHEMA = PropertiesList(
+    Property("id", StringType, required=True),
+    Property("workspaceId", StringType, required=True),
+    Property("tenantId", StringType),
+    Property("name", StringType),
+    Property("configuredBy", StringType),
+    Property("createdDate", DateTimeType),
+    Property("contentProviderType", StringType),
+    Property("targetStorageMode", StringType),
+    Property("isEffectiveIdentityRequired", BooleanType),
+    Property("isEffectiveIdentityRolesRequired", BooleanType),
+    Property(
+        "datasourceUsages",
+        ArrayType(
+            ObjectType(
+                Property("datasourceInstanceId", StringType),
+            )
+        )
+    ),
+    Property(
+        "upstreamDataflows",
+        ArrayType(
+            ObjectType(
+                Property("groupId", StringType),
+                Property("targetDataflowId", StringType),
+            )
+        )
+    ),
+)
+
+REPORTS_SCHEMA = PropertiesList(
+    Property("id", StringType, required=True),
+    Property("workspaceId", StringType, required=True),
+    Property("tenantId", StringType),
+    Property("name", StringType),
+    Property("datasetId", StringType),
+    Property("appId", StringType),
+    Property("reportType", StringType),
+    Property("createdBy", StringType),
+    Property("createdDateTime", DateTimeType),
+    Property("modifiedBy", StringType),
+    Property("modifiedDateTime", DateTimeType),
+)
+
+DASHBOARDS_SCHEMA = PropertiesList(
+    Property("id", StringType, required=True),
+    Property("workspaceId", StringType, required=True),
+    Property("tenantId", StringType),
+    Property("displayName", StringType),
+    Property("appId", StringType),
+    Property("isReadOnly", BooleanType),
+    Property(
+        "tiles",
+        ArrayType(
+            ObjectType(
+                Property("id", StringType),
+                Property("title", StringType),
+                Property("reportId", StringType),
+                Property("datasetId", StringType),
+            )
+        )
+    ),
+)
+
+DATAFLOWS_SCHEMA = PropertiesList(
+    Property("objectId", StringType, required=True),
+    Property("workspaceId", StringType, required=True),
+    Property("tenantId", StringType),
+    Property("name", StringType),
+    Property("description", StringType),
+    Property("configuredBy", StringType),
+    Property("modifiedBy", StringType),
+    Property("modifiedDateTime", DateTimeType),
+    Property(
+        "datasourceUsages",
+        ArrayType(
+            ObjectType(
+                Property("datasourceInstanceId", StringType),
+            )
+        )
+    ),
+)
+
+SCHEMAS = {
+    "ActivityEvents": ACTIVITY_EVENTS_SCHEMA,
+    "Workspaces": WORKSPACES_SCHEMA,
+    "Datasets": DATASETS_SCHEMA,
+    "Reports": REPORTS_SCHEMA,
+    "Dashboards": DASHBOARDS_SCHEMA,
+    "Dataflows": DATAFLOWS_SCHEMA,
+}
+
+
+def write_schemas() -> None:
+    """Write each stream's JSON Schema to `schemas/<stream name>.json`."""
+    for stream_name, schema in SCHEMAS.items():
+        schema_path = SCHEMAS_DIR / f"{stream_name}.json"
+        schema_path.write_text(json.dumps(schema.to_dict(), indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    write_schemas()
@@ -0,0 +1,13 @@
+"""JSON Schema files for each stream, generated from `tap_powerbi_metadata.schema_definitions`."""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+
+SCHEMAS_DIR = Path(__file__).parent
+
+
+@lru_cache(maxsize=None)
+def load_schema(stream_name: str) -> dict:
+    """Return a stream's JSON Schema, reading its file on first use."""
+    return json.loads((SCHEMAS_DIR / f"{stream_name}.json").read_text(encoding="utf-8"))
@@ -1,48 +1,370 @@
 """Stream class for tap-powerbi-metadata."""
 
+from collections import deque
 from copy import deepcopy
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from itertools import islice, product
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional
-from urllib import parse
+import json
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import backoff
 import requests
 
 
+from singer_sdk.helpers._catalog import is_property_selected, pop_deselected_record_properties
+from singer_sdk.helpers._state import get_state_if_exists
+from singer_sdk.helpers._typing import conform_record_data_types
 from singer_sdk.streams import RESTStream
-from singer_sdk.authenticators import APIAuthenticatorBase, SimpleAuthenticator, OAuthAuthenticator, OAuthJWTAuthenticator
-from singer_sdk.typing import (
-    ArrayType,
-    BooleanType,
-    DateTimeType,
-    IntegerType,
-    NumberType,
-    ObjectType,
-    PropertiesList,
-    Property,
-    StringType,
-)
+from singer_sdk.authenticators import APIAuthenticatorBase
+
+from tap_powerbi_metadata.auth import OAuthActiveDirectoryAuthenticator
+from tap_powerbi_metadata.backfill import ShardLedger, default_worker_id, parse_shard_date
+from tap_powerbi_metadata.batch import BATCH_FORMAT_JSONL, BatchWriter, write_message
+from tap_powerbi_metadata.cache import CACHE_MODE_RECORD, CachingReader, PageCache, PageCacheMiss
+from tap_powerbi_metadata.changes import PageHashIndex, content_hash
+from tap_powerbi_metadata.conform import compile_conformer
+from tap_powerbi_metadata.decoding import PageDecoder
+from tap_powerbi_metadata.dedup import DedupIndex
+from tap_powerbi_metadata.engine import MAX_THROTTLED_RETRIES, AsyncRequestEngine, ThreadedRequestEngine, build_response
+from tap_powerbi_metadata.metrics import Metrics
+from tap_powerbi_metadata.pipeline import DEFAULT_PREFETCH_PAGES, PagePrefetcher
+from tap_powerbi_metadata.scanner import WorkspaceScanner
+from tap_powerbi_metadata.schemas import load_schema
+from tap_powerbi_metadata.throttling import RateController
 
 API_DATE_FORMAT = "'%Y-%m-%dT%H:%M:%SZ'"
+CHECKPOINT_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+# Used to size dedup filters until a volume estimate is available.
+DEFAULT_EVENTS_PER_DAY = 500000
+TENANT_CREDENTIAL_KEYS = ("tenant_id", "client_id", "username", "password")
 
-class OAuthActiveDirectoryAuthenticator(OAuthAuthenticator):
-    # https://pivotalbi.com/automate-your-power-bi-dataset-refresh-with-python
 
-    @property
-    def oauth_request_body(self) -> dict:
-        return {
-            'grant_type': 'password',
-            'scope': 'https://api.powerbi.com',
-            'resource': 'https://analysis.windows.net/powerbi/api',
-            'client_id': self.config["client_id"],
-            'username': self.config["username"],
-            'password': self.config["password"],
-        }
+def _count_request_retry(details: dict) -> None:
+    stream = details["args"][0]
+    if stream.metrics:
+        stream.metrics.increment("request_retries", stream=stream.name)
 
 
 class TapPowerBIMetadataStream(RESTStream):
-    """PowerBIMetadata stream class."""
+    """Base class for Power BI streams: per-tenant authentication, throttled requests and record output."""
+
+    @property
+    def schema(self) -> dict:
+        """Return the stream's JSON Schema, loaded from its packaged schema file."""
+        return load_schema(self.name)
+
+    @property
+    def url_base(self) -> str:
+        return self.config.get("api_url") or "https://api.powerbi.com/v1.0/myorg"
+
+    @property
+    def tenants(self) -> List[dict]:
+        """Return the credentials of each tenant to sync: the `tenants` list, or the top-level credentials."""
+        if self.config.get("tenants"):
+            return self.config["tenants"]
+        return [{key: self.config[key] for key in TENANT_CREDENTIAL_KEYS}]
+
+    @property
+    def multi_tenant(self) -> bool:
+        """Return whether streams are partitioned by tenant."""
+        return bool(self.config.get("tenants"))
+
+    def get_tenant(self, partition: Optional[dict]) -> dict:
+        """Return the credentials of the tenant a partition belongs to."""
+        tenant_id = (partition or {}).get("tenant")
+        if not tenant_id:
+            return self.tenants[0]
+        return next(tenant for tenant in self.tenants if tenant["tenant_id"] == tenant_id)
+
+    def get_tenant_partitions(self) -> Optional[List[dict]]:
+        """Return one partition per tenant, or None when syncing a single tenant from the top-level credentials."""
+        if not self.multi_tenant:
+            return None
+        return [{"tenant": tenant["tenant_id"]} for tenant in self.tenants]
+
+    # Set by the tap so that every stream shares one token manager per tenant.
+    shared_authenticators: Optional[Dict[str, OAuthActiveDirectoryAuthenticator]] = None
+
+    def get_authenticator(self, partition: Optional[dict]) -> OAuthActiveDirectoryAuthenticator:
+        """Return the token manager of the partition's tenant."""
+        if self.shared_authenticators is None:
+            self.shared_authenticators = {}
+        tenant = self.get_tenant(partition)
+        authenticator = self.shared_authenticators.get(tenant["tenant_id"])
+        if not authenticator:
+            auth_url = self.config.get("auth_url") or "https://login.microsoftonline.com"
+            authenticator = self.shared_authenticators.setdefault(
+                tenant["tenant_id"],
+                OAuthActiveDirectoryAuthenticator(
+                    stream=self,
+                    auth_endpoint=f"{auth_url}/{tenant['tenant_id']}/oauth2/token",
+                    oauth_scopes="https://analysis.windows.net/powerbi/api",
+                    credentials=tenant,
+                ),
+            )
+        return authenticator
+
+    @property
+    def authenticator(self) -> APIAuthenticatorBase:
+        return self.get_authenticator(None)
+
+    # Set by the tap so that every request made for a tenant draws on that tenant's throttling budget.
+    shared_rate_controllers: Optional[Dict[str, RateController]] = None
+
+    def get_rate_controller(self, partition: Optional[dict]) -> RateController:
+        """Return the rate controller of the partition's tenant, since the API throttles each tenant separately."""
+        if self.shared_rate_controllers is None:
+            self.shared_rate_controllers = {}
+        tenant_id = self.get_tenant(partition)["tenant_id"]
+        rate_controller = self.shared_rate_controllers.get(tenant_id)
+        if not rate_controller:
+            rate_controller = self.shared_rate_controllers.setdefault(
+                tenant_id,
+                RateController(
+                    max_concurrency=max(self.max_workers, int(self.config.get("max_connections") or 1)),
+                    max_requests_per_minute=self.config.get("max_requests_per_minute"),
+                ),
+            )
+        return rate_controller
+
+    @property
+    def rate_controller(self) -> RateController:
+        return self.get_rate_controller(None)
+
+    def prepare_request(self, partition: Optional[dict], next_page_token: Optional[Any] = None) -> requests.PreparedRequest:
+        """Prepare a page request, authenticated as the partition's tenant."""
+        return self.requests_session.prepare_request(
+            requests.Request(
+                method="GET",
+                url=self.url_base + self.path,
+                params=self.get_url_params(partition, next_page_token),
+                headers=dict(self.http_headers, **self.get_authenticator(partition).auth_headers),
+            )
+        )
+
+    # The record property holding the tenant id, in the casing of the stream's other properties.
+    tenant_property = "TenantId"
+
+    def post_process(self, row: dict, partition: Optional[dict] = None) -> dict:
+        """Tag the row with its tenant when syncing several tenants."""
+        if partition and partition.get("tenant"):
+            row[self.tenant_property] = partition["tenant"]
+        return row
+
+    # Set by the tap so that every stream reports into one set of metrics.
+    shared_metrics: Optional[Metrics] = None
+
+    @property
+    def metrics(self) -> Optional[Metrics]:
+        """Return the sync metrics, or None if instrumentation is disabled."""
+        if not self.shared_metrics and self.config.get("metrics"):
+            self.shared_metrics = Metrics(
+                self.logger,
+                log_interval_seconds=float(self.config.get("metrics_log_interval_seconds") or 60),
+                textfile_path=self.config.get("metrics_textfile_path"),
+            )
+        return self.shared_metrics
+
+    def get_response_size(self, response: requests.Response) -> int:
+        """Return the size of a response body, without reading a body which is decoded incrementally."""
+        if response._content_consumed or not self.page_decoder.incremental:
+            return len(response.content or b"")
+        return int(response.headers.get("Content-Length") or 0)
+
+    def validate_response(self, response: requests.Response) -> None:
+        """Raise an error for unsuccessful responses."""
+        if response.status_code in [401, 403]:
+            self.logger.info("Failed request for {}".format(response.request.url))
+            self.logger.info(f"Reason: {response.status_code} - {str(response.content)}")
+            raise RuntimeError("Requested resource was unauthorized, forbidden, or not found.")
+        elif response.status_code >= 400:
+            raise RuntimeError(
+                f"Error making request to API: {response.request.url} "
+                f"[{response.status_code} - {str(response.content)}]".replace("\\n", "\n")
+            )
+
+    @backoff.on_exception(
+        backoff.expo,
+        (requests.exceptions.RequestException),
+        max_tries=5,
+        factor=2,
+        on_backoff=_count_request_retry,
+    )
+    def _request_with_backoff(self, prepared_request: requests.PreparedRequest, partition: Optional[dict]) -> requests.Response:
+        """Send a request through the tenant's shared rate controller, retrying throttled responses."""
+        metrics = self.metrics
+        rate_controller = self.get_rate_controller(partition)
+        for attempt in range(MAX_THROTTLED_RETRIES + 1):
+            started = time.perf_counter()
+            rate_controller.acquire()
+            if metrics:
+                sent = time.perf_counter()
+                metrics.observe("throttle_wait_seconds", sent - started, stream=self.name)
+            try:
+                response = self.requests_session.send(prepared_request)
+            except requests.exceptions.RequestException:
+                rate_controller.release()
+                raise
+            if metrics:
+                metrics.observe("request_seconds", time.perf_counter() - sent, stream=self.name)
+                metrics.increment("requests", stream=self.name, status=str(response.status_code))
+            if not rate_controller.release(response.status_code, response.headers) or attempt == MAX_THROTTLED_RETRIES:
+                break
+            self.logger.warning(f"Request throttled with status {response.status_code}, retrying ({attempt + 1}/{MAX_THROTTLED_RETRIES}).")
+            if metrics:
+                metrics.increment("throttled_retries", stream=self.name)
+            response.close()
+        self.validate_response(response)
+        if metrics:
+            metrics.increment("response_bytes", self.get_response_size(response), stream=self.name)
+        return response
+
+    def request_json(
+        self,
+        method: str,
+        path: str,
+        params: Optional[dict] = None,
+        json_body: Optional[dict] = None,
+        partition: Optional[dict] = None,
+    ) -> Any:
+        """Send a one-off API request as the partition's tenant, and return its JSON."""
+        prepared_request = self.requests_session.prepare_request(
+            requests.Request(
+                method=method,
+                url=self.url_base + path,
+                params=params or {},
+                json=json_body,
+                headers=self.get_authenticator(partition).auth_headers,
+            )
+        )
+        return self.page_decoder.decode(self._request_with_backoff(prepared_request, partition))
+
+    _batch_writer: Optional[BatchWriter] = None
+
+    @property
+    def batch_writer(self) -> Optional[BatchWriter]:
+        """Return the batch file writer, or None if records are sent as RECORD messages."""
+        if not self._batch_writer and self.config.get("batch_output_path"):
+            self._batch_writer = BatchWriter(
+                self.name,
+                self.schema,
+                Path(self.config["batch_output_path"]),
+                batch_format=self.config.get("batch_format") or BATCH_FORMAT_JSONL,
+                max_bytes=int(float(self.config.get("batch_max_mb") or 100) * 1024 * 1024),
+            )
+        return self._batch_writer
+
+    def get_batch_key(self, record: dict) -> str:
+        """Return the partition a record's batch file is cut by: its UTC day, if the stream has a replication key."""
+        if self.replication_key and record.get(self.replication_key):
+            return str(record[self.replication_key])[:10]
+        return "all"
+
+    def is_property_selected(self, breadcrumb: Tuple[str, ...]) -> bool:
+        """Return whether a top-level property is selected in the input catalog. Without a catalog, all are."""
+        return is_property_selected(self._tap_input_catalog, self.name, ("properties",) + breadcrumb, self.logger)
+
+    _record_conformer = None
+
+    @property
+    def record_conformer(self):
+        """Return the compiled record conformer, or None if records are conformed by the SDK."""
+        if not self._record_conformer and self.config.get("compiled_conformer"):
+            self._record_conformer = compile_conformer(self.schema, self.is_property_selected)
+        return self._record_conformer
+
+    def _write_record_message(self, record: dict) -> None:
+        metrics = self.metrics
+        if not metrics:
+            self._emit_record(record)
+            return
+        started = time.perf_counter()
+        self._emit_record(record)
+        metrics.increment("emit_seconds", time.perf_counter() - started, stream=self.name)
+        metrics.increment("records", stream=self.name)
+
+    def _emit_record(self, record: dict) -> None:
+        if self.record_conformer:
+            record = self.record_conformer(record)
+            if not self.batch_writer:
+                time_extracted = datetime.now(timezone.utc).isoformat()
+                write_message(
+                    {"type": "RECORD", "stream": self.name, "record": record, "time_extracted": time_extracted},
+                    flush=False,
+                )
+                return
+        if not self.batch_writer:
+            super()._write_record_message(record)
+            return
+        if not self.record_conformer:
+            pop_deselected_record_properties(record, self._singer_catalog.to_dict(), self.name, self.logger)
+            record = conform_record_data_types(self.name, record, self.schema, self.logger)
+        self.batch_writer.write(record, self.get_batch_key(record))
+
+    def _write_state_message(self) -> None:
+        # In batch mode, state is held back until the files holding every earlier record are announced.
+        if self.batch_writer:
+            self.batch_writer.write_state(self.tap_state)
+            return
+        super()._write_state_message()
+
+    def _sync_records(self, partition: Optional[dict] = None) -> None:
+        try:
+            super()._sync_records(partition)
+        finally:
+            if self.batch_writer:
+                self.batch_writer.flush()
+
+    _page_decoder: Optional[PageDecoder] = None
+
+    @property
+    def page_decoder(self) -> PageDecoder:
+        if not self._page_decoder:
+            self._page_decoder = PageDecoder(incremental=bool(self.config.get("incremental_decoding")))
+            self.logger.info(f"Decoding responses using {self._page_decoder.backend_name}.")
+        return self._page_decoder
+
+    @property
+    def requests_session(self) -> requests.Session:
+        session = super().requests_session
+        # Incremental decoding reads entities straight off the socket instead of buffering the body.
+        session.stream = self.page_decoder.incremental
+        return session
+
+    @property
+    def max_workers(self) -> int:
+        """Return the number of request windows which may be fetched concurrently."""
+        return max(int(self.config.get("max_workers") or 1), 1)
+    @staticmethod
+    def _partition_key(partition: Optional[dict]) -> str:
+        return json.dumps(partition or {}, sort_keys=True)
+
+    def log_sync_summary(self, partition: Optional[dict]) -> None:
+        rate_controller = self.get_rate_controller(partition)
+        if rate_controller.throttled_responses or rate_controller.throttled_seconds:
+            self.logger.info(
+                f"Received {rate_controller.throttled_responses} throttled responses; requests spent "
+                f"{rate_controller.throttled_seconds:.1f}s paused by throttling."
+            )
+        if self.metrics:
+            self.metrics.export()
+
+    @property
+    def partitions(self) -> Optional[List[dict]]:
+        """Return a partition per tenant, or None when syncing a single tenant."""
+        return self.get_tenant_partitions()
 
-    url_base = "https://api.powerbi.com/v1.0/myorg"
+
+class ActivityEventsStream(TapPowerBIMetadataStream):
+    """The tenant's activity log, requested in day (or sub-day) windows and paged by continuationToken."""
+
+    name = "ActivityEvents"
+    path = "/admin/activityevents"
+    primary_keys = ["Id"]
+    replication_key = "CreationTime"
 
     def get_url_params(self, partition: Optional[dict], next_page_token: Optional[Any] = None) -> Dict[str, Any]:
         """Return a dictionary of values to be used in URL parameterization.
@@ -52,418 +374,919 @@ class TapPowerBIMetadataStream(RESTStream):
         params = {}
         if next_page_token:
             starting_datetime = next_page_token["urlStartDate"]
+            ending_datetime = next_page_token.get("urlEndDate")
             continuationToken = next_page_token.get("continuationToken")
         else:
             starting_datetime = self.get_starting_timestamp(partition)
+            ending_datetime = None
             continuationToken = None
         if continuationToken:
             params["continuationToken"] = "'" + continuationToken + "'"
         else:
             params.update({"startDateTime": starting_datetime.strftime(API_DATE_FORMAT)})
-            ending_datetime = starting_datetime.replace(hour=0, minute=0, second=0) + timedelta(days=1) + timedelta(microseconds=-1)
+            if not ending_datetime:
+                ending_datetime = starting_datetime.replace(hour=0, minute=0, second=0) + timedelta(days=1) + timedelta(microseconds=-1)
             params.update({"endDateTime": ending_datetime.strftime(API_DATE_FORMAT)})
+            if partition and partition.get("filter"):
+                params["$filter"] = partition["filter"]
         self.logger.debug(params)
         return params
 
     @property
-    def authenticator(self) -> APIAuthenticatorBase:
-        return OAuthActiveDirectoryAuthenticator(
-            stream=self,
-            auth_endpoint=f"https://login.microsoftonline.com/{self.config['tenant_id']}/oauth2/token",
-            oauth_scopes="https://analysis.windows.net/powerbi/api",
+    def window_target_events(self) -> Optional[int]:
+        """Return the number of events each intra-day window should hold, or None to request whole days."""
+        return self.config.get("window_target_events")
+
+    def get_events_per_hour(self, partition: Optional[dict]) -> Optional[float]:
+        """Return the observed event volume, carried over from earlier runs via state."""
+        return self.get_stream_or_partition_state(partition).get("eventsPerHour")
+
+    def record_window_volume(self, partition: Optional[dict], window_start: datetime, window_end: datetime, event_count: int) -> None:
+        """Fold the event count of a completed window into the running volume estimate."""
+        hours = (window_end - window_start).total_seconds() / 3600
+        if hours <= 0:
+            return
+        observed = event_count / hours
+        previous = self.get_events_per_hour(partition)
+        estimate = observed if previous is None else (previous + observed) / 2
+        self.get_stream_or_partition_state(partition)["eventsPerHour"] = round(estimate, 2)
+
+    def get_day_windows(
+        self, partition: Optional[dict], starting_datetime: Optional[datetime] = None, ending_datetime: Optional[datetime] = None
+    ) -> List[datetime]:
+        """Return the start of each UTC day window to be requested, in order.
+
+        The first window begins at `starting_datetime` (by default the starting timestamp, moved back
+        to re-scan the `lookback_hours`); every later window begins at midnight, up to `ending_datetime`
+        (by default the sync end).
+        """
+        lookback_start = None
+        if not starting_datetime:
+            starting_datetime = self.get_starting_timestamp(partition)
+            if starting_datetime and self.lookback:
+                lookback_start = self.get_lookback_start()
+        if not starting_datetime:
+            # The activity log only retains 30 days of history.
+            starting_datetime = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=29)
+        if starting_datetime.tzinfo:
+            starting_datetime = starting_datetime.astimezone(timezone.utc).replace(tzinfo=None)
+        # Bookmarks are parsed by pendulum, whose intervals cannot be divided by a plain timedelta.
+        starting_datetime = datetime.combine(starting_datetime.date(), starting_datetime.time())
+        if lookback_start and lookback_start < starting_datetime:
+            self.logger.info(f"Re-scanning from {lookback_start} for late-arriving events.")
+            starting_datetime = lookback_start
+        sync_end = ending_datetime or self.get_sync_end()
+        # Without an explicit end, the last day is requested through to its midnight.
+        planned_end = ending_datetime or sync_end.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        if starting_datetime >= planned_end:
+            # e.g. resuming a run which had already completed its last window.
+            return []
+        day_windows = [starting_datetime]
+        next_day = starting_datetime.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        while next_day < sync_end:
+            day_windows.append(next_day)
+            next_day += timedelta(days=1)
+        return day_windows
+
+    @property
+    def lookback(self) -> Optional[timedelta]:
+        """Return how far back before now each incremental run re-scans, or None to start at the bookmark."""
+        lookback_hours = self.config.get("lookback_hours")
+        return timedelta(hours=float(lookback_hours)) if lookback_hours else None
+
+    def get_lookback_start(self) -> datetime:
+        """Return where a re-scan begins: `lookback_hours` before now, floored to the hour.
+
+        Flooring keeps the re-scanned windows, and so their pages, the same for every run within an hour.
+        """
+        return (datetime.utcnow() - self.lookback).replace(minute=0, second=0, microsecond=0)
+
+    # Hashes of the pages seen by earlier runs, by partition. Loaded on the main thread before the
+    # partition's pages are fetched, and saved back once its records have been emitted.
+    _page_hash_indexes: Optional[Dict[str, PageHashIndex]] = None
+
+    def load_page_hash_index(self, partition: Optional[dict]) -> None:
+        """Load the hashes of the pages seen by earlier runs, kept beside the dedup index."""
+        if not self.lookback or self.shard_ledger or not self.config.get("dedup_index_path"):
+            return
+        if self._page_hash_indexes is None:
+            self._page_hash_indexes = {}
+        key = self._partition_key(partition)
+        if key not in self._page_hash_indexes:
+            earliest_day = (self.get_lookback_start() - timedelta(days=1)).strftime("%Y-%m-%d")
+            # Earlier versions kept the hashes in state, so they seed an index which has no file yet.
+            seen_pages = self.get_stream_or_partition_state(partition).pop("seenPages", None)
+            index_name = "seen_pages.json"
+            if (partition or {}).get("filter"):
+                # Filter partitions share the dedup index, but each needs its own page hashes file.
+                index_name = f"seen_pages.{content_hash(partition['filter'])}.json"
+            index_path = self.get_dedup_index_dir(partition) / index_name
+            self._page_hash_indexes[key] = PageHashIndex(index_path, earliest_day, seen_pages)
+
+    def save_page_hash_index(self, partition: Optional[dict]) -> None:
+        page_hash_index = (self._page_hash_indexes or {}).pop(self._partition_key(partition), None)
+        if not page_hash_index:
+            return
+        page_hash_index.save()
+        self.logger.info(f"Skipped {page_hash_index.unchanged_pages} pages unchanged since an earlier run.")
+
+    def parse_page(self, partition: Optional[dict], response: requests.Response, page_token: dict) -> Iterable[dict]:
+        """Parse a page's rows, or return none if the page is unchanged since an earlier run.
+
+        Pages are only compared when re-scanning (`lookback_hours`), by a hash of their rows.
+        """
+        page_hash_index = (self._page_hash_indexes or {}).get(self._partition_key(partition))
+        if not page_hash_index:
+            return self.parse_response(response)
+        rows = list(self.parse_response(response))
+        if not rows:
+            return rows
+        day = page_token["urlStartDate"].strftime("%Y-%m-%d")
+        if page_hash_index.check(day, content_hash(rows)):
+            return rows
+        if self.metrics:
+            self.metrics.increment("unchanged_pages", stream=self.name)
+        return []
+
+    def get_sync_end(self) -> datetime:
+        """Return the time up to which windows are planned.
+
+        When replaying from the page cache this is the last midnight before the closed-window
+        horizon, since only whole closed days were recorded.
+        """
+        if self.page_cache and self.page_cache.replay:
+            horizon = datetime.utcnow() - self.page_cache_closed_after
+            return horizon.replace(hour=0, minute=0, second=0, microsecond=0)
+        return datetime.utcnow()
+
+    _page_cache: Optional[PageCache] = None
+
+    @property
+    def page_cache(self) -> Optional[PageCache]:
+        """Return the page cache, or None if `page_cache_path` is not configured."""
+        if not self._page_cache and self.config.get("page_cache_path"):
+            ttl_days = self.config.get("page_cache_ttl_days")
+            self._page_cache = PageCache(
+                Path(self.config["page_cache_path"]) / self.name,
+                mode=self.config.get("page_cache_mode") or CACHE_MODE_RECORD,
+                max_bytes=int(float(self.config.get("page_cache_max_mb") or 1024) * 1024 * 1024),
+                ttl_seconds=float(ttl_days) * 86400 if ttl_days else None,
+            )
+        return self._page_cache
+
+    @property
+    def page_cache_closed_after(self) -> timedelta:
+        """Return how long after a window ends before its events are considered final."""
+        return timedelta(hours=float(self.config.get("page_cache_closed_after_hours") or 24))
+
+    def get_page_cache_key(self, partition: Optional[dict], next_page_token: dict) -> Optional[str]:
+        """Return the cache key for a page, or None if the page's window may still receive events."""
+        if not self.page_cache or not next_page_token.get("urlEndDate"):
+            return None
+        if next_page_token["urlEndDate"] > datetime.utcnow() - self.page_cache_closed_after:
+            return None
+        key_parts = [
+            self.path,
+            (partition or {}).get("filter"),
+            next_page_token["urlStartDate"].isoformat(),
+            next_page_token["urlEndDate"].isoformat(),
+            next_page_token.get("continuationToken"),
+        ]
+        if (partition or {}).get("tenant"):
+            key_parts.append(partition["tenant"])
+        return PageCache.make_key(*key_parts)
+
+    def get_cached_page(self, partition: Optional[dict], next_page_token: dict) -> Optional[requests.Response]:
+        """Return the recorded response for a page of a closed window, if one is cached."""
+        cache_key = self.get_page_cache_key(partition, next_page_token)
+        if not cache_key:
+            if self.page_cache and self.page_cache.replay:
+                raise PageCacheMiss(
+                    f"Window starting {next_page_token['urlStartDate']} is not closed, so it cannot be replayed from the page cache."
+                )
+            return None
+        body = self.page_cache.get(cache_key)
+        if body is None:
+            return None
+        if self.metrics:
+            self.metrics.increment("page_cache_hits", stream=self.name)
+        return build_response(200, body)
+
+    def store_cached_page(self, partition: Optional[dict], next_page_token: dict, response: requests.Response) -> None:
+        """Record a successful response for a page of a closed window.
+
+        A body which is still unread (see `incremental_decoding`) is copied into the cache as it is parsed.
+        """
+        cache_key = self.get_page_cache_key(partition, next_page_token)
+        if not cache_key or response.status_code != 200:
+            return
+        if response._content_consumed or response.raw is None:
+            self.page_cache.put(cache_key, response.content)
+            return
+        writer = self.page_cache.open_writer(cache_key)
+        if writer:
+            response.raw = CachingReader(response.raw, writer)
+
+    def request_page(
+        self, partition: Optional[dict], next_page_token: dict, send: Optional[Callable[[requests.PreparedRequest], requests.Response]] = None
+    ) -> requests.Response:
+        """Return the response for a page, from the page cache when possible.
+
+        Requests are sent with `send` if given, or else through the stream's session.
+        """
+        resp = self.get_cached_page(partition, next_page_token)
+        if resp is not None:
+            return resp
+        prepared_request = self.prepare_request(partition, next_page_token=next_page_token)
+        if send:
+            resp = send(prepared_request)
+        else:
+            resp = self._request_with_backoff(prepared_request, partition)
+        self.store_cached_page(partition, next_page_token, resp)
+        return resp
+
+    def split_day_window(self, partition: Optional[dict], day_start: datetime, day_end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Split a day into consecutive sub-day windows sized by the current volume estimate.
+
+        Window lengths are rounded up to a power-of-two multiple of `min_window_minutes`, and boundaries
+        fall on a grid of that length from midnight. Runs therefore request the same windows (and pages,
+        which `lookback_hours` compares) while the estimate drifts, as long as it stays within a factor of two.
+        """
+        day_start = day_start.replace(microsecond=0)
+        events_per_hour = self.get_events_per_hour(partition)
+        if not self.window_target_events or not events_per_hour:
+            return [(day_start, day_end)]
+        day_seconds = (day_end - day_start).total_seconds()
+        expected_events = events_per_hour * day_seconds / 3600
+        min_window_seconds = int(self.config.get("min_window_minutes") or 15) * 60
+        window_count = min(
+            math.ceil(expected_events / self.window_target_events),
+            max(int(day_seconds // min_window_seconds), 1),
+        )
+        if window_count <= 1:
+            return [(day_start, day_end)]
+        step = timedelta(seconds=min_window_seconds)
+        while step.total_seconds() * window_count < day_seconds:
+            step *= 2
+        midnight = day_start.replace(hour=0, minute=0, second=0)
+        windows = []
+        window_start = day_start
+        while window_start < day_end:
+            window_end = min(midnight + step * ((window_start - midnight) // step + 1), day_end)
+            windows.append((window_start, window_end))
+            window_start = window_end
+        self.logger.info(f"Splitting {day_start.date()} into {len(windows)} windows (~{int(expected_events)} events expected).")
+        return windows
+
+    def get_request_windows(
+        self, partition: Optional[dict], starting_datetime: Optional[datetime] = None, ending_datetime: Optional[datetime] = None
+    ) -> Iterable[Tuple[datetime, datetime]]:
+        """Return an ordered iterator of (start, exclusive end) request windows.
+
+        Days are split lazily, so volume observed on earlier windows informs how later days are split.
+        If a checkpointed window is being resumed, it comes first and planning continues from its end;
+        otherwise an interrupted run resumes after the last window it completed. With `ending_datetime`, the last window is cut short at that time. When replaying from the
+        page cache, windows always end by the replay horizon.
+        """
+        if self.page_cache and self.page_cache.replay:
+            ending_datetime = min(ending_datetime or self.get_sync_end(), self.get_sync_end())
+        resume_token = self.get_resume_token(partition)
+        if resume_token:
+            window_start = resume_token["urlStartDate"]
+            window_end = resume_token["urlEndDate"] + timedelta(microseconds=1)
+            yield (window_start, window_end)
+            starting_datetime = window_end
+        elif not starting_datetime:
+            starting_datetime = self.get_completed_through(partition)
+        for day_start in self.get_day_windows(partition, starting_datetime, ending_datetime):
+            day_end = day_start.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+            if ending_datetime:
+                day_end = min(day_end, ending_datetime)
+            yield from self.split_day_window(partition, day_start, day_end)
+
+    # Checkpointed tokens being resumed, by partition, since tenants' partitions may be fetched concurrently.
+    _resume_tokens: Optional[Dict[str, Optional[dict]]] = None
+
+    def get_resume_token(self, partition: Optional[dict]) -> Optional[dict]:
+        """Return the checkpointed token the partition's sync is resuming from, if any."""
+        return (self._resume_tokens or {}).get(self._partition_key(partition))
+
+    def set_resume_token(self, partition: Optional[dict], resume_token: Optional[dict]) -> None:
+        if self._resume_tokens is None:
+            self._resume_tokens = {}
+        self._resume_tokens[self._partition_key(partition)] = resume_token
+
+    def get_checkpoint_token(self, partition: Optional[dict]) -> Optional[dict]:
+        """Return the pagination token checkpointed in state by an interrupted run, if any."""
+        checkpoint = self.get_stream_or_partition_state(partition).get("checkpoint")
+        if not checkpoint or "continuationToken" not in checkpoint:
+            return None
+        return {
+            "urlStartDate": datetime.strptime(checkpoint["urlStartDate"], CHECKPOINT_DATE_FORMAT),
+            "urlEndDate": datetime.strptime(checkpoint["urlEndDate"], CHECKPOINT_DATE_FORMAT),
+            "continuationToken": checkpoint["continuationToken"],
+            "windowRows": checkpoint.get("windowRows", 0),
+            "skipRows": checkpoint.get("skipRows", 0),
+        }
+
+    def get_completed_through(self, partition: Optional[dict]) -> Optional[datetime]:
+        """Return where an interrupted run finished emitting its last complete window, if it did."""
+        checkpoint = self.get_stream_or_partition_state(partition).get("checkpoint")
+        if not checkpoint or "completedThrough" not in checkpoint:
+            return None
+        self.logger.info(f"Resuming after the windows completed through {checkpoint['completedThrough']}.")
+        return datetime.strptime(checkpoint["completedThrough"], CHECKPOINT_DATE_FORMAT)
+
+    def save_completed_window(self, partition: Optional[dict], window_end: datetime) -> None:
+        """Checkpoint in state that every window before `window_end` has been emitted.
+
+        The bookmark only advances once the whole partition is synced, so without this an interrupted
+        run would download its finished windows again. Backfill shards are resumed through the ledger.
+        """
+        if self.shard_ledger:
+            self.save_checkpoint(partition, None)
+            return
+        state = self.get_stream_or_partition_state(partition)
+        state["checkpoint"] = {"completedThrough": window_end.strftime(CHECKPOINT_DATE_FORMAT)}
+        self._write_state_message()
+
+    def save_checkpoint(self, partition: Optional[dict], next_page_token: Optional[dict]) -> None:
+        """Checkpoint the next page of the current window in state, or clear it once the window is done."""
+        self.renew_shard_lease(partition)
+        state = self.get_stream_or_partition_state(partition)
+        if next_page_token and next_page_token.get("continuationToken"):
+            state["checkpoint"] = {
+                "urlStartDate": next_page_token["urlStartDate"].strftime(CHECKPOINT_DATE_FORMAT),
+                "urlEndDate": next_page_token["urlEndDate"].strftime(CHECKPOINT_DATE_FORMAT),
+                "continuationToken": next_page_token["continuationToken"],
+                "windowRows": next_page_token.get("windowRows", 0),
+                "skipRows": next_page_token.get("skipRows", 0),
+            }
+        elif state.pop("checkpoint", None) is None:
+            return
+        self._write_state_message()
+
+    def _new_window_token(self, window_start: datetime, window_end: datetime) -> dict:
+        return {
+            "urlStartDate": window_start,
+            "urlEndDate": window_end + timedelta(microseconds=-1),
+            "continuationToken": None,
+        }
+
+    def get_window_start_token(self, partition: Optional[dict], window_start: datetime, window_end: datetime) -> dict:
+        """Return the pagination token which requests the first page of a window.
+
+        A window interrupted by an earlier run resumes from its checkpointed continuationToken.
+        """
+        resume_token = self.get_resume_token(partition)
+        if resume_token and resume_token["urlStartDate"] == window_start:
+            self.logger.info(f"Resuming window starting {window_start} from checkpointed continuationToken.")
+            return resume_token
+        return self._new_window_token(window_start, window_end)
+
+    def get_resume_fallback_token(self, partition: Optional[dict], failed_token: dict) -> Optional[dict]:
+        """Return a token restarting the window if `failed_token` is a (possibly expired) checkpointed token.
+
+        The restarted window skips the rows emitted before the checkpoint, so none are emitted twice.
+        """
+        resume_token = self.get_resume_token(partition)
+        if not resume_token or failed_token.get("continuationToken") != resume_token["continuationToken"]:
+            return None
+        skip_rows = max(resume_token.get("windowRows", 0), resume_token.get("skipRows", 0))
+        self.logger.warning(
+            f"Checkpointed continuationToken was rejected, restarting window starting {resume_token['urlStartDate']} "
+            f"and skipping its first {skip_rows} events."
+        )
+        self.set_resume_token(partition, None)
+        restart_token = self._new_window_token(resume_token["urlStartDate"], resume_token["urlEndDate"] + timedelta(microseconds=1))
+        restart_token["skipRows"] = skip_rows
+        return restart_token
+
+    @staticmethod
+    def get_rows_to_skip(page_token: dict) -> int:
+        """Return how many of the page's leading rows were already emitted before its window was restarted."""
+        return max(page_token.get("skipRows", 0) - page_token.get("windowRows", 0), 0)
+
+    @staticmethod
+    def advance_window_position(page_token: dict, page_row_count: int, next_page_token: Optional[dict]) -> None:
+        """Record on the next page's token how many of the window's rows precede it, and any still to skip."""
+        if not next_page_token:
+            return
+        next_page_token["windowRows"] = page_token.get("windowRows", 0) + page_row_count
+        if page_token.get("skipRows", 0) > next_page_token["windowRows"]:
+            next_page_token["skipRows"] = page_token["skipRows"]
+
+    def request_window_pages(
+        self,
+        partition: Optional[dict],
+        window_start: datetime,
+        window_end: datetime,
+        send: Optional[Callable[[requests.PreparedRequest], requests.Response]] = None,
+    ) -> Iterable[Tuple[List[dict], Optional[dict]]]:
+        """Request all pages for a single request window, yielding each page's rows with the token of the next page.
+
+        This is the stream's one pagination loop, which every sync mode builds on. A window interrupted by an
+        earlier run resumes from its checkpoint (restarting, without the rows already emitted, if the token
+        has expired), and the window's fetch time and row count are observed once it is exhausted.
+        """
+        metrics = self.metrics
+        started = time.perf_counter()
+        window_row_count = 0
+        next_page_token = self.get_window_start_token(partition, window_start, window_end)
+        while next_page_token:
+            try:
+                resp = self.request_page(partition, next_page_token, send)
+            except RuntimeError:
+                next_page_token = self.get_resume_fallback_token(partition, next_page_token)
+                if not next_page_token:
+                    raise
+                continue
+            rows = list(self.parse_page(partition, resp, next_page_token))
+            previous_token = deepcopy(next_page_token)
+            next_page_token = self.get_next_page_token(response=resp, previous_token=previous_token)
+            if next_page_token and next_page_token["continuationToken"] == previous_token["continuationToken"]:
+                raise RuntimeError(
+                    f"Loop detected in pagination. Pagination token {next_page_token} is identical to prior token."
+                )
+            self.advance_window_position(previous_token, len(rows), next_page_token)
+            rows = rows[self.get_rows_to_skip(previous_token):]
+            window_row_count += len(rows)
+            yield rows, next_page_token
+        if metrics:
+            metrics.observe("window_seconds", time.perf_counter() - started, stream=self.name)
+            metrics.observe("records_per_window", window_row_count, stream=self.name)
+
+    def iter_window_pages(
+        self, partition: Optional[dict], request_windows: Iterable[Tuple[datetime, datetime]]
+    ) -> Iterable[Tuple[Tuple[datetime, datetime], List[dict], Optional[dict]]]:
+        """Request the given windows one after another, yielding `(window, rows, next_page_token)` for each page."""
+        for window in request_windows:
+            for rows, next_page_token in self.request_window_pages(partition, *window):
+                yield window, rows, next_page_token
+
+    def emit_window_pages(
+        self, partition: Optional[dict], pages: Iterable[Tuple[Tuple[datetime, datetime], List[dict], Optional[dict]]]
+    ) -> Iterable[dict]:
+        """Yield the rows of `(window, rows, next_page_token)` pages given in window order, saving progress in state.
+
+        Whole-day windows are emitted page by page, checkpointing the next page after each one. Sub-day
+        windows (see `window_target_events`) are sorted, so each is collected and emitted once complete.
+        Each completed window is checkpointed too, so an interrupted run resumes after it.
+        """
+        window_rows: List[dict] = []
+        event_count = 0
+        for (window_start, window_end), rows, next_page_token in pages:
+            event_count += len(rows)
+            if self.window_target_events:
+                window_rows.extend(rows)
+            else:
+                yield from rows
+                if next_page_token:
+                    self.save_checkpoint(partition, next_page_token)
+            if next_page_token:
+                continue
+            yield from self.order_window_records(window_rows)
+            window_rows = []
+            self.record_window_volume(partition, window_start, window_end, event_count)
+            event_count = 0
+            self.save_completed_window(partition, window_end)
+
+    @property
+    def prefetch_pages(self) -> int:
+        return int(self.config.get("prefetch_pages") or 0)
+
+    @property
+    def tenant_concurrency(self) -> int:
+        return int(self.config.get("tenant_concurrency") or 1) if self.multi_tenant else 1
+
+    def start_prefetcher(self, partition: Optional[dict]) -> PagePrefetcher:
+        """Start fetching a partition's request windows on a prefetch thread."""
+        self.migrate_unfiltered_bookmark(partition)
+        self.set_resume_token(partition, self.get_checkpoint_token(partition))
+        self.load_page_hash_index(partition)
+        prefetch_pages = self.prefetch_pages or DEFAULT_PREFETCH_PAGES
+        self.logger.info(f"Prefetching up to {prefetch_pages} pages of activity events for partition {partition}.")
+        prefetcher = PagePrefetcher(self, partition, self.get_request_windows(partition), prefetch_pages)
+        prefetcher.start()
+        return prefetcher
+
+    _started_prefetchers: Optional[Dict[str, PagePrefetcher]] = None
+
+    def get_prefetcher(self, partition: Optional[dict]) -> PagePrefetcher:
+        """Return the partition's prefetcher, first starting those of the next `tenant_concurrency` partitions.
+
+        Later partitions are fetched ahead while this one is emitted, each holding at most its prefetch
+        queue in memory, so several tenants' requests are in flight while records are emitted in order.
+        """
+        if self._started_prefetchers is None:
+            self._started_prefetchers = {}
+        partitions = self.partitions or [None]
+        position = partitions.index(partition) if partition in partitions else 0
+        for upcoming in [partition] + partitions[position + 1:position + self.tenant_concurrency]:
+            key = self._partition_key(upcoming)
+            if key not in self._started_prefetchers:
+                self._started_prefetchers[key] = self.start_prefetcher(upcoming)
+        return self._started_prefetchers.pop(self._partition_key(partition))
+
+    def stop_prefetchers(self) -> None:
+        """Stop the prefetchers already started for upcoming partitions, e.g. when the sync fails."""
+        for prefetcher in (self._started_prefetchers or {}).values():
+            prefetcher.stop()
+        self._started_prefetchers = {}
+
+    def request_prefetched_records(self, partition: Optional[dict]) -> Iterable[dict]:
+        """Emit the partition's rows from its prefetch thread, which fetches later pages meanwhile."""
+        prefetcher = self.get_prefetcher(partition)
+        try:
+            yield from self.emit_window_pages(partition, prefetcher)
+        except BaseException:
+            self.stop_prefetchers()
+            raise
+        finally:
+            prefetcher.stop()
+
+    def order_window_records(self, rows: List[dict]) -> List[dict]:
+        """Return a window's rows in emission order."""
+        if self.window_target_events:
+            # Sub-day windows are consecutive, so sorting each one restores overall CreationTime order.
+            rows.sort(key=itemgetter(self.replication_key))
+        return rows
+
+    def get_request_engine(self, partition: Optional[dict]):
+        """Return the engine used to fetch the partition's windows concurrently."""
+        if self.config.get("async_requests"):
+            return AsyncRequestEngine(
+                self,
+                partition,
+                max_connections=int(self.config.get("max_connections") or self.max_workers),
+                prefetch_pages=self.prefetch_pages or DEFAULT_PREFETCH_PAGES,
+            )
+        return ThreadedRequestEngine(self, partition, prefetch_pages=self.prefetch_pages or DEFAULT_PREFETCH_PAGES)
+
+    def request_records(self, partition: Optional[dict]) -> Iterable[dict]:
+        """Request records one window at a time, fanning out across `max_workers` concurrent windows.
+
+        Windows are always yielded in order, so the replication key (and therefore state) only
+        advances once every earlier window has been fully emitted.
+        """
+        serial = self.max_workers == 1 and not self.config.get("async_requests")
+        self.migrate_unfiltered_bookmark(partition)
+        self.load_page_hash_index(partition)
+        if self.shard_ledger:
+            yield from self.request_shard_records(partition)
+        elif serial and (self.prefetch_pages or self.tenant_concurrency > 1):
+            yield from self.request_prefetched_records(partition)
+        else:
+            self.set_resume_token(partition, self.get_checkpoint_token(partition))
+            yield from self.request_window_sequence(partition, self.get_request_windows(partition))
+        # Once the partition is complete its bookmark is finalized, so the next run starts there instead.
+        self.get_stream_or_partition_state(partition).pop("checkpoint", None)
+        self.log_sync_summary(partition)
+
+    def request_window_sequence(self, partition: Optional[dict], request_windows: Iterable[Tuple[datetime, datetime]]) -> Iterable[dict]:
+        """Request the given windows, serially or on the request engine, and yield their rows in window order."""
+        if self.max_workers == 1 and not self.config.get("async_requests"):
+            yield from self.emit_window_pages(partition, self.iter_window_pages(partition, request_windows))
+            return
+        with self.get_request_engine(partition) as engine:
+            self.logger.info(f"Requesting activity events using {type(engine).__name__} and {self.max_workers} concurrent windows.")
+            yield from self.emit_window_pages(partition, self.iter_engine_pages(engine, request_windows))
+
+    def iter_engine_pages(
+        self, engine, request_windows: Iterable[Tuple[datetime, datetime]]
+    ) -> Iterable[Tuple[Tuple[datetime, datetime], List[dict], Optional[dict]]]:
+        """Yield the pages of each window in order, while the engine fetches up to `max_workers` windows at once.
+
+        Each window in flight buffers at most `prefetch_pages` pages ahead of the window being emitted,
+        so memory use is bounded however large the windows are.
+        """
+        request_windows = iter(request_windows)
+        pending = deque(engine.submit_window(*window) for window in islice(request_windows, self.max_workers))
+        while pending:
+            window_pages = pending.popleft()
+            yield from window_pages
+            for window in islice(request_windows, 1):
+                pending.append(engine.submit_window(*window))
+
+    _shard_ledger: Optional[ShardLedger] = None
+
+    @property
+    def shard_ledger(self) -> Optional[ShardLedger]:
+        """Return the backfill shard ledger to claim work from, or None for a normal incremental sync."""
+        if not self._shard_ledger and self.config.get("backfill_ledger_path"):
+            self._shard_ledger = ShardLedger(
+                Path(self.config["backfill_ledger_path"]),
+                lease_seconds=float(self.config.get("backfill_lease_minutes") or 60) * 60,
+            )
+        return self._shard_ledger
+
+    # The backfill shard each partition is syncing, with when its lease was last renewed.
+    _current_shards: Optional[Dict[str, dict]] = None
+
+    def renew_shard_lease(self, partition: Optional[dict]) -> None:
+        """Renew the lease on the partition's backfill shard once a quarter of it has elapsed.
+
+        Raises if the lease has already expired and the shard has been claimed by another worker.
+        """
+        shard = (self._current_shards or {}).get(self._partition_key(partition))
+        if not shard or time.monotonic() - shard["renewed"] < self.shard_ledger.lease_seconds / 4:
+            return
+        if not self.shard_ledger.renew(shard["id"], shard["worker"]):
+            raise RuntimeError(f"Lost the lease on backfill shard {shard['id']}, which another worker has claimed.")
+        shard["renewed"] = time.monotonic()
+
+    def request_shard_records(self, partition: Optional[dict]) -> Iterable[dict]:
+        """Claim the partition's backfill shards from the ledger one at a time, syncing each, until none are left.
+
+        The shard's lease is renewed as its pages are checkpointed. A shard is only marked done once all
+        its rows have been emitted; if the sync fails part way through, the shard is handed back to be
+        claimed again.
+        """
+        if self._current_shards is None:
+            self._current_shards = {}
+        key = self._partition_key(partition)
+        worker_id = default_worker_id()
+        shard_count = 0
+        while True:
+            shard = self.shard_ledger.claim(worker_id, partition)
+            if not shard:
+                break
+            self.logger.info(f"Backfilling shard {shard['id']} ({shard['start']} to {shard['end']}) as {worker_id}.")
+            self._current_shards[key] = {"id": shard["id"], "worker": worker_id, "renewed": time.monotonic()}
+            request_windows = self.get_request_windows(
+                partition, parse_shard_date(shard["start"]), parse_shard_date(shard["end"])
+            )
+            event_count = 0
+            try:
+                for row in self.request_window_sequence(partition, request_windows):
+                    event_count += 1
+                    yield row
+            except BaseException:
+                self.shard_ledger.release(shard["id"], worker_id)
+                raise
+            finally:
+                self._current_shards.pop(key, None)
+            self.shard_ledger.complete(shard["id"], worker_id, event_count)
+            shard_count += 1
+        self.logger.info(f"Backfilled {shard_count} shards of partition {partition}; none left to claim.")
+
+    def log_sync_summary(self, partition: Optional[dict]) -> None:
+        if self.page_cache:
+            self.logger.info(f"Page cache served {self.page_cache.hits} pages ({self.page_cache.misses} misses).")
+        super().log_sync_summary(partition)
+
+    def get_dedup_index_dir(self, partition: Optional[dict]) -> Path:
+        """Return the directory holding the partition's dedup index, shared by its tenant's filter partitions."""
+        index_dir = Path(self.config["dedup_index_path"]) / self.name
+        if (partition or {}).get("tenant"):
+            index_dir = index_dir / partition["tenant"]
+        return index_dir
+
+    def get_dedup_index(self, partition: Optional[dict]) -> Optional[DedupIndex]:
+        """Return the index of already-emitted Ids, or None if deduplication is disabled."""
+        if not self.config.get("dedup_index_path"):
+            return None
+        events_per_hour = self.get_events_per_hour(partition)
+        expected_items_per_day = int(events_per_hour * 24) if events_per_hour else DEFAULT_EVENTS_PER_DAY
+        lookback_days = int(self.config.get("dedup_lookback_days") or 2)
+        if self.lookback:
+            # Re-scanned days must stay indexed, or their unchanged events would be emitted again.
+            lookback_days = max(lookback_days, math.ceil(self.lookback / timedelta(days=1)) + 1)
+            # Each event is indexed by its Id and by its content.
+            expected_items_per_day *= 2
+        return DedupIndex(
+            self.get_dedup_index_dir(partition),
+            memory_bytes=int(float(self.config.get("dedup_memory_mb") or 16) * 1024 * 1024),
+            lookback_days=lookback_days,
+            expected_items_per_day=expected_items_per_day,
+            track_content=bool(self.lookback),
+        )
+
+    @staticmethod
+    def _odata_literal(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    def get_server_filters(self) -> List[str]:
+        """Return the OData `$filter` expressions to request, one per query partition.
+
+        The API only supports `eq` and `and` over `Activity` and `UserId`, so each selected
+        activity/user combination becomes its own filter rather than one `or` expression.
+        """
+        activity_filters = [f"Activity eq {self._odata_literal(a)}" for a in self.config.get("activity_filter") or []]
+        user_filters = [f"UserId eq {self._odata_literal(u)}" for u in self.config.get("user_filter") or []]
+        if activity_filters and user_filters:
+            return [f"{a} and {u}" for a, u in product(activity_filters, user_filters)]
+        return activity_filters or user_filters
+
+    def migrate_unfiltered_bookmark(self, partition: Optional[dict]) -> None:
+        """Start a new filter partition from the bookmark synced before filters were configured.
+
+        Each filter partition keeps its own bookmark, so without this, turning on `activity_filter` or
+        `user_filter` would sync every filter partition from `start_date` again.
+        """
+        if not (partition or {}).get("filter"):
+            return
+        state = self.get_stream_or_partition_state(partition)
+        if state.get("replication_key_value"):
+            return
+        unfiltered_partition = {key: value for key, value in partition.items() if key != "filter"} or None
+        unfiltered_state = get_state_if_exists(self.tap_state, self.name, unfiltered_partition) or {}
+        if unfiltered_state.get("replication_key") != self.replication_key or not unfiltered_state.get("replication_key_value"):
+            return
+        state["replication_key"] = self.replication_key
+        state["replication_key_value"] = unfiltered_state["replication_key_value"]
+        self.logger.info(f"Starting partition {partition} from the unfiltered bookmark {state['replication_key_value']}.")
+
+    @property
+    def partitions(self) -> Optional[List[dict]]:
+        """Return a query partition per tenant and server-side filter, or None to request all events."""
+        server_filters = self.get_server_filters()
+        tenant_partitions = self.get_tenant_partitions()
+        if not server_filters:
+            return tenant_partitions
+        filter_partitions = [{"filter": server_filter} for server_filter in server_filters]
+        if not tenant_partitions:
+            return filter_partitions
+        return [dict(tenant, **server_filter) for tenant, server_filter in product(tenant_partitions, filter_partitions)]
+
+    def get_records(self, partition: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        """Return a generator of row-type dictionary objects, dropping events emitted by earlier runs.
+
+        `workspace_filter` is applied here, since the API cannot filter on workspace.
+        """
+        records = super().get_records(partition)
+        workspace_filter = set(self.config.get("workspace_filter") or [])
+        if workspace_filter:
+            records = (record for record in records if record.get("WorkspaceId") in workspace_filter)
+        dedup_index = self.get_dedup_index(partition)
+        if not dedup_index:
+            yield from records
+            self.save_page_hash_index(partition)
+            return
+        for record in records:
+            record_hash = content_hash(record) if self.lookback else None
+            if dedup_index.add(record["Id"], record["CreationTime"], record_hash):
+                yield record
+        dedup_index.save()
+        self.save_page_hash_index(partition)
+        self.logger.info(
+            f"Dropped {dedup_index.duplicates} previously emitted events "
+            f"(estimated false-positive rate {dedup_index.false_positive_rate:.2e})."
         )
 
     def get_next_page_token(self, response: requests.Response, previous_token: Optional[Any] = None) -> Optional[Any]:
-        """Return token for identifying next page or None if not applicable."""
-        resp_json = response.json()
+        """Return token for identifying next page or None once the request window is exhausted."""
+        metrics = self.metrics
+        started = time.perf_counter() if metrics else None
+        resp_json = self.page_decoder.decode(response)
         continuationToken = resp_json.get("continuationToken")
-        next_page_token = {}
-        if not previous_token:
-            # First time creating a pagination token so we need to record the initial start date.
-            req_url = response.request.url
-            req_params = parse.parse_qs(parse.urlparse(req_url).query)
-            self.logger.debug("Params: {}".format(req_params))
-            latest_url_start_date_param = req_params["startDateTime"][0]
-            next_page_token["urlStartDate"] = datetime.strptime(latest_url_start_date_param, API_DATE_FORMAT)
-        else: 
-            next_page_token["urlStartDate"] = previous_token.get("urlStartDate")
-        if continuationToken:
-            next_page_token["continuationToken"] = requests.utils.unquote(continuationToken)
+        next_page_token = None
+        if not continuationToken:
+            self.logger.debug("No continuationToken found, window starting {} is complete".format(previous_token["urlStartDate"]))
         else:
-            next_page_token["continuationToken"] = None
-            # Now check if we should repeat API call for next day
-            latestUrlStartDate = next_page_token["urlStartDate"]
-            nextUrlStartDate = latestUrlStartDate.replace(hour=0, minute=0, second=0) + timedelta(days=1)
-            self.logger.info("No next page token found, checking if {} is greater than now".format(nextUrlStartDate))
-            if nextUrlStartDate < datetime.utcnow():
-                self.logger.info("{} is less than now, incrementing date by 1 and continuing".format(nextUrlStartDate))
-                next_page_token["urlStartDate"] = nextUrlStartDate
-                self.logger.debug(next_page_token)
-            else:
-                self.logger.info("No continuationToken, and nextUrlStartDate after today, calling it quits")
-                return None
+            next_page_token = {
+                "urlStartDate": previous_token["urlStartDate"],
+                "urlEndDate": previous_token.get("urlEndDate"),
+                "continuationToken": requests.utils.unquote(continuationToken),
+            }
+        if metrics:
+            metrics.observe("pagination_seconds", time.perf_counter() - started, stream=self.name)
         return next_page_token
 
     def parse_response(self, response: requests.Response) -> Iterable[dict]:
         """Parse the response and return an iterator of result rows."""
-        resp_json = response.json()
-        for row in resp_json.get("activityEventEntities"):
-            yield row
+        records = self.page_decoder.iter_records(response, "activityEventEntities")
+        metrics = self.metrics
+        if not metrics:
+            yield from records
+            return
+        yield from metrics.timed_iter(records, "parse_seconds", "records_per_page", stream=self.name)
+        metrics.maybe_export()
 
+class ScannerStream(TapPowerBIMetadataStream):
+    """Base class for inventory streams populated by the shared workspace scan."""
 
-class ActivityEventsStream(TapPowerBIMetadataStream):
-    name = "ActivityEvents"
-    path = "/admin/activityevents"
-    primary_keys = ["Id"]
-    replication_key = "CreationTime"
-    schema = PropertiesList(
-        # Keys
-        Property("Id", StringType, required=True),
-        Property("CreationTime", DateTimeType, required=True),
-        # Properties
-        Property("AccessRequestMessage", StringType),
-        Property("AccessRequestType", StringType),
-        Property("Activity", StringType),
-        Property("ActivityId", StringType),
-        Property(
-            "AggregatedWorkspaceInformation",
-            ObjectType(
-                Property("WorkspaceCount", IntegerType),
-                Property("WorkspacesByCapacitySku", StringType),
-                Property("WorkspacesByType", StringType),
-            )
-        ),
-        Property("AppName", StringType),
-        Property("AppId", StringType),
-        Property("AppReportId", StringType),
-        Property("ArtifactId", StringType),
-        Property("ArtifactKind", StringType),
-        Property("ArtifactName", StringType),
-        Property("ArtifactObjectId", StringType),
-        Property("AuditedArtifactInformation",
-            ObjectType(
-                Property("AnnotatedItemType", StringType),
-                Property("ArtifactObjectId", StringType),
-                Property("Id", StringType),
-                Property("Name", StringType),
-            )
-        ),
-        Property("CapacityId", StringType),
-        Property("CapacityName", StringType),
-        Property("CapacityState", StringType),
-        Property("CapacityUsers", StringType),
-        Property("ClientIP", StringType),
-        Property("ConsumptionMethod", StringType),
-        Property("CopiedReportId", StringType),
-        Property("CopiedReportName", StringType),
-        Property("CredentialSetupMode", StringType),
-        Property("CustomVisualAccessTokenResourceId", StringType),
-        Property("CustomVisualAccessTokenSiteUri", StringType),
-        Property("DashboardId", StringType),
-        Property("DashboardName", StringType),
-        Property("DataConnectivityMode", StringType),
-        Property(
-            "DataflowAccessTokenRequestParameters",
-            ObjectType(
-                Property("entityName", StringType),
-                Property("partitionUri", StringType),
-                Property("permissions", IntegerType),
-                Property("tokenLifetimeInMinutes", IntegerType),
-            )
-        ),
-        Property("DataflowAllowNativeQueries", BooleanType),
-        Property("DataflowId", StringType),
-        Property("DataflowName", StringType),
-        Property("DataflowRefreshScheduleType", StringType),
-        Property("DataflowType", StringType),
-        Property("DatasetCertificationStage", StringType),
-        Property("DatasetId", StringType),
-        Property("DatasetName", StringType),
-        Property(
-            "Datasets",
-            ArrayType(
-                ObjectType(
-                    Property("DatasetId", StringType),
-                    Property("DatasetName", StringType),
-                )
-            )
-        ),
-        Property("DatasourceId", StringType),
-        Property("DatasourceObjectIds", ArrayType(StringType)),
-        Property("Datasources",  
-            ArrayType(
-                ObjectType(
-                    Property("ConnectionDetails", StringType),
-                    Property("DatasourceType", StringType),
-                )
-            )
-        ),
-        Property("DatasourceType", StringType),
-        Property(
-            "DeploymentPipelineAccesses",
-            ArrayType(
-                ObjectType(
-                    Property("RolePermissions", StringType),
-                    Property("UserObjectId", StringType),
-                )
-            )
-        ),
-        Property("DeploymentPipelineDisplayName", StringType),
-        Property("DeploymentPipelineId", IntegerType),
-        Property("DeploymentPipelineObjectId", StringType),
-        Property("DeploymentPipelineStageOrder", IntegerType),
-        Property("DistributionMethod", StringType),
-        Property("EndPoint", StringType),
-        Property("Experience", StringType),
-        Property(
-            "ExportedArtifactInfo",
-            ObjectType(
-                Property("ArtifactId", IntegerType),
-                Property("ArtifactType", StringType),
-                Property("ExportType", StringType),
-            )
-        ),
-        Property("ExportEventActivityTypeParameter", StringType),
-        Property("ExportEventEndDateTimeParameter", DateTimeType),
-        Property("ExportEventStartDateTimeParameter", DateTimeType),
-        Property("ExternalSubscribeeInformation", StringType),
-        Property(
-           "ExternalSubscribeeInformation",
-            ArrayType(
-                ObjectType(
-                    Property("RecipientEmail", StringType),
-                )
-            )
-        ),
-        Property(
-            "FolderAccessRequests",
-            ArrayType(
-                ObjectType(
-                    Property("RolePermissions", StringType),
-                    Property("UserObjectId", StringType),
-                )
-            )
-        ),
-        Property("FolderDisplayName", StringType),
-        Property("FolderObjectId", StringType),
-        Property("GatewayClusterId", StringType),
-        Property(
-            "GatewayClusters",
-            ArrayType(
-                ObjectType(
-                    Property("id", StringType),
-                    Property("memberGatewaysIds", ArrayType(StringType)),
-                    Property(
-                        "permissions",
-                        ArrayType(
-                            ObjectType(
-                                Property("allowedDataSources", ArrayType(StringType)),
-                                Property("id", StringType),
-                                Property("principalType", StringType),
-                                Property("role", StringType),
-                            )
-                        )
-                    ),
-                    Property("type", StringType),
-                )
-            )
-        ),
-        Property("GatewayId", StringType),
-        Property("GatewayMemberId", StringType),
-        Property("GatewayType", StringType),
-        Property(
-            "GenerateScreenshotInformation",
-            ObjectType(
-                Property("ExportFormat", StringType),
-                Property("ExportType", IntegerType),
-                Property("ExportUrl", StringType),
-                Property("ScreenshotEngineType", IntegerType),
-            )
-        ),
-        Property("HasFullReportAttachment", BooleanType),
-        Property("ImportDisplayName", StringType),
-        Property("ImportId", StringType),
-        Property("ImportSource", StringType),
-        Property("ImportType", StringType),
-        Property("InstallTeamsAnalyticsInformation",
-            ObjectType(
-                Property("ModelId", StringType),
-                Property("TenantId", StringType),
-                Property("UserId", StringType),
-            )
-        ),
-        Property("IsSuccess", BooleanType),
-        Property("IsTemplateAppFromMarketplace", BooleanType),
-        Property("IsTenantAdminApi", BooleanType),
-        Property("IsUpdateAppActivity", BooleanType),
-        Property("ItemName", StringType),
-        Property("LastRefreshTime", StringType),
-        Property("MembershipInformation", 
-            ArrayType(
-                ObjectType(
-                    Property("MemberEmail", StringType),
-                )
-            )
-        ),
-        Property("MentionedUsersInformation", StringType),
-        Property("ModelId", StringType),
-        Property("ModelsSnapshots", ArrayType(IntegerType)),
-        Property("Monikers", ArrayType(StringType)),
-        Property("ObjectDisplayName", StringType),
-        Property("ObjectId", StringType),
-        Property("ObjectType", StringType),
-        Property("Operation", StringType),
-        Property("OrganizationId", StringType),
-        Property(
-            "OrgAppPermission",
-            ObjectType(
-                Property("permissions", StringType),
-                Property("recipients", StringType),
-            )
-        ),
-        Property("OriginalOwner", StringType),
-        Property(
-            "PaginatedReportDataSources",
-            ArrayType(
-                ObjectType(
-                    Property("connectionString", StringType),
-                    Property("credentialRetrievalType", StringType),
-                    Property("", StringType),
-                    Property("name", StringType),
-                    Property("provider", StringType),
-                )
-            )
-        ),
-        Property("PinReportToTabInformation", 
-            ObjectType(
-                Property("ChannelId", StringType),
-                Property("ChannelName", StringType),
-                Property("DatasetId", StringType),
-                Property("DatasetName", StringType),
-                Property("ReportId", StringType),
-                Property("ReportName", StringType),
-                Property("TabName", StringType),
-                Property("TeamId", StringType),
-                Property("TeamName", StringType),
-                Property("TeamsAppId", StringType),
-                Property("UserId", StringType),
-            )
-        ),
-        Property("RecordType", IntegerType),
-        Property("RefreshType", StringType),
-        Property("ReportCertificationStage", StringType),
-        Property("ReportId", StringType),
-        Property("ReportName", StringType),
-        Property("ReportType", StringType),
-        Property("RequestId", StringType),
-        Property("ResultStatus", StringType),
-        Property(
-            "Schedules",
-            ObjectType(
-                Property("Days", ArrayType(StringType)),
-                Property("RefreshFrequency", StringType),
-                Property("Time", ArrayType(StringType)),
-                Property("TimeZone", StringType),
-            )
-        ),
-        Property("ShareLinkId", StringType),
-        Property("SharingAction", StringType),
-        Property(
-            "SharingInformation",
-            ArrayType(
-                ObjectType(
-                    Property("RecipientEmail", StringType),
-                    Property("ResharePermission", StringType),
-                )
-            )
-        ),
-        Property("SharingScope", StringType),
-        Property("SwitchState", StringType),
-        Property(
-            "SubscribeeInformation",
-            ArrayType(
-                ObjectType(
-                    Property("ObjectId", StringType),
-                    Property("RecipientEmail", StringType),
-                    Property("RecipientName", StringType),
-                )
-            )
-        ),
-        Property(
-            "SubscriptionSchedule",
-            ObjectType(
-                Property("DaysOfTheMonth",StringType),
-                Property("EndDate", DateTimeType),
-                Property("StartDate", DateTimeType),
-                Property(
-                    "Time",
-                    ArrayType(StringType)
-                ),
-                Property("TimeZone", StringType),
-                Property("Type", StringType),
-                Property(
-                    "WeekDays",
-                    ArrayType(StringType)
-                ),
-            )
-        ),
-        Property("TableName", StringType),
-        Property("TakingOverOwner", StringType),
-        Property("TargetWorkspaceId", StringType),
-        Property("TemplateAppFolderObjectId", StringType),
-        Property("TemplateAppIsInstalledWithAutomation", BooleanType),
-        Property("TemplateAppObjectId", StringType),
-        Property("TemplateAppOwnerTenantObjectId", StringType),
-        Property("TemplateAppVersion", StringType),
-        Property("TemplatePackageName", StringType),
-        Property("TileText", StringType),
-        Property(
-            "UpdateFeaturedTables",
-            ArrayType(
-                ObjectType(
-                    Property("State", StringType),
-                    Property("TableName", StringType),
-                )
-            )
-        ),
-        Property("UserAgent", StringType),
-        Property("UserId", StringType),
-        Property(
-            "UserInformation",
-            ObjectType(
-                Property(
-                    "UsersAdded",
-                    ArrayType(StringType)
-                ),
-                Property(
-                    "UsersRemoved",
-                    ArrayType(StringType)
-                ),
-            )
-        ),
-        Property("UserKey", StringType),
-        Property("UserType", IntegerType),
-        Property("Workload", StringType),
-        Property(
-            "WorkspaceAccessList", 
-            ArrayType(
-                ObjectType(
-                    Property(
-                        "UserAccessList",
-                        ArrayType(
-                            ObjectType(
-                                Property("GroupUserAccessRight", StringType),
-                                Property("Identifier", StringType),
-                                Property("PrincipalType", StringType),
-                                Property("UserEmailAddress", StringType),
-                            )
-                        ),
-                    ),
-                    Property("WorkspaceId", StringType),
-                )
+    path = "/admin/workspaces/scanResult"
+    scan_entity_type: str = ""
+
+    tenant_property = "tenantId"
+
+    # Set by the tap so that a single scan per tenant feeds every inventory stream, and the scanned
+    # workspace index is always kept in the state of the same stream (`Workspaces`).
+    shared_workspace_scanners: Optional[Dict[str, WorkspaceScanner]] = None
+    workspace_index_stream: Optional["ScannerStream"] = None
+    inventory_streams: Optional[List["ScannerStream"]] = None
+
+    @property
+    def selected(self) -> bool:
+        """Return whether the stream is selected. Without an input catalog, inventory streams are not."""
+        return bool(self._tap_input_catalog) and super().selected
+
+    @property
+    def _singer_metadata(self) -> List[dict]:
+        """Return the stream's metadata, deselected by default since a scan covers the whole tenant."""
+        stream_metadata = super()._singer_metadata
+        if not self._tap_input_catalog:
+            for entry in stream_metadata:
+                if not entry["breadcrumb"]:
+                    entry["metadata"].update({"selected-by-default": False, "selected": False})
+        return stream_metadata
+
+    def get_workspace_scanner(self, partition: Optional[dict]) -> WorkspaceScanner:
+        """Return the partition's tenant's workspace scanner."""
+        if self.shared_workspace_scanners is None:
+            self.shared_workspace_scanners = {}
+        tenant_id = self.get_tenant(partition)["tenant_id"]
+        if tenant_id not in self.shared_workspace_scanners:
+            incremental = self.config.get("incremental_inventory")
+            self.shared_workspace_scanners[tenant_id] = WorkspaceScanner(
+                self,
+                max_concurrent_scans=int(self.config.get("max_concurrent_scans") or 16),
+                exclude_personal_workspaces=bool(self.config.get("exclude_personal_workspaces")),
+                modified_since=self.get_inventory_modified_since(partition) if incremental else None,
+                indexed_ids=self.get_indexed_workspace_ids(partition) if incremental else None,
+                partition=partition,
             )
-        ),
-        Property("WorkspaceId", StringType),
-        Property("WorkSpaceName", StringType),
-        Property("WorkspacesSemicolonDelimitedList", StringType),
-    ).to_dict()
+        return self.shared_workspace_scanners[tenant_id]
+
+    def get_inventory_modified_since(self, partition: Optional[dict]) -> Optional[str]:
+        """Return the last scan every selected inventory stream has emitted, or None if one has not."""
+        scan_times = [
+            stream.get_stream_or_partition_state(partition).get("lastScanTime")
+            for stream in self.inventory_streams or [self]
+            if stream.selected
+        ]
+        if not scan_times or not all(scan_times):
+            self.logger.info("Not every selected inventory stream has emitted a scan yet, scanning every workspace.")
+            return None
+        # Scan times are fixed-width UTC timestamps, so they sort chronologically.
+        return min(scan_times)
+
+    def get_indexed_workspace_ids(self, partition: Optional[dict]) -> Optional[List[str]]:
+        """Return the ids of the workspaces listed by the last scan `Workspaces` emitted, if any."""
+        index_state = (self.workspace_index_stream or self).get_stream_or_partition_state(partition)
+        if "workspaceIds" in index_state:
+            return index_state["workspaceIds"]
+        # Earlier versions kept each workspace's scan time in a `workspaces` mapping.
+        return list(index_state["workspaces"]) if "workspaces" in index_state else None
+
+    def save_scan_cursor(self, partition: Optional[dict], workspace_scanner: WorkspaceScanner) -> None:
+        """Record in state that the stream has emitted the scan, so the next incremental scan can start from it.
+
+        Each stream keeps its own cursor, saved only once its records are emitted, so a run which fails
+        part way through never skips workspaces for the streams which did not finish.
+        """
+        if not self.config.get("incremental_inventory") or not workspace_scanner.scan_time:
+            return
+        state = self.get_stream_or_partition_state(partition)
+        state["lastScanTime"] = workspace_scanner.scan_time
+        if self is self.workspace_index_stream and workspace_scanner.workspace_ids is not None:
+            # Deleted workspaces have been emitted too, so they can leave the index.
+            state["workspaceIds"] = sorted(workspace_scanner.workspace_ids)
+            state.pop("workspaces", None)
+
+    def request_records(self, partition: Optional[dict]) -> Iterable[dict]:
+        workspace_scanner = self.get_workspace_scanner(partition)
+        workspace_scanner.run()
+        yield from workspace_scanner.iter_entities(self.scan_entity_type)
+        self.save_scan_cursor(partition, workspace_scanner)
+
+    def get_records(self, partition: Optional[dict]) -> Iterable[Dict[str, Any]]:
+        for row in self.request_records(partition):
+            yield self.post_process(row, partition)
+        self.log_sync_summary(partition)
+
+
+class WorkspacesStream(ScannerStream):
+    name = "Workspaces"
+    scan_entity_type = "workspaces"
+    primary_keys = ["id"]
+    replication_key = None
+
+
+class DatasetsStream(ScannerStream):
+    name = "Datasets"
+    scan_entity_type = "datasets"
+    primary_keys = ["id"]
+    replication_key = None
+
+
+class ReportsStream(ScannerStream):
+    name = "Reports"
+    scan_entity_type = "reports"
+    primary_keys = ["id"]
+    replication_key = None
+
+
+class DashboardsStream(ScannerStream):
+    name = "Dashboards"
+    scan_entity_type = "dashboards"
+    primary_keys = ["id"]
+    replication_key = None
+
+
+class DataflowsStream(ScannerStream):
+    name = "Dataflows"
+    scan_entity_type = "dataflows"
+    primary_keys = ["objectId"]
+    replication_key = None
@@ -4,21 +4,38 @@ from pathlib import Path
 from typing import List
 from singer_sdk import Tap, Stream
 from singer_sdk.typing import (
+    ArrayType,
+    BooleanType,
     DateTimeType,
+    IntegerType,
+    NumberType,
+    ObjectType,
     PropertiesList,
     Property,
     StringType,
 )
 
 from tap_powerbi_metadata.streams import (
+    TENANT_CREDENTIAL_KEYS,
     TapPowerBIMetadataStream,
     ActivityEventsStream,
+    DashboardsStream,
+    DataflowsStream,
+    DatasetsStream,
+    ReportsStream,
+    ScannerStream,
+    WorkspacesStream,
 )
 
 PLUGIN_NAME = "tap-powerbi-metadata"
 
 STREAM_TYPES = [
     ActivityEventsStream,
+    WorkspacesStream,
+    DatasetsStream,
+    ReportsStream,
+    DashboardsStream,
+    DataflowsStream,
 ]
 
 
@@ -27,16 +44,89 @@ class TapPowerBIMetadata(Tap):
 
     name = "tap-powerbi-metadata"
     config_jsonschema = PropertiesList(
-        Property("tenant_id", StringType, required=True),
-        Property("client_id", StringType, required=True),
-        Property("username", StringType, required=True),
-        Property("password", StringType, required=True),
+        Property("tenant_id", StringType),
+        Property("client_id", StringType),
+        Property("username", StringType),
+        Property("password", StringType),
+        Property(
+            "tenants",
+            ArrayType(
+                ObjectType(
+                    Property("tenant_id", StringType, required=True),
+                    Property("client_id", StringType, required=True),
+                    Property("username", StringType, required=True),
+                    Property("password", StringType, required=True),
+                )
+            ),
+        ),
+        Property("tenant_concurrency", IntegerType),
         Property("start_date", DateTimeType),
+        Property("api_url", StringType),
+        Property("auth_url", StringType),
+        Property("token_cache_path", StringType),
+        Property("max_workers", IntegerType),
+        Property("prefetch_pages", IntegerType),
+        Property("window_target_events", IntegerType),
+        Property("min_window_minutes", IntegerType),
+        Property("incremental_decoding", BooleanType),
+        Property("async_requests", BooleanType),
+        Property("max_connections", IntegerType),
+        Property("max_requests_per_minute", NumberType),
+        Property("activity_filter", ArrayType(StringType)),
+        Property("user_filter", ArrayType(StringType)),
+        Property("workspace_filter", ArrayType(StringType)),
+        Property("page_cache_path", StringType),
+        Property("page_cache_mode", StringType),
+        Property("page_cache_closed_after_hours", NumberType),
+        Property("page_cache_max_mb", NumberType),
+        Property("page_cache_ttl_days", NumberType),
+        Property("dedup_index_path", StringType),
+        Property("batch_output_path", StringType),
+        Property("batch_format", StringType),
+        Property("batch_max_mb", NumberType),
+        Property("backfill_ledger_path", StringType),
+        Property("backfill_lease_minutes", NumberType),
+        Property("compiled_conformer", BooleanType),
+        Property("metrics", BooleanType),
+        Property("metrics_log_interval_seconds", NumberType),
+        Property("metrics_textfile_path", StringType),
+        Property("max_concurrent_scans", IntegerType),
+        Property("exclude_personal_workspaces", BooleanType),
+        Property("incremental_inventory", BooleanType),
+        Property("dedup_memory_mb", NumberType),
+        Property("dedup_lookback_days", IntegerType),
+        Property("lookback_hours", NumberType),
     ).to_dict()
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        if not self.config.get("tenants"):
+            missing = [key for key in TENANT_CREDENTIAL_KEYS if not self.config.get(key)]
+            if missing:
+                raise ValueError(f"Missing config: {', '.join(missing)}. Set these or the `tenants` list.")
+        if self.config.get("lookback_hours") and not self.config.get("dedup_index_path"):
+            self.logger.warning(
+                "`lookback_hours` is set without `dedup_index_path`, so every re-scanned event will be emitted again "
+                "on each run. Set `dedup_index_path` to emit only new or changed events."
+            )
+
     def discover_streams(self) -> List[Stream]:
         """Return a list of discovered streams."""
-        return [stream_class(tap=self) for stream_class in STREAM_TYPES]
+        streams = [stream_class(tap=self) for stream_class in STREAM_TYPES]
+        shared_authenticators: dict = {}
+        shared_rate_controllers: dict = {}
+        shared_metrics = streams[0].metrics
+        scanner_streams = [stream for stream in streams if isinstance(stream, ScannerStream)]
+        shared_workspace_scanners: dict = {}
+        for stream in streams:
+            stream.shared_authenticators = shared_authenticators
+            stream.shared_rate_controllers = shared_rate_controllers
+            stream.shared_metrics = shared_metrics
+        for stream in scanner_streams:
+            stream.shared_workspace_scanners = shared_workspace_scanners
+            stream.workspace_index_stream = scanner_streams[0]
+            stream.inventory_streams = scanner_streams
+        return streams
 
 
 # CLI Execution:
@@ -0,0 +1,138 @@
+"""Throughput benchmark for `ActivityEventsStream` against the local mock Power BI server.
+
+Each scenario runs a full sync in a fresh process, so peak RSS is measured per scenario, and
+reports records/sec, requests/sec, peak RSS and end-to-end wall time:
+
+    python tap_powerbi_metadata/tests/benchmark_activity_events.py --days 7 --events-per-day 20000 --latency 0.05
+
+Judge performance changes by comparing these numbers before and after.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tap_powerbi_metadata.tests.conftest import get_mock_config  # noqa: E402
+from tap_powerbi_metadata.tests.mock_powerbi import MockPowerBIServer, MockPowerBISettings  # noqa: E402
+
+SCENARIOS = {
+    "serial": {},
+    "threaded": {"max_workers": 4},
+    "threaded-split": {"max_workers": 4, "window_target_events": 5000},
+    "async": {"async_requests": True, "max_workers": 8, "max_connections": 8},
+    "compiled-conformer": {"compiled_conformer": True},
+    "prefetch": {"prefetch_pages": 4},
+    "metrics": {"metrics": True},
+}
+
+
+class RecordCounter(io.TextIOBase):
+    """Stand-in for stdout which counts Singer RECORD messages instead of printing them."""
+
+    def __init__(self) -> None:
+        self.records = 0
+        self.bytes = 0
+
+    def write(self, text: str) -> int:
+        self.records += text.count('"type": "RECORD"')
+        self.bytes += len(text)
+        return len(text)
+
+
+def _serve(settings: MockPowerBISettings, port_queue: multiprocessing.Queue) -> None:
+    server = MockPowerBIServer(("127.0.0.1", 0), settings)
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def _run_scenario(config: dict, result_queue: multiprocessing.Queue) -> None:
+    from tap_powerbi_metadata.tap import TapPowerBIMetadata
+
+    counter = RecordCounter()
+    stdout, sys.stdout = sys.stdout, counter
+    try:
+        started = time.perf_counter()
+        TapPowerBIMetadata(config=config).sync_all()
+        wall_time = time.perf_counter() - started
+    finally:
+        sys.stdout = stdout
+    result_queue.put({
+        "records": counter.records,
+        "output_bytes": counter.bytes,
+        "wall_time": wall_time,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def run_benchmark(args: argparse.Namespace) -> list:
+    settings = MockPowerBISettings(
+        events_per_day=args.events_per_day,
+        page_size=args.page_size,
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+    )
+    port_queue = multiprocessing.Queue()
+    server_process = multiprocessing.Process(target=_serve, args=(settings, port_queue), daemon=True)
+    server_process.start()
+    base_url = f"http://127.0.0.1:{port_queue.get()}"
+    results = []
+    try:
+        for scenario in args.scenario or list(SCENARIOS):
+            before = json.load(urllib.request.urlopen(f"{base_url}/stats"))
+            config = dict(get_mock_config(base_url, args.days), **SCENARIOS[scenario])
+            result_queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=_run_scenario, args=(config, result_queue))
+            process.start()
+            result = result_queue.get()
+            process.join()
+            after = json.load(urllib.request.urlopen(f"{base_url}/stats"))
+            requests_made = after["event_requests"] - before["event_requests"]
+            result.update({
+                "scenario": scenario,
+                "requests": requests_made,
+                "throttled": after["throttled_requests"] - before["throttled_requests"],
+                "records_per_sec": result["records"] / result["wall_time"],
+                "requests_per_sec": requests_made / result["wall_time"],
+            })
+            results.append(result)
+    finally:
+        server_process.terminate()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--events-per-day", type=int, default=10000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    parser.add_argument("--json", action="store_true", help="Print results as JSON lines.")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    print(f"{'scenario':<16}{'records':>10}{'wall s':>10}{'rec/s':>12}{'req':>8}{'req/s':>10}{'429s':>7}{'RSS MB':>9}")
+    for r in results:
+        print(
+            f"{r['scenario']:<16}{r['records']:>10}{r['wall_time']:>10.2f}{r['records_per_sec']:>12.0f}"
+            f"{r['requests']:>8}{r['requests_per_sec']:>10.1f}{r['throttled']:>7}{r['peak_rss_mb']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
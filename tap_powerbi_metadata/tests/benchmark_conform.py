@@ -0,0 +1,66 @@
+"""Microbenchmark of record conformance for the `ActivityEvents` schema.
+
+Compares the SDK's conformance (dropping deselected properties, then `conform_record_data_types`,
+as `Stream._write_record_message` does for every record) against the conformer compiled by
+`compile_conformer`, and reports records/sec for each:
+
+    python tap_powerbi_metadata/tests/benchmark_conform.py --records 200000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from singer_sdk.helpers._catalog import pop_deselected_record_properties
+from singer_sdk.helpers._typing import conform_record_data_types
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tap_powerbi_metadata.conform import compile_conformer  # noqa: E402
+from tap_powerbi_metadata.tap import TapPowerBIMetadata  # noqa: E402
+from tap_powerbi_metadata.tests.conftest import CREDENTIALS  # noqa: E402
+from tap_powerbi_metadata.tests.mock_powerbi import generate_event  # noqa: E402
+
+
+def sdk_conformer(stream):
+    """Return a function conforming records the way the SDK does when writing RECORD messages."""
+    catalog = stream._singer_catalog.to_dict()
+    logger = logging.getLogger("benchmark_conform")
+
+    def conform(record: dict) -> dict:
+        pop_deselected_record_properties(record, catalog, stream.name, logger)
+        return conform_record_data_types(stream.name, record, stream.schema, logger)
+
+    return conform
+
+
+def measure(conform, records: list) -> float:
+    started = time.perf_counter()
+    for record in records:
+        conform(record)
+    return len(records) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000)
+    args = parser.parse_args()
+
+    stream = TapPowerBIMetadata(config=CREDENTIALS).streams["ActivityEvents"]
+    day = datetime(2021, 3, 1)
+    records = [generate_event(day, index, args.records) for index in range(args.records)]
+    results = {
+        "sdk": measure(sdk_conformer(stream), records),
+        "compiled": measure(compile_conformer(stream.schema, stream.is_property_selected), records),
+    }
+    print(f"{'conformer':<16}{'rec/s':>12}")
+    for name, records_per_sec in results.items():
+        print(f"{name:<16}{records_per_sec:>12.0f}")
+    print(f"speedup: {results['compiled'] / results['sdk']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
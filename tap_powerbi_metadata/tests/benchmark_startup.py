@@ -0,0 +1,61 @@
+"""Startup-time benchmark for the tap CLI.
+
+Times `--about`, `--discover` and an empty incremental sync of `ActivityEvents` (against the local
+mock server, with no events to emit), each in a fresh interpreter, and reports the median wall time:
+
+    python tap_powerbi_metadata/tests/benchmark_startup.py --runs 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from tap_powerbi_metadata.tests.conftest import get_mock_config  # noqa: E402
+from tap_powerbi_metadata.tests.mock_powerbi import MockPowerBIServer, MockPowerBISettings  # noqa: E402
+
+CLI = [sys.executable, "-c", "from tap_powerbi_metadata.tap import cli; cli()"]
+
+
+def time_command(args: list, runs: int) -> float:
+    """Return the median wall time of running the tap CLI with `args`."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(CLI + args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server = MockPowerBIServer(("127.0.0.1", 0), MockPowerBISettings(events_per_day=0))
+    server.start_in_thread()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config_path = Path(tmp_dir) / "config.json"
+        config_path.write_text(json.dumps(get_mock_config(server.base_url, days=1)))
+        discovered = subprocess.run(CLI + ["--config", str(config_path), "--discover"], check=True, capture_output=True)
+        catalog_path = Path(tmp_dir) / "catalog.json"
+        catalog_path.write_text(discovered.stdout.decode())
+        results = {
+            "about": time_command(["--about"], args.runs),
+            "discover": time_command(["--config", str(config_path), "--discover"], args.runs),
+            "empty sync": time_command(["--config", str(config_path), "--catalog", str(catalog_path)], args.runs),
+        }
+    server.shutdown()
+    print(f"{'command':<16}{'median s':>10}")
+    for command, seconds in results.items():
+        print(f"{command:<16}{seconds:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
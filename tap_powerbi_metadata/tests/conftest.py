@@ -0,0 +1,46 @@
+"""Helpers shared by the tap's tests and benchmarks."""
+
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.mock_powerbi import MockPowerBIServer, MockPowerBISettings
+
+CREDENTIALS = {"tenant_id": "tenant", "client_id": "client", "username": "user@example.com", "password": "password"}
+
+
+def get_stream(state: Optional[dict] = None, **config):
+    """Return the `ActivityEvents` stream of a tap configured with test credentials and `config`."""
+    return TapPowerBIMetadata(config=dict(CREDENTIALS, **config), state=state).streams["ActivityEvents"]
+
+
+def get_mock_config(base_url: str, days: int) -> dict:
+    """Return a config syncing the last `days` days from the mock server at `base_url`."""
+    start_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    return {
+        "tenant_id": "mock-tenant",
+        "client_id": "mock-client",
+        "username": "user@example.com",
+        "password": "mock-password",
+        "start_date": start_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "api_url": f"{base_url}/v1.0/myorg",
+        "auth_url": base_url,
+    }
+
+
+@contextmanager
+def run_mock_server(**settings) -> Iterator[MockPowerBIServer]:
+    """Serve the mock Power BI API on a free local port for the duration of the block."""
+    server = MockPowerBIServer(("127.0.0.1", 0), MockPowerBISettings(**settings))
+    server.start_in_thread()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+
+
+def read_messages(capsys) -> list:
+    """Return the Singer messages written to stdout since the last read."""
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines() if line.startswith("{")]
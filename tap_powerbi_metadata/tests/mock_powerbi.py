@@ -0,0 +1,286 @@
+"""A local stand-in for the Azure AD login, Power BI activity events and workspace scanner endpoints.
+
+Events are generated deterministically, `events_per_day` per UTC day and spread evenly across the
+day, so results can be compared between runs. Every response can be delayed by `latency`
+seconds, and every `throttle_every`-th request is answered with `429 Too Many Requests`. The
+`fail_on_request`-th request fails with `500`, to interrupt a sync, and `expire_continuation_tokens`
+makes the server reject every continuationToken issued so far, as the real API does once they expire.
+
+The scanner endpoints serve the workspaces in `WORKSPACES`, each holding one dataset, report,
+dashboard and dataflow. Scans succeed on the first `scanStatus` poll, and no workspace is ever
+reported as modified since a previous scan.
+
+Run standalone with:
+
+    python tap_powerbi_metadata/tests/mock_powerbi.py --port 8765 --events-per-day 20000
+"""
+
+import argparse
+import base64
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib import parse
+
+ACTIVITIES = ["ViewReport", "ViewDashboard", "ExportReport", "GetSnapshots", "CreateReport"]
+USERS = [f"user{i}@example.com" for i in range(10)]
+WORKSPACES = [f"00000000-0000-0000-0000-{i:012d}" for i in range(5)]
+API_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+FILTER_TERM = re.compile(r"(Activity|UserId) eq '((?:[^']|'')*)'")
+
+
+class MockPowerBISettings:
+    """Shape of the data served by the mock, and how it misbehaves."""
+
+    def __init__(
+        self,
+        events_per_day: int = 1000,
+        page_size: int = 500,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: float = 1.0,
+        fail_on_request: int = 0,
+    ) -> None:
+        self.events_per_day = events_per_day
+        self.page_size = page_size
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.fail_on_request = fail_on_request
+
+
+class MockPowerBIServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server serving the mock endpoints, with request counters."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, settings: MockPowerBISettings) -> None:
+        super().__init__(server_address, MockPowerBIHandler)
+        self.settings = settings
+        self.stats = {
+            "token_requests": 0,
+            "event_requests": 0,
+            "throttled_requests": 0,
+            "events_served": 0,
+            "scan_requests": 0,
+            "workspaces_scanned": 0,
+        }
+        self.scans = {}
+        # Continuation tokens carry the generation they were issued in, and earlier generations are rejected.
+        self.token_generation = 0
+        self._stats_lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, increment: int = 1) -> int:
+        with self._stats_lock:
+            self.stats[key] += increment
+            return self.stats[key]
+
+    def expire_continuation_tokens(self) -> None:
+        with self._stats_lock:
+            self.token_generation += 1
+
+    def add_scan(self, workspace_ids: list) -> str:
+        """Record a workspace scan and return its id."""
+        with self._stats_lock:
+            self.stats["scan_requests"] += 1
+            self.stats["workspaces_scanned"] += len(workspace_ids)
+            scan_id = f"scan-{self.stats['scan_requests']:04d}"
+            self.scans[scan_id] = workspace_ids
+        return scan_id
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+def generate_event(day: datetime, index: int, events_per_day: int) -> dict:
+    creation_time = day + timedelta(seconds=index * 86400 // events_per_day)
+    return {
+        "Id": f"{day:%Y%m%d}-{index:08d}",
+        "CreationTime": creation_time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "Activity": ACTIVITIES[index % len(ACTIVITIES)],
+        "UserId": USERS[index % len(USERS)],
+        "WorkspaceId": WORKSPACES[index % len(WORKSPACES)],
+        "RecordType": 20,
+        "IsSuccess": True,
+        "Datasets": [{"DatasetId": f"dataset-{index % 7}", "DatasetName": f"Dataset {index % 7}"}],
+    }
+
+
+def generate_workspace(workspace_id: str) -> dict:
+    """Return a workspace's scan result, with one entity of each scanned type."""
+    return {
+        "id": workspace_id,
+        "name": f"Workspace {workspace_id[-4:]}",
+        "type": "Workspace",
+        "state": "Active",
+        "isOnDedicatedCapacity": False,
+        "datasets": [{"id": f"dataset-{workspace_id}", "name": "Dataset", "configuredBy": USERS[0]}],
+        "reports": [{"id": f"report-{workspace_id}", "name": "Report", "datasetId": f"dataset-{workspace_id}"}],
+        "dashboards": [{"id": f"dashboard-{workspace_id}", "displayName": "Dashboard", "isReadOnly": False}],
+        "dataflows": [{"objectId": f"dataflow-{workspace_id}", "name": "Dataflow", "configuredBy": USERS[0]}],
+    }
+
+
+def matches_filter(event: dict, odata_filter: str) -> bool:
+    for field, value in FILTER_TERM.findall(odata_filter or ""):
+        if event[field] != value.replace("''", "'"):
+            return False
+    return True
+
+
+class MockPowerBIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        url = parse.urlparse(self.path)
+        if url.path.endswith("/admin/workspaces/getInfo"):
+            self._start_scan(json.loads(body)["workspaces"])
+            return
+        if not url.path.endswith("/oauth2/token"):
+            self._send_json(404, {"error": "not found"})
+            return
+        self.server.count("token_requests")
+        self._send_json(200, {"access_token": "mock-token", "token_type": "Bearer", "expires_in": "3599"})
+
+    def _start_scan(self, workspace_ids: list) -> None:
+        self._send_json(202, {"id": self.server.add_scan(workspace_ids), "status": "NotStarted"})
+
+    def _get_scanner_response(self, url: parse.ParseResult):
+        """Return the status and body of a scanner API request, or None if `url` is not a scanner endpoint."""
+        if url.path.endswith("/admin/workspaces/modified"):
+            params = parse.parse_qs(url.query)
+            if "modifiedSince" in params:
+                return 200, []
+            return 200, [{"id": workspace_id} for workspace_id in WORKSPACES]
+        match = re.search(r"/admin/workspaces/(scanStatus|scanResult)/([^/]+)$", url.path)
+        if not match:
+            return None
+        endpoint, scan_id = match.groups()
+        if scan_id not in self.server.scans:
+            return 404, {"error": "scan not found"}
+        if endpoint == "scanStatus":
+            return 200, {"id": scan_id, "status": "Succeeded"}
+        return 200, {"workspaces": [generate_workspace(workspace_id) for workspace_id in self.server.scans[scan_id]]}
+
+    def do_GET(self) -> None:
+        url = parse.urlparse(self.path)
+        if url.path == "/stats":
+            self._send_json(200, self.server.stats)
+            return
+        scanner_response = self._get_scanner_response(url)
+        if scanner_response:
+            self._send_json(*scanner_response)
+            return
+        if not url.path.endswith("/admin/activityevents"):
+            self._send_json(404, {"error": "not found"})
+            return
+        settings = self.server.settings
+        request_number = self.server.count("event_requests")
+        if settings.latency:
+            time.sleep(settings.latency)
+        if settings.throttle_every and request_number % settings.throttle_every == 0:
+            self.server.count("throttled_requests")
+            self._send_json(429, {"error": "throttled"}, {"Retry-After": str(settings.retry_after)})
+            return
+        if request_number == settings.fail_on_request:
+            self._send_json(500, {"error": "injected failure"})
+            return
+        params = {key: values[0] for key, values in parse.parse_qs(url.query).items()}
+        # Dates and continuation tokens are sent quoted, but quotes inside `$filter` are part of the expression.
+        params.update({key: value.strip("'") for key, value in params.items() if key != "$filter"})
+        if "continuationToken" in params:
+            cursor = json.loads(base64.urlsafe_b64decode(params["continuationToken"]))
+            if cursor["generation"] != self.server.token_generation:
+                self._send_json(400, {"error": {"code": "InvalidRequest", "message": "ContinuationToken expired"}})
+                return
+        else:
+            cursor = {
+                "start": params["startDateTime"],
+                "end": params["endDateTime"],
+                "filter": params.get("$filter"),
+                "offset": 0,
+            }
+        self._send_json(200, self._get_page(cursor))
+
+    def _get_page(self, cursor: dict) -> dict:
+        settings = self.server.settings
+        events_per_day = settings.events_per_day
+        start = datetime.strptime(cursor["start"], API_DATE_FORMAT)
+        end = datetime.strptime(cursor["end"], API_DATE_FORMAT)
+        day = start.replace(hour=0, minute=0, second=0)
+        start_second = int((start - day).total_seconds())
+        end_second = int((end - day).total_seconds())
+        # Invert the even spacing of generate_event to find the events inside the window.
+        first_index = -(-start_second * events_per_day // 86400)
+        last_index = min(((end_second + 1) * events_per_day - 1) // 86400, events_per_day - 1)
+        offset = cursor["offset"]
+        if cursor["filter"]:
+            events = [
+                event
+                for event in (generate_event(day, i, events_per_day) for i in range(first_index, last_index + 1))
+                if matches_filter(event, cursor["filter"])
+            ]
+            total = len(events)
+            page = events[offset:offset + settings.page_size]
+        else:
+            total = max(last_index - first_index + 1, 0)
+            page_indices = range(first_index + offset, min(first_index + offset + settings.page_size, last_index + 1))
+            page = [generate_event(day, i, events_per_day) for i in page_indices]
+        self.server.count("events_served", len(page))
+        last_result_set = offset + settings.page_size >= total
+        body = {"activityEventEntities": page, "lastResultSet": last_result_set, "continuationToken": None}
+        if not last_result_set:
+            next_cursor = dict(cursor, offset=offset + settings.page_size, generation=self.server.token_generation)
+            body["continuationToken"] = base64.urlsafe_b64encode(json.dumps(next_cursor).encode("utf-8")).decode("ascii")
+        return body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--events-per-day", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--throttle-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+    settings = MockPowerBISettings(
+        events_per_day=args.events_per_day,
+        page_size=args.page_size,
+        latency=args.latency,
+        throttle_every=args.throttle_every,
+        retry_after=args.retry_after,
+    )
+    server = MockPowerBIServer((args.host, args.port), settings)
+    print(f"Serving mock Power BI endpoints on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
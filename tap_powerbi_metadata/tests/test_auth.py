@@ -0,0 +1,58 @@
+"""Tests for the OAuth token refresh and its on-disk token cache."""
+
+import json
+import time
+
+import pytest
+from singer_sdk.authenticators import OAuthAuthenticator
+
+from tap_powerbi_metadata.auth import TOKEN_REFRESH_MARGIN_SECONDS
+from tap_powerbi_metadata.tests.conftest import get_stream
+
+
+@pytest.fixture
+def password_grants(monkeypatch) -> list:
+    """Replace the password grant with one issuing numbered tokens, and return the tokens issued."""
+    issued = []
+
+    def update_access_token(self):
+        issued.append(f"token-{len(issued) + 1}")
+        self.access_token = issued[-1]
+        self.expires_in = 3600
+
+    monkeypatch.setattr(OAuthAuthenticator, "update_access_token", update_access_token)
+    return issued
+
+
+def get_authenticator(cache_path):
+    return get_stream(token_cache_path=str(cache_path)).get_authenticator(None)
+
+
+def test_cached_token_is_reused_by_the_next_run(tmp_path, password_grants):
+    cache_path = tmp_path / "tokens.json"
+    assert get_authenticator(cache_path).auth_headers == {"Authorization": "Bearer token-1"}
+    assert get_authenticator(cache_path).auth_headers == {"Authorization": "Bearer token-1"}
+    assert password_grants == ["token-1"]
+    assert [path.name for path in tmp_path.iterdir()] == ["tokens.json"]
+
+
+def test_token_is_refreshed_before_it_expires(tmp_path, password_grants):
+    cache_path = tmp_path / "tokens.json"
+    authenticator = get_authenticator(cache_path)
+    authenticator.auth_headers
+    # Within the refresh margin, both the in-memory and the cached token count as expired.
+    authenticator._token_expires_at = time.time() + TOKEN_REFRESH_MARGIN_SECONDS / 2
+    authenticator._store_cached_token()
+    assert authenticator.auth_headers == {"Authorization": "Bearer token-2"}
+    cached = json.loads(cache_path.read_text())[authenticator.token_cache_key]
+    assert cached["access_token"] == "token-2"
+    assert cached["expires_at"] > time.time() + 3000
+
+
+@pytest.mark.parametrize("contents", ["{not json", "[]", '{"key": "value"}', '{"key": {"access_token": "t"}}'])
+def test_corrupt_cache_file_is_replaced(tmp_path, password_grants, contents):
+    cache_path = tmp_path / "tokens.json"
+    cache_path.write_text(contents)
+    authenticator = get_authenticator(cache_path)
+    assert authenticator.auth_headers == {"Authorization": "Bearer token-1"}
+    assert list(json.loads(cache_path.read_text())) == [authenticator.token_cache_key]
@@ -0,0 +1,91 @@
+"""Tests for the sharded backfill planner and shard ledger."""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from tap_powerbi_metadata.backfill import SHARD_DONE, ShardLedger, merge_ledger_state, plan_shards
+
+
+def test_shards_split_days_and_partitions():
+    """Shards never cross midnight, and each time range is planned once per partition."""
+    shards = plan_shards(datetime(2021, 3, 1, 18), datetime(2021, 3, 2, 12), [{"tenant": "a"}, {"tenant": "b"}], 8)
+    ranges = sorted({(shard["start"], shard["end"]) for shard in shards})
+    assert ranges == [
+        ("2021-03-01T18:00:00", "2021-03-02T00:00:00"),
+        ("2021-03-02T00:00:00", "2021-03-02T08:00:00"),
+        ("2021-03-02T08:00:00", "2021-03-02T12:00:00"),
+    ]
+    assert len(shards) == 6
+    assert [shard["id"] for shard in shards] == list(range(6))
+
+
+def test_concurrent_workers_claim_each_shard_once(tmp_path):
+    """Workers racing on the ledger each get distinct shards, and every shard is claimed."""
+    ledger = ShardLedger(tmp_path / "shards.json")
+    ledger.create("ActivityEvents", plan_shards(datetime(2021, 3, 1), datetime(2021, 3, 11)))
+    claimed = []
+
+    def work(worker_id):
+        while True:
+            shard = ledger.claim(worker_id)
+            if not shard:
+                return
+            claimed.append(shard["id"])
+            ledger.complete(shard["id"], worker_id, events=10)
+
+    workers = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(claimed) == list(range(10))
+    assert ledger.summary() == {"pending": 0, "claimed": 0, "done": 10}
+
+
+def test_abandoned_shard_is_reclaimed_after_its_lease(tmp_path):
+    """A claimed shard is only handed to another worker once its lease has expired."""
+    ledger = ShardLedger(tmp_path / "shards.json", lease_seconds=3600)
+    ledger.create("ActivityEvents", plan_shards(datetime(2021, 3, 1), datetime(2021, 3, 2)))
+    assert ledger.claim("worker-1")["id"] == 0
+    assert ledger.claim("worker-2") is None
+    ledger.release(0, "worker-2")  # Not worker-2's shard, so this is ignored.
+    assert ledger.summary()["claimed"] == 1
+    ledger._update(lambda data: data["shards"][0].update(leaseExpires=0))
+    assert ledger.claim("worker-2")["id"] == 0
+
+
+def test_merge_moves_bookmarks_to_backfill_end(tmp_path):
+    """A completed backfill becomes each partition's incremental bookmark and volume estimate."""
+    ledger = ShardLedger(tmp_path / "shards.json")
+    partitions = [{"tenant": "a"}, {"tenant": "b"}]
+    ledger.create("ActivityEvents", plan_shards(datetime(2021, 3, 1), datetime(2021, 3, 3), partitions))
+    states = {"a": {"checkpoint": {"continuationToken": "stale"}}, "b": {"replication_key_value": "2021-03-05T00:00:00Z"}}
+    with pytest.raises(RuntimeError):
+        merge_ledger_state(ledger.read(), lambda partition: states[partition["tenant"]], "CreationTime")
+    for shard_id in range(4):
+        ledger.claim("worker-1", partitions[shard_id % 2])
+        ledger.complete(shard_id, "worker-1", events=48)
+    assert all(shard["status"] == SHARD_DONE for shard in ledger.read()["shards"])
+    merge_ledger_state(ledger.read(), lambda partition: states[partition["tenant"]], "CreationTime")
+    assert states["a"] == {
+        "replication_key": "CreationTime",
+        "replication_key_value": "2021-03-03T00:00:00Z",
+        "eventsPerHour": 2.0,
+    }
+    assert states["b"]["replication_key_value"] == "2021-03-05T00:00:00Z"
+
+
+def test_lease_is_renewed_only_by_its_worker(tmp_path):
+    """Renewing pushes the lease back, and fails once the shard has been reclaimed by another worker."""
+    ledger = ShardLedger(tmp_path / "shards.json", lease_seconds=3600)
+    ledger.create("ActivityEvents", plan_shards(datetime(2021, 3, 1), datetime(2021, 3, 2)))
+    ledger.claim("worker-1")
+    ledger._update(lambda data: data["shards"][0].update(leaseExpires=0))
+    assert ledger.renew(0, "worker-1")
+    assert ledger.read()["shards"][0]["leaseExpires"] > 0
+    assert ledger.claim("worker-2") is None
+    ledger._update(lambda data: data["shards"][0].update(leaseExpires=0))
+    assert ledger.claim("worker-2")["id"] == 0
+    assert not ledger.renew(0, "worker-1")
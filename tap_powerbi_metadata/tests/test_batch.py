@@ -0,0 +1,81 @@
+"""Tests for batch file output."""
+
+import gzip
+import json
+from urllib.parse import urlparse
+
+import pytest
+
+from tap_powerbi_metadata import batch
+from tap_powerbi_metadata.batch import BatchWriter
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Id": {"type": ["string"]},
+        "CreationTime": {"type": ["string"], "format": "date-time"},
+        "Datasets": {"type": ["array", "null"], "items": {"type": "object", "properties": {"DatasetId": {"type": ["string", "null"]}}}},
+    },
+}
+
+
+def test_batch_files_are_cut_by_day_and_size(tmp_path):
+    """Files roll over at day boundaries and size limits, and each is announced in its own BATCH message."""
+    messages = []
+    writer = BatchWriter("ActivityEvents", {}, tmp_path, max_bytes=100, emit=messages.append)
+    records = [{"Id": str(i), "CreationTime": f"2021-03-0{1 + i // 4}T00:00:00"} for i in range(8)]
+    for record in records:
+        writer.write(record, record["CreationTime"][:10])
+    writer.flush()
+
+    assert len(messages) > 2
+    assert all(message["encoding"] == {"format": "jsonl", "compression": "gzip"} for message in messages)
+    written = []
+    for message in messages:
+        with gzip.open(urlparse(message["manifest"][0]).path, "rt") as f:
+            day_records = [json.loads(line) for line in f]
+        assert len({record["CreationTime"][:10] for record in day_records}) == 1
+        written.extend(day_records)
+    assert written == records
+
+    message_count = len(messages)
+    writer.flush()
+    assert len(messages) == message_count
+
+
+def test_state_is_held_until_earlier_records_are_announced(tmp_path):
+    """A STATE message follows the BATCH message of the file holding the records written before it."""
+    messages = []
+    writer = BatchWriter("ActivityEvents", {}, tmp_path, emit=messages.append)
+    writer.write_state({"page": 0})
+    writer.write({"Id": "1"}, "2021-03-01")
+    writer.write_state({"page": 1})
+    writer.write({"Id": "2"}, "2021-03-01")
+    writer.write_state({"page": 2})
+    assert [message["type"] for message in messages] == ["STATE"]
+
+    writer.write({"Id": "3"}, "2021-03-02")
+    writer.write_state({"page": 3})
+    assert [message["type"] for message in messages] == ["STATE", "BATCH", "STATE"]
+    assert messages[-1]["value"] == {"page": 2}
+
+    writer.flush()
+    assert [message["type"] for message in messages] == ["STATE", "BATCH", "STATE", "BATCH", "STATE"]
+    assert messages[-1]["value"] == {"page": 3}
+
+
+def test_parquet_rows_are_written_in_row_groups(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    monkeypatch.setattr(batch, "PARQUET_ROW_GROUP_SIZE", 4)
+    messages = []
+    writer = BatchWriter("ActivityEvents", SCHEMA, tmp_path, batch_format="parquet", emit=messages.append)
+    records = [{"Id": str(i), "CreationTime": "2021-03-01T00:00:00", "Datasets": [{"DatasetId": "d"}]} for i in range(10)]
+    for record in records:
+        writer.write(record, "2021-03-01")
+    writer.flush()
+
+    parquet_file = pyarrow.parquet.ParquetFile(urlparse(messages[0]["manifest"][0]).path)
+    assert parquet_file.num_row_groups == 3
+    assert parquet_file.read().to_pylist() == records
@@ -0,0 +1,76 @@
+"""Tests for the record/replay page cache."""
+
+import io
+
+import pytest
+import requests
+
+from tap_powerbi_metadata.cache import CachingReader, PageCache, PageCacheMiss
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import get_mock_config, read_messages, run_mock_server
+
+
+class FakeRaw(io.BytesIO):
+    """Stands in for urllib3's response stream."""
+
+    def read(self, amt=None, decode_content=None):
+        return super().read(amt)
+
+
+def test_record_then_replay(tmp_path):
+    """Pages recorded by one run are served by a later replay run, and replay misses fail loudly."""
+    key = PageCache.make_key("/admin/activityevents", None, "2021-03-01T00:00:00", "2021-03-01T23:59:59", None)
+    recorder = PageCache(tmp_path)
+    assert recorder.get(key) is None
+    recorder.put(key, b'{"activityEventEntities": []}')
+
+    replayer = PageCache(tmp_path, mode="replay")
+    assert replayer.get(key) == b'{"activityEventEntities": []}'
+    with pytest.raises(PageCacheMiss):
+        replayer.get(PageCache.make_key("missing"))
+
+
+def test_oldest_pages_evicted_over_size_limit(tmp_path):
+    """Once over its size limit, the cache evicts the oldest pages first."""
+    cache = PageCache(tmp_path, max_bytes=200)
+    keys = [PageCache.make_key(i) for i in range(5)]
+    for key in keys:
+        cache.put(key, key.encode("ascii") * 2)
+    assert cache._total_bytes <= 200
+    assert cache.get(keys[-1]) is not None
+    assert cache.get(keys[0]) is None
+
+
+def test_body_is_cached_only_once_read_to_the_end(tmp_path):
+    """A streamed body is copied into the cache as it is read, and dropped if the stream is closed early."""
+    cache = PageCache(tmp_path)
+    body = b'{"activityEventEntities": [' + b'{"Id": "a"},' * 100 + b'{"Id": "b"}]}'
+    reader = CachingReader(FakeRaw(body), cache.open_writer(PageCache.make_key("complete")))
+    while reader.read(64):
+        pass
+    assert cache.get(PageCache.make_key("complete")) == body
+
+    reader = CachingReader(FakeRaw(body), cache.open_writer(PageCache.make_key("partial")))
+    reader.read(64)
+    reader.close()
+    assert cache.get(PageCache.make_key("partial")) is None
+    assert not list(tmp_path.glob("*/*.tmp"))
+
+
+def test_replay_sync_never_reaches_the_network(tmp_path, capsys, monkeypatch):
+    """A replay run emits the recorded closed days, and never sends a request."""
+    with run_mock_server(events_per_day=48, page_size=20) as server:
+        config = dict(get_mock_config(server.base_url, days=3), page_cache_path=str(tmp_path))
+        TapPowerBIMetadata(config=config).sync_all()
+    capsys.readouterr()
+
+    def fail_send(*args, **kwargs):
+        raise AssertionError("Replay sent a request.")
+
+    monkeypatch.setattr(requests.Session, "send", fail_send)
+    TapPowerBIMetadata(config=dict(config, page_cache_mode="replay")).sync_all()
+    messages = read_messages(capsys)
+    creation_days = {message["record"]["CreationTime"][:10] for message in messages if message["type"] == "RECORD"}
+    # With the default 24 hour horizon, only the first of the three days is closed.
+    first_day = config["start_date"][:10]
+    assert creation_days == {first_day}
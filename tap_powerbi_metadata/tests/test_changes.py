@@ -0,0 +1,31 @@
+"""Tests for the page hashes used to skip unchanged pages when re-scanning."""
+
+import json
+from decimal import Decimal
+
+from tap_powerbi_metadata.changes import PageHashIndex, content_hash
+
+
+def test_content_hash_ignores_key_order():
+    """Hashes depend on content only, not key order, and Decimals hash like the equivalent floats and ints."""
+    assert content_hash({"Id": "a", "Activity": "viewreport"}) == content_hash({"Activity": "viewreport", "Id": "a"})
+    assert content_hash({"Id": "a", "Activity": "viewreport"}) != content_hash({"Id": "a", "Activity": "exportreport"})
+    assert content_hash([{"Id": "a", "Size": Decimal("1.5")}]) == content_hash([{"Id": "a", "Size": 1.5}])
+    assert content_hash([{"Id": "a", "Size": Decimal("2")}]) == content_hash([{"Id": "a", "Size": 2}])
+
+
+def test_pages_seen_by_earlier_runs_are_skipped(tmp_path):
+    """Only pages saved by an earlier run count as seen, and days before the lookback are dropped."""
+    index_path = tmp_path / "seen_pages.json"
+    first_run = PageHashIndex(index_path, earliest_day="2021-03-01", seen_pages={"2021-02-20": ["old"]})
+    assert first_run.check("2021-03-01", "page-1")
+    assert first_run.check("2021-03-01", "page-1")  # Not seen until this run's hashes are saved.
+    first_run.save()
+    assert json.loads(index_path.read_text()) == {"2021-03-01": ["page-1"]}
+
+    second_run = PageHashIndex(index_path, earliest_day="2021-03-01", seen_pages={"2021-03-01": ["ignored"]})
+    assert not second_run.check("2021-03-01", "page-1")
+    assert second_run.check("2021-03-01", "ignored")  # The file takes precedence over hashes from state.
+    assert second_run.check("2021-03-02", "page-2")
+    assert second_run.unchanged_pages == 1
+    assert second_run.get_seen_pages() == {"2021-03-01": ["ignored", "page-1"], "2021-03-02": ["page-2"]}
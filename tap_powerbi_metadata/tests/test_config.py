@@ -0,0 +1,14 @@
+"""Tests for tap config validation."""
+
+import pytest
+
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import CREDENTIALS
+
+
+def test_credentials_or_tenants_are_required():
+    """A config without credentials fails up front, naming what is missing."""
+    with pytest.raises(ValueError, match="client_id, username, password. Set these or the `tenants` list"):
+        TapPowerBIMetadata(config={"tenant_id": "tenant"})
+    assert TapPowerBIMetadata(config=CREDENTIALS)
+    assert TapPowerBIMetadata(config={"tenants": [CREDENTIALS]})
@@ -0,0 +1,91 @@
+"""Tests for compiled record conformers."""
+
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+from tap_powerbi_metadata.conform import compile_conformer
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import CREDENTIALS
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "Id": {"type": ["string"]},
+        "CreationTime": {"type": ["string"], "format": "date-time"},
+        "RecordType": {"type": ["integer", "null"]},
+        "IsSuccess": {"type": ["boolean", "null"]},
+        "UserId": {"type": ["string", "null"]},
+        "Datasets": {
+            "type": ["array", "null"],
+            "items": {
+                "type": ["object"],
+                "properties": {
+                    "DatasetId": {"type": ["string", "null"]},
+                    "RowCount": {"type": ["integer", "null"]},
+                },
+            },
+        },
+    },
+}
+
+
+def test_conformer_coerces_typed_leaves_and_drops_unknown_properties():
+    conform = compile_conformer(SCHEMA)
+    record = {
+        "Id": "1",
+        "CreationTime": datetime(2021, 3, 1, 12, 30),
+        "RecordType": "20",
+        "IsSuccess": "True",
+        "UserId": None,
+        "Datasets": [{"DatasetId": "a", "RowCount": "5", "Extra": 1}],
+        "NotInSchema": "x",
+    }
+    assert conform(record) == {
+        "Id": "1",
+        "CreationTime": "2021-03-01T12:30:00",
+        "RecordType": 20,
+        "IsSuccess": True,
+        "UserId": None,
+        "Datasets": [{"DatasetId": "a", "RowCount": 5}],
+    }
+
+
+def test_conformer_keeps_only_selected_properties():
+    conform = compile_conformer(SCHEMA, lambda breadcrumb: breadcrumb in (("Id",), ("IsSuccess",)))
+    assert conform({"Id": "1", "UserId": "u", "IsSuccess": False}) == {"Id": "1", "IsSuccess": False}
+
+
+def get_tap_with_deselected(property_name: str) -> TapPowerBIMetadata:
+    """Return a tap whose input catalog deselects one `ActivityEvents` property."""
+    catalog = TapPowerBIMetadata(config=CREDENTIALS).catalog_dict
+    for stream in catalog["streams"]:
+        for metadata in stream["metadata"]:
+            if stream["tap_stream_id"] == "ActivityEvents" and tuple(metadata["breadcrumb"]) == ("properties", property_name):
+                metadata["metadata"]["selected"] = False
+    return TapPowerBIMetadata(config=CREDENTIALS, catalog=catalog)
+
+
+@pytest.mark.parametrize("compiled_conformer", [False, True], ids=["sdk", "compiled"])
+def test_deselected_properties_are_dropped(capsys, compiled_conformer):
+    """Properties deselected in the input catalog are left out of RECORD messages."""
+    tap = get_tap_with_deselected("UserId")
+    tap._config["compiled_conformer"] = compiled_conformer
+    stream = tap.streams["ActivityEvents"]
+    assert not stream.is_property_selected(("UserId",))
+    assert stream.is_property_selected(("Activity",))
+    stream._write_record_message({"Id": "1", "CreationTime": "2021-03-01T00:00:00", "UserId": "u", "Activity": "ViewReport"})
+    record = json.loads(capsys.readouterr().out)["record"]
+    assert record == {"Id": "1", "CreationTime": "2021-03-01T00:00:00", "Activity": "ViewReport"}
+
+
+def test_deselected_properties_are_dropped_from_batch_files(tmp_path):
+    tap = get_tap_with_deselected("UserId")
+    tap._config["batch_output_path"] = str(tmp_path)
+    stream = tap.streams["ActivityEvents"]
+    stream._write_record_message({"Id": "1", "CreationTime": "2021-03-01T00:00:00", "UserId": "u"})
+    stream.batch_writer.flush()
+    with gzip.open(next(tmp_path.glob("**/*.jsonl.gz")), "rt") as f:
+        assert json.loads(f.read()) == {"Id": "1", "CreationTime": "2021-03-01T00:00:00"}
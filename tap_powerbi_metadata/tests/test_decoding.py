@@ -0,0 +1,75 @@
+"""Tests that every page decoding backend yields the same pages."""
+
+import io
+import json
+
+import pytest
+import requests
+
+from tap_powerbi_metadata.decoding import PageDecoder
+from tap_powerbi_metadata.tests.conftest import run_mock_server
+
+RECORDS_KEY = "activityEventEntities"
+
+
+def get_decoder(backend: str) -> PageDecoder:
+    if backend != "json":
+        pytest.importorskip(backend)
+    decoder = PageDecoder(incremental=backend == "ijson")
+    if backend == "json":
+        decoder.loads = json.loads
+    return decoder
+
+
+def decode_page(decoder: PageDecoder, response: requests.Response) -> tuple:
+    """Return a page's records and its remaining top-level fields, reading the records first as the stream does."""
+    records = list(decoder.iter_records(response, RECORDS_KEY))
+    return records, decoder.decode(response)
+
+
+def decode_all_pages(base_url: str, backend: str) -> list:
+    """Page through a day of events, decoding every page with `backend`."""
+    decoder = get_decoder(backend)
+    url = f"{base_url}/v1.0/myorg/admin/activityevents"
+    params = {"startDateTime": "'2021-03-01T00:00:00Z'", "endDateTime": "'2021-03-01T23:59:59Z'"}
+    pages = []
+    while True:
+        response = requests.get(url, params=params, stream=True)
+        response.raise_for_status()
+        pages.append(decode_page(decoder, response))
+        continuation_token = pages[-1][1].get("continuationToken")
+        if not continuation_token:
+            return pages
+        params = {"continuationToken": f"'{continuation_token}'"}
+
+
+class StreamedBody(io.BytesIO):
+    """Stands in for urllib3's response stream."""
+
+    def read(self, amt=None, decode_content=None):
+        return super().read(amt)
+
+
+def build_streamed_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = StreamedBody(body)
+    return response
+
+
+def test_backends_decode_multi_page_responses_identically():
+    with run_mock_server(events_per_day=120, page_size=50) as server:
+        pages = {backend: decode_all_pages(server.base_url, backend) for backend in ["json", "orjson", "ijson"]}
+    assert len(pages["json"]) == 3
+    assert sum(len(records) for records, _ in pages["json"]) == 120
+    assert pages["orjson"] == pages["json"]
+    assert pages["ijson"] == pages["json"]
+
+
+@pytest.mark.parametrize("backend", ["json", "orjson", "ijson"])
+def test_numbers_decode_to_ints_and_floats(backend):
+    body = b'{"activityEventEntities": [{"Id": "1", "Count": 3, "Ratio": 0.25, "Big": 1e3}], "lastResultSet": true}'
+    records, page = decode_page(get_decoder(backend), build_streamed_response(body))
+    assert records == [{"Id": "1", "Count": 3, "Ratio": 0.25, "Big": 1000.0}]
+    assert [type(value) for value in records[0].values()] == [str, int, float, float]
+    assert page == {"lastResultSet": True}
@@ -0,0 +1,52 @@
+"""Tests for the emitted-Id dedup index."""
+
+from datetime import datetime
+
+from tap_powerbi_metadata.dedup import BloomFilter, DedupIndex
+
+
+def test_bloom_filter_round_trip():
+    """Keys survive serialization, and the false-positive estimate stays small for a sized filter."""
+    bloom = BloomFilter.for_capacity(size_bytes=4096, expected_items=1000)
+    for i in range(1000):
+        assert bloom.add(f"event-{i}")
+    restored = BloomFilter.from_bytes(bloom.to_bytes())
+    assert not restored.add("event-10")
+    assert restored.count == 1000
+    assert restored.false_positive_rate < 0.01
+
+
+def test_dedup_index_persists_between_runs(tmp_path):
+    """Ids emitted by one run are dropped by the next, while old days always pass through."""
+    today = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+    first_run = DedupIndex(tmp_path, memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000)
+    assert first_run.add("a", today)
+    assert not first_run.add("a", today)
+    first_run.save()
+
+    second_run = DedupIndex(tmp_path, memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000)
+    assert not second_run.add("a", today)
+    assert second_run.add("b", today)
+    assert second_run.add("a", "2000-01-01T00:00:00")
+    assert second_run.add("a", "2000-01-01T00:00:00")
+    assert second_run.duplicates == 1
+
+
+def test_content_is_only_compared_on_days_indexed_with_it(tmp_path):
+    """Changed events pass through, but turning content tracking on never re-emits already indexed Ids."""
+    today = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+    id_only = DedupIndex(tmp_path, memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000)
+    assert id_only.add("a", today)
+    id_only.save()
+
+    migrating = DedupIndex(tmp_path, memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000, track_content=True)
+    assert not migrating.add("a", today, "v1")
+    assert not migrating.add("a", today, "v2")
+
+    tracking = DedupIndex(tmp_path / "new", memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000, track_content=True)
+    assert tracking.add("a", today, "v1")
+    assert not tracking.add("a", today, "v1")
+    tracking.save()
+    tracking = DedupIndex(tmp_path / "new", memory_bytes=64 * 1024, lookback_days=2, expected_items_per_day=1000, track_content=True)
+    assert not tracking.add("a", today, "v1")
+    assert tracking.add("a", today, "v2")
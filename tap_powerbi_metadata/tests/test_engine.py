@@ -0,0 +1,31 @@
+"""Tests for the request engines."""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from tap_powerbi_metadata.engine import AsyncRequestEngine
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import get_mock_config, run_mock_server
+
+
+def test_async_engine_decodes_pages_off_the_event_loop():
+    pytest.importorskip("aiohttp")
+    with run_mock_server(events_per_day=120, page_size=50) as server:
+        stream = TapPowerBIMetadata(config=get_mock_config(server.base_url, days=1)).streams["ActivityEvents"]
+        parse_threads = []
+        parse_page = stream.parse_page
+
+        def record_parse_thread(*args):
+            parse_threads.append(threading.current_thread().name)
+            return parse_page(*args)
+
+        stream.parse_page = record_parse_thread
+        day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        with AsyncRequestEngine(stream, None, max_connections=2, prefetch_pages=2) as engine:
+            pages = engine.submit_window(day, day + timedelta(days=1))
+            rows = [row for _, page_rows, _ in pages for row in page_rows]
+    assert len(rows) == 120
+    assert len(parse_threads) == 3
+    assert "powerbi-async-engine" not in parse_threads
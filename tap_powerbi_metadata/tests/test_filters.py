@@ -0,0 +1,53 @@
+"""Tests for server-side `$filter` partitions of `ActivityEventsStream`."""
+
+from datetime import datetime
+
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import CREDENTIALS, get_stream
+
+BOOKMARK = {"replication_key": "CreationTime", "replication_key_value": "2021-03-05T10:00:00"}
+
+
+def test_each_activity_and_user_combination_is_a_partition():
+    stream = get_stream(activity_filter=["ViewReport", "ExportReport"], user_filter=["o'brien@example.com"])
+    assert stream.partitions == [
+        {"filter": "Activity eq 'ViewReport' and UserId eq 'o''brien@example.com'"},
+        {"filter": "Activity eq 'ExportReport' and UserId eq 'o''brien@example.com'"},
+    ]
+
+
+def test_filter_partitions_are_combined_with_tenants():
+    tenants = [dict(CREDENTIALS, tenant_id=tenant_id) for tenant_id in ("a", "b")]
+    stream = TapPowerBIMetadata(config={"tenants": tenants, "user_filter": ["u@example.com"]}).streams["ActivityEvents"]
+    assert stream.partitions == [
+        {"tenant": "a", "filter": "UserId eq 'u@example.com'"},
+        {"tenant": "b", "filter": "UserId eq 'u@example.com'"},
+    ]
+
+
+def test_filter_is_sent_with_the_first_page_only():
+    stream = get_stream(activity_filter=["ViewReport"])
+    partition = stream.partitions[0]
+    token = {"urlStartDate": datetime(2021, 3, 1), "urlEndDate": datetime(2021, 3, 1, 23, 59, 59), "continuationToken": None}
+    assert stream.get_url_params(partition, token)["$filter"] == "Activity eq 'ViewReport'"
+    token["continuationToken"] = "next"
+    assert "$filter" not in stream.get_url_params(partition, token)
+
+
+def test_new_filter_partitions_start_from_the_unfiltered_bookmark():
+    """Turning filters on carries the stream's bookmark over to each filter partition."""
+    state = {"bookmarks": {"ActivityEvents": dict(BOOKMARK)}}
+    stream = get_stream(state=state, activity_filter=["ViewReport"])
+    partition = stream.partitions[0]
+    stream.migrate_unfiltered_bookmark(partition)
+    assert stream.get_starting_timestamp(partition).replace(tzinfo=None) == datetime(2021, 3, 5, 10)
+    assert stream.tap_state["bookmarks"]["ActivityEvents"]["partitions"][0]["context"] == partition
+
+
+def test_filter_partition_bookmarks_are_kept():
+    partition = {"filter": "Activity eq 'ViewReport'"}
+    partition_bookmark = dict(BOOKMARK, context=partition, replication_key_value="2021-03-07T00:00:00")
+    state = {"bookmarks": {"ActivityEvents": dict(BOOKMARK, partitions=[partition_bookmark])}}
+    stream = get_stream(state=state, activity_filter=["ViewReport"])
+    stream.migrate_unfiltered_bookmark(partition)
+    assert stream.get_starting_timestamp(partition).replace(tzinfo=None) == datetime(2021, 3, 7)
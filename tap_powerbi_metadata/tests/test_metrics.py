@@ -0,0 +1,32 @@
+"""Tests for sync instrumentation."""
+
+import json
+import logging
+
+from tap_powerbi_metadata.metrics import Metrics
+
+
+def test_metrics_export_log_line_and_prometheus_textfile(tmp_path, caplog):
+    textfile = tmp_path / "tap.prom"
+    metrics = Metrics(logging.getLogger("test"), textfile_path=textfile)
+    for seconds in (0.002, 0.02, 0.2, 120):
+        metrics.observe("request_seconds", seconds, stream="ActivityEvents")
+    metrics.increment("requests", stream="ActivityEvents", status="200")
+    metrics.increment("requests", stream="ActivityEvents", status="200")
+    assert list(metrics.timed_iter(iter([{"Id": "1"}, {"Id": "2"}]), "parse_seconds", "records_per_page")) == [
+        {"Id": "1"},
+        {"Id": "2"},
+    ]
+
+    with caplog.at_level(logging.INFO):
+        metrics.export()
+    summary = json.loads(caplog.records[-1].getMessage()[len("METRIC: "):])
+    assert summary["counters"]['requests{status="200",stream="ActivityEvents"}'] == 2
+    assert summary["histograms"]['request_seconds{stream="ActivityEvents"}']["count"] == 4
+    assert summary["histograms"]["records_per_page"]["sum"] == 2
+
+    lines = textfile.read_text().splitlines()
+    assert "# TYPE tap_powerbi_metadata_request_seconds histogram" in lines
+    assert 'tap_powerbi_metadata_requests_total{status="200",stream="ActivityEvents"} 2' in lines
+    assert 'tap_powerbi_metadata_request_seconds_bucket{stream="ActivityEvents",le="0.025"} 2' in lines
+    assert 'tap_powerbi_metadata_request_seconds_bucket{stream="ActivityEvents",le="+Inf"} 4' in lines
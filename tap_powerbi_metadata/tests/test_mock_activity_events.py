@@ -0,0 +1,186 @@
+"""Tests which sync `ActivityEventsStream` against the local mock Power BI server."""
+
+from datetime import datetime
+
+import pytest
+
+from tap_powerbi_metadata.streams import CHECKPOINT_DATE_FORMAT, ActivityEventsStream
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import get_mock_config, read_messages, run_mock_server
+from tap_powerbi_metadata.tests.mock_powerbi import MockPowerBIServer
+
+DAYS = 3
+EVENTS_PER_DAY = 240
+
+
+@pytest.fixture
+def mock_server():
+    with run_mock_server(events_per_day=EVENTS_PER_DAY, page_size=50, throttle_every=7, retry_after=0) as server:
+        yield server
+
+
+def sync_record_ids(config: dict, capsys) -> list:
+    TapPowerBIMetadata(config=config).sync_all()
+    return [message["record"]["Id"] for message in read_messages(capsys) if message["type"] == "RECORD"]
+
+
+def sync_interrupted_then_resume(
+    config: dict, server: MockPowerBIServer, capsys, expire_tokens: bool = False, on_resume=None
+) -> list:
+    """Sync until the server's injected failure, then resume from the last state, returning every record id emitted.
+
+    `on_resume` is called with the checkpoint being resumed from before the second sync starts.
+    """
+    with pytest.raises(RuntimeError, match="injected failure"):
+        TapPowerBIMetadata(config=config).sync_all()
+    messages = read_messages(capsys)
+    state = [message["value"] for message in messages if message["type"] == "STATE"][-1]
+    checkpoint = state["bookmarks"]["ActivityEvents"]["checkpoint"]
+    if expire_tokens:
+        server.expire_continuation_tokens()
+    if on_resume:
+        on_resume(checkpoint)
+    TapPowerBIMetadata(config=config, state=state).sync_all()
+    messages += read_messages(capsys)
+    return [message["record"]["Id"] for message in messages if message["type"] == "RECORD"]
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [
+        {},
+        {"prefetch_pages": 2},
+        {"max_workers": 3},
+        {"max_workers": 3, "window_target_events": 60, "min_window_minutes": 60},
+    ],
+    ids=["serial", "prefetch", "threaded", "threaded-split"],
+)
+def test_sync_emits_every_event_in_order(mock_server, capsys, settings):
+    """Every event is emitted exactly once and in order, despite throttling and concurrency."""
+    config = dict(get_mock_config(mock_server.base_url, DAYS), **settings)
+    record_ids = sync_record_ids(config, capsys)
+    assert len(record_ids) == DAYS * EVENTS_PER_DAY
+    assert record_ids == sorted(record_ids)
+    assert mock_server.stats["throttled_requests"] > 0
+
+
+def test_multi_tenant_sync_tags_and_orders_each_tenant(mock_server, capsys):
+    """Each tenant's events are emitted in order and tagged with the tenant."""
+    config = get_mock_config(mock_server.base_url, DAYS)
+    credentials = {key: config.pop(key) for key in ["tenant_id", "client_id", "username", "password"]}
+    config["tenants"] = [dict(credentials, tenant_id=tenant_id) for tenant_id in ["tenant-a", "tenant-b"]]
+    config["tenant_concurrency"] = 2
+    TapPowerBIMetadata(config=config).sync_all()
+    messages = read_messages(capsys)
+    records = [message["record"] for message in messages if message["type"] == "RECORD"]
+    for tenant_id in ["tenant-a", "tenant-b"]:
+        record_ids = [record["Id"] for record in records if record["TenantId"] == tenant_id]
+        assert len(record_ids) == DAYS * EVENTS_PER_DAY
+        assert record_ids == sorted(record_ids)
+
+
+@pytest.mark.parametrize("settings", [{}, {"prefetch_pages": 2}], ids=["serial", "prefetch"])
+def test_interrupted_sync_resumes_from_the_checkpointed_page(capsys, settings):
+    """A sync which fails mid-window resumes at the failed page, without re-requesting earlier pages."""
+    with run_mock_server(events_per_day=EVENTS_PER_DAY, page_size=50, fail_on_request=8) as server:
+        config = dict(get_mock_config(server.base_url, DAYS), **settings)
+        record_ids = sync_interrupted_then_resume(config, server, capsys)
+        assert record_ids == sorted(set(record_ids))
+        assert len(record_ids) == DAYS * EVENTS_PER_DAY
+        # Five pages a day, plus the failed request.
+        assert server.stats["event_requests"] == DAYS * 5 + 1
+
+
+@pytest.mark.parametrize("settings", [{}, {"prefetch_pages": 2}], ids=["serial", "prefetch"])
+def test_sync_interrupted_at_a_later_day_resumes_after_the_completed_days(capsys, settings):
+    """A sync which fails on the first page of a later day does not download the days before it again."""
+    with run_mock_server(events_per_day=EVENTS_PER_DAY, page_size=50, fail_on_request=11) as server:
+        config = dict(get_mock_config(server.base_url, DAYS), **settings)
+        checkpoints = []
+        record_ids = sync_interrupted_then_resume(config, server, capsys, on_resume=checkpoints.append)
+        assert list(checkpoints[0]) == ["completedThrough"]
+        assert record_ids == sorted(set(record_ids))
+        assert len(record_ids) == DAYS * EVENTS_PER_DAY
+        assert server.stats["event_requests"] == DAYS * 5 + 1
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [{"max_workers": 2}, {"max_workers": 2, "window_target_events": 60, "min_window_minutes": 60}],
+    ids=["threaded", "threaded-split"],
+)
+def test_interrupted_concurrent_sync_resumes_after_the_completed_windows(capsys, monkeypatch, settings):
+    """A concurrent sync which fails requests no window before its checkpoint again, and emits no duplicates."""
+    requested_windows = []
+    request_window_pages = ActivityEventsStream.request_window_pages
+
+    def record_window(self, partition, window_start, window_end, send=None):
+        requested_windows.append(window_start)
+        return request_window_pages(self, partition, window_start, window_end, send)
+
+    def check_checkpoint(checkpoint):
+        resume_from = checkpoint.get("completedThrough") or checkpoint["urlStartDate"]
+        resumed_from.append(datetime.strptime(resume_from, CHECKPOINT_DATE_FORMAT))
+        requested_windows.clear()
+
+    monkeypatch.setattr(ActivityEventsStream, "request_window_pages", record_window)
+    resumed_from = []
+    # The first day's five pages are all fetched within the first ten requests, so it is complete by the failure.
+    with run_mock_server(events_per_day=EVENTS_PER_DAY, page_size=50, fail_on_request=13) as server:
+        config = dict(get_mock_config(server.base_url, DAYS), **settings)
+        record_ids = sync_interrupted_then_resume(config, server, capsys, on_resume=check_checkpoint)
+    assert record_ids == sorted(set(record_ids))
+    assert len(record_ids) == DAYS * EVENTS_PER_DAY
+    first_day = datetime.strptime(config["start_date"], "%Y-%m-%dT%H:%M:%SZ")
+    assert resumed_from[0] > first_day
+    assert min(requested_windows) == resumed_from[0]
+
+
+@pytest.mark.parametrize("settings", [{}, {"prefetch_pages": 2}], ids=["serial", "prefetch"])
+def test_expired_checkpoint_restarts_the_window_without_duplicates(capsys, settings):
+    """An expired checkpointed token restarts its window, skipping the rows emitted before the failure."""
+    with run_mock_server(events_per_day=EVENTS_PER_DAY, page_size=50, fail_on_request=8) as server:
+        config = dict(get_mock_config(server.base_url, DAYS), **settings)
+        record_ids = sync_interrupted_then_resume(config, server, capsys, expire_tokens=True)
+        assert record_ids == sorted(set(record_ids))
+        assert len(record_ids) == DAYS * EVENTS_PER_DAY
+
+
+def test_batch_output_announces_a_file_per_day_before_state(mock_server, capsys, tmp_path):
+    """Batch files are cut per day rather than per page, and no STATE is sent before its records are announced."""
+    config = dict(get_mock_config(mock_server.base_url, DAYS), batch_output_path=str(tmp_path))
+    TapPowerBIMetadata(config=config).sync_all()
+    messages = [message for message in read_messages(capsys) if message["type"] in ("BATCH", "STATE")]
+    assert [message["type"] for message in messages].count("BATCH") == DAYS
+    assert messages[-1]["type"] == "STATE"
+    assert messages[-1]["value"]["bookmarks"]["ActivityEvents"]["replication_key_value"]
+
+
+def test_filtered_sync_keeps_a_bookmark_per_filter(mock_server, capsys):
+    """Only the filtered activities are downloaded, and each filter partition is bookmarked separately."""
+    config = dict(get_mock_config(mock_server.base_url, DAYS), activity_filter=["ViewReport", "ExportReport"])
+    TapPowerBIMetadata(config=config).sync_all()
+    messages = read_messages(capsys)
+    activities = {message["record"]["Activity"] for message in messages if message["type"] == "RECORD"}
+    assert activities == {"ViewReport", "ExportReport"}
+    assert mock_server.stats["events_served"] == DAYS * EVENTS_PER_DAY * 2 // 5
+    state = [message["value"] for message in messages if message["type"] == "STATE"][-1]
+    partitions = state["bookmarks"]["ActivityEvents"]["partitions"]
+    assert sorted(partition["context"]["filter"] for partition in partitions) == [
+        "Activity eq 'ExportReport'",
+        "Activity eq 'ViewReport'",
+    ]
+    assert all(partition["replication_key_value"] for partition in partitions)
+
+
+def test_lookback_keeps_page_hashes_beside_the_dedup_index(mock_server, capsys, tmp_path):
+    """A re-scan emits no event twice, and its page hashes are kept in a file rather than in every STATE message."""
+    config = dict(get_mock_config(mock_server.base_url, DAYS), lookback_hours=30, dedup_index_path=str(tmp_path))
+    TapPowerBIMetadata(config=config).sync_all()
+    messages = read_messages(capsys)
+    assert len([message for message in messages if message["type"] == "RECORD"]) == DAYS * EVENTS_PER_DAY
+    state = [message["value"] for message in messages if message["type"] == "STATE"][-1]
+    assert "seenPages" not in state["bookmarks"]["ActivityEvents"]
+    assert (tmp_path / "ActivityEvents" / "seen_pages.json").exists()
+    TapPowerBIMetadata(config=config, state=state).sync_all()
+    assert not [message for message in read_messages(capsys) if message["type"] == "RECORD"]
@@ -0,0 +1,81 @@
+"""Tests for pipelined page fetching."""
+
+import threading
+
+import pytest
+
+from tap_powerbi_metadata.pipeline import PagePrefetcher
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+
+
+class FakeStream:
+    name = "ActivityEvents"
+    metrics = None
+
+    def __init__(self, pages_per_window: int, fail_window=None) -> None:
+        self.pages_per_window = pages_per_window
+        self.fail_window = fail_window
+        self.pages_fetched = 0
+        self.fetched = threading.Event()
+
+    def request_window_pages(self, partition, window_start, window_end, send=None):
+        if window_start == self.fail_window:
+            raise RuntimeError("window failed")
+        for page in range(self.pages_per_window):
+            self.pages_fetched += 1
+            self.fetched.set()
+            next_page_token = {"page": page + 1} if page + 1 < self.pages_per_window else None
+            yield [{"Id": f"{window_start}-{page}"}], next_page_token
+
+
+def test_prefetcher_yields_pages_in_order_and_bounds_the_queue():
+    stream = FakeStream(pages_per_window=5)
+    windows = [(day, day + 1) for day in range(3)]
+    with PagePrefetcher(stream, None, windows, prefetch_pages=2) as prefetcher:
+        pages = iter(prefetcher)
+        first = next(pages)
+        stream.fetched.wait()
+        # One page consumed, at most two queued and one blocked in the fetch thread.
+        assert stream.pages_fetched <= 4
+        rest = list(pages)
+    ids = [rows[0]["Id"] for _, rows, _ in [first] + rest]
+    assert ids == [f"{day}-{page}" for day in range(3) for page in range(5)]
+    assert [token for _, _, token in [first] + rest].count(None) == 3
+
+
+def test_prefetcher_raises_fetch_errors_in_the_consumer():
+    stream = FakeStream(pages_per_window=2, fail_window=1)
+    with PagePrefetcher(stream, None, [(0, 1), (1, 2)], prefetch_pages=4) as prefetcher:
+        pages = iter(prefetcher)
+        assert len([next(pages), next(pages)]) == 2
+        with pytest.raises(RuntimeError, match="window failed"):
+            next(pages)
+
+
+def test_prefetcher_stops_when_the_consumer_goes_away():
+    stream = FakeStream(pages_per_window=1000)
+    with PagePrefetcher(stream, None, [(0, 1)], prefetch_pages=1) as prefetcher:
+        next(iter(prefetcher))
+    assert stream.pages_fetched < 1000
+
+
+def test_failed_partition_stops_upcoming_prefetchers(monkeypatch):
+    tenants = [
+        {"tenant_id": tenant_id, "client_id": "client", "username": "user@example.com", "password": "password"}
+        for tenant_id in ("first", "second")
+    ]
+    config = {"tenants": tenants, "tenant_concurrency": 2, "start_date": "2021-03-01T00:00:00Z"}
+    stream = TapPowerBIMetadata(config=config).streams["ActivityEvents"]
+
+    def request_window_pages(partition, window_start, window_end, send=None):
+        if partition["tenant"] == "first":
+            raise RuntimeError("window failed")
+        while True:
+            yield [{"Id": "event"}], {"page": 1}
+
+    monkeypatch.setattr(stream, "request_window_pages", request_window_pages)
+    first, second = stream.partitions
+    with pytest.raises(RuntimeError, match="window failed"):
+        list(stream.request_prefetched_records(first))
+    assert stream._started_prefetchers == {}
+    assert not [thread for thread in threading.enumerate() if thread.name == "powerbi-prefetch"]
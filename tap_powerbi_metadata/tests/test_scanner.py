@@ -0,0 +1,123 @@
+"""Tests for the workspace scanner and the inventory streams it feeds."""
+
+import logging
+from datetime import datetime
+
+import pytest
+
+from tap_powerbi_metadata.scanner import MODIFIED_SINCE_FORMAT, WorkspaceScanner
+from tap_powerbi_metadata.tap import TapPowerBIMetadata
+from tap_powerbi_metadata.tests.conftest import get_mock_config, read_messages, run_mock_server
+from tap_powerbi_metadata.tests.mock_powerbi import WORKSPACES
+
+
+class FakeScannerStream:
+    """Serves canned `workspaces/modified` listings to the scanner."""
+
+    logger = logging.getLogger("test_scanner")
+
+    def __init__(self, all_ids, modified_ids):
+        self.all_ids = all_ids
+        self.modified_ids = modified_ids
+
+    def request_json(self, method, path, params=None, json_body=None, partition=None):
+        ids = self.modified_ids if (params or {}).get("modifiedSince") else self.all_ids
+        return [{"id": workspace_id} for workspace_id in ids]
+
+
+def test_incremental_scan_plans_only_changed_and_new_workspaces():
+    """Modified and unindexed workspaces are scanned, and vanished workspaces are reported deleted."""
+    scan_started = datetime.utcnow()
+    stream = FakeScannerStream(all_ids=["a", "b", "new"], modified_ids=["b"])
+    scanner = WorkspaceScanner(
+        stream, modified_since=scan_started.strftime(MODIFIED_SINCE_FORMAT), indexed_ids=["a", "b", "gone"]
+    )
+    assert scanner.plan_workspace_ids(scan_started) == ["b", "new"]
+    assert scanner.deleted_workspace_ids == ["gone"]
+    assert scanner.workspace_ids == ["a", "b", "new"]
+
+
+def test_scan_without_a_previous_scan_covers_every_workspace():
+    """Without a scan to start from, every workspace is scanned."""
+    stream = FakeScannerStream(all_ids=["a", "b"], modified_ids=[])
+    scanner = WorkspaceScanner(stream, indexed_ids=["a"])
+    assert scanner.plan_workspace_ids(datetime.utcnow()) == ["a", "b"]
+
+
+@pytest.fixture
+def mock_server():
+    with run_mock_server(events_per_day=0) as server:
+        yield server
+
+
+def select_all(catalog: dict) -> dict:
+    for stream in catalog["streams"]:
+        for metadata in stream["metadata"]:
+            if not metadata["breadcrumb"]:
+                metadata["metadata"]["selected"] = True
+    return catalog
+
+
+def sync_messages(config: dict, capsys, state: dict = None, stream_names: list = None) -> list:
+    """Sync every stream, or only `stream_names`, returning the Singer messages written."""
+    catalog = select_all(TapPowerBIMetadata(config=config).catalog_dict)
+    if stream_names:
+        catalog["streams"] = [stream for stream in catalog["streams"] if stream["tap_stream_id"] in stream_names]
+    TapPowerBIMetadata(config=config, catalog=catalog, state=state).sync_all()
+    return read_messages(capsys)
+
+
+def test_inventory_streams_sync_scanned_entities(mock_server, capsys):
+    """A full sync scans every workspace once, and a following incremental sync scans none."""
+    config = dict(get_mock_config(mock_server.base_url, days=1), incremental_inventory=True)
+    messages = sync_messages(config, capsys)
+    records = {}
+    for message in messages:
+        if message["type"] == "RECORD":
+            records.setdefault(message["stream"], []).append(message["record"])
+    assert sorted(record["id"] for record in records["Workspaces"]) == WORKSPACES
+    for stream_name in ["Datasets", "Reports", "Dashboards", "Dataflows"]:
+        assert sorted(record["workspaceId"] for record in records[stream_name]) == WORKSPACES
+    assert mock_server.stats["scan_requests"] == 1
+
+    state = [message["value"] for message in messages if message["type"] == "STATE"][-1]
+    assert state["bookmarks"]["Workspaces"]["workspaceIds"] == WORKSPACES
+    assert "workspaces" not in state["bookmarks"]["Workspaces"]
+    messages = sync_messages(config, capsys, state=state)
+    assert mock_server.stats["scan_requests"] == 1
+    assert not [message for message in messages if message["type"] == "RECORD" and message["stream"] != "ActivityEvents"]
+
+
+def test_stream_which_has_not_emitted_a_scan_gets_a_full_scan(mock_server, capsys):
+    """Each inventory stream keeps its own scan cursor, so a stream missing from an earlier run gets every workspace."""
+    config = dict(get_mock_config(mock_server.base_url, days=1), incremental_inventory=True)
+    messages = sync_messages(config, capsys, stream_names=["Workspaces"])
+    state = [message["value"] for message in messages if message["type"] == "STATE"][-1]
+    assert "Datasets" not in state["bookmarks"]
+    messages = sync_messages(config, capsys, state=state)
+    assert mock_server.stats["scan_requests"] == 2
+    datasets = [message["record"] for message in messages if message["type"] == "RECORD" and message["stream"] == "Datasets"]
+    assert sorted(dataset["workspaceId"] for dataset in datasets) == WORKSPACES
+
+
+def test_inventory_streams_are_opt_in(mock_server, capsys):
+    """Without a catalog only the activity log is synced, and discovery deselects the inventory streams."""
+    config = get_mock_config(mock_server.base_url, days=1)
+    tap = TapPowerBIMetadata(config=config)
+    selected = {
+        stream["tap_stream_id"]: metadata["metadata"].get("selected", True)
+        for stream in tap.catalog_dict["streams"]
+        for metadata in stream["metadata"]
+        if not metadata["breadcrumb"]
+    }
+    assert selected == {
+        "ActivityEvents": True,
+        "Workspaces": False,
+        "Datasets": False,
+        "Reports": False,
+        "Dashboards": False,
+        "Dataflows": False,
+    }
+    tap.sync_all()
+    capsys.readouterr()
+    assert mock_server.stats["scan_requests"] == 0
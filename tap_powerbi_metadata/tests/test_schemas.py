@@ -0,0 +1,17 @@
+"""Tests for the packaged stream schema files."""
+
+import pytest
+
+from tap_powerbi_metadata.schema_definitions import SCHEMAS
+from tap_powerbi_metadata.schemas import load_schema
+from tap_powerbi_metadata.tap import STREAM_TYPES
+
+
+@pytest.mark.parametrize("stream_name", sorted(SCHEMAS))
+def test_schema_files_match_definitions(stream_name):
+    """The JSON files are up to date; regenerate with `python -m tap_powerbi_metadata.schema_definitions`."""
+    assert load_schema(stream_name) == SCHEMAS[stream_name].to_dict()
+
+
+def test_every_stream_has_a_schema_definition():
+    assert sorted(stream_class.name for stream_class in STREAM_TYPES) == sorted(SCHEMAS)
@@ -0,0 +1,86 @@
+"""Tests for the shared rate controller."""
+
+import time
+from email.utils import formatdate
+
+from tap_powerbi_metadata.throttling import RateController, parse_retry_after
+
+
+def test_parse_retry_after():
+    """Retry-After may be given in seconds, as an HTTP date, or omitted."""
+    assert parse_retry_after({"Retry-After": "12"}) == 12.0
+    assert 28 < parse_retry_after({"Retry-After": formatdate(time.time() + 30, usegmt=True)}) <= 30
+    assert parse_retry_after({}) is None
+    assert parse_retry_after({"Retry-After": "not-a-date"}) is None
+
+
+def test_throttled_response_halves_concurrency_and_pauses():
+    """A 429 halves the concurrency limit and pauses for the Retry-After interval."""
+    controller = RateController(max_concurrency=8)
+    controller.acquire()
+    assert controller.release(429, {"Retry-After": "60"}) is True
+    assert controller.concurrency_limit == 4.0
+    assert controller.throttled_responses == 1
+    assert controller._try_acquire() > 59
+
+
+def test_successful_responses_grow_concurrency_additively():
+    """Successful responses grow the limit back towards the maximum, but never past it."""
+    controller = RateController(max_concurrency=4)
+    controller.concurrency_limit = 2.0
+    controller.acquire()
+    assert controller.release(200, {}) is False
+    assert controller.concurrency_limit == 2.5
+    for _ in range(20):
+        controller.acquire()
+        controller.release(200, {})
+    assert controller.concurrency_limit == 4.0
+
+
+def test_token_bucket_limits_request_rate():
+    """Once the bucket is empty, callers are told to wait for the next token."""
+    controller = RateController(max_concurrency=1, max_requests_per_minute=60)
+    assert controller._try_acquire() == 0.0
+    controller.release(200, {})
+    assert 0 < controller._try_acquire() <= 1.0
+
+
+def test_throttling_without_retry_after_backs_off_exponentially():
+    """Consecutive throttled responses without Retry-After double the pause, until a request succeeds."""
+    controller = RateController(max_concurrency=1)
+    pauses = []
+    for _ in range(3):
+        controller.paused_until = 0.0
+        controller._try_acquire()
+        controller.release(429, {})
+        pauses.append(round(controller.paused_until - time.monotonic()))
+    assert pauses == [2, 4, 8]
+    controller.paused_until = 0.0
+    controller._try_acquire()
+    controller.release(200, {})
+    assert controller.consecutive_throttles == 0
+
+
+def test_only_throttle_pauses_count_as_throttled_time():
+    """Waiting for a free slot or a token bucket refill is not reported as throttling."""
+    controller = RateController(max_concurrency=1, max_requests_per_minute=60)
+    controller._try_acquire()
+    assert controller._try_acquire() > 0
+    assert controller.throttled_seconds == 0
+    controller.release(429, {"Retry-After": "5"})
+    controller._try_acquire()
+    assert 4 < controller.throttled_seconds <= 5
+
+
+def test_throttled_time_is_counted_once_per_pause():
+    """A pause is recorded once, however many callers wait for it, and overlapping pauses are not double counted."""
+    controller = RateController(max_concurrency=4)
+    for _ in range(3):
+        controller.acquire()
+    controller.release(429, {"Retry-After": "5"})
+    controller.release(429, {"Retry-After": "5"})
+    for _ in range(10):
+        assert controller._try_acquire() > 0
+    assert 4.9 < controller.throttled_seconds <= 5.1
+    controller.release(429, {"Retry-After": "8"})
+    assert 7.9 < controller.throttled_seconds <= 8.1
@@ -0,0 +1,62 @@
+"""Tests for how `ActivityEventsStream` plans its request windows."""
+
+from datetime import datetime, timedelta
+
+from tap_powerbi_metadata.tests.conftest import get_stream
+
+
+def test_day_is_not_split_without_a_volume_estimate():
+    stream = get_stream(window_target_events=1000)
+    day_start = datetime(2021, 3, 1)
+    assert stream.split_day_window(None, day_start, day_start + timedelta(days=1)) == [(day_start, day_start + timedelta(days=1))]
+
+
+def test_day_is_split_into_contiguous_second_aligned_windows():
+    """Windows cover the day without gaps, even when it starts at a bookmark with microseconds."""
+    stream = get_stream(window_target_events=1000)
+    stream.get_stream_or_partition_state(None)["eventsPerHour"] = 1000
+    day_start, day_end = datetime(2021, 3, 1, 5, 30, 0, 123456), datetime(2021, 3, 2)
+    windows = stream.split_day_window(None, day_start, day_end)
+    assert len(windows) == 19
+    assert windows[0][0] == day_start.replace(microsecond=0)
+    assert windows[-1][1] == day_end
+    assert all(previous[1] == window[0] for previous, window in zip(windows, windows[1:]))
+    assert all(start.microsecond == 0 and end.microsecond == 0 for start, end in windows)
+
+
+def test_split_respects_the_minimum_window_length():
+    stream = get_stream(window_target_events=10, min_window_minutes=240)
+    stream.get_stream_or_partition_state(None)["eventsPerHour"] = 1000
+    windows = stream.split_day_window(None, datetime(2021, 3, 1), datetime(2021, 3, 2))
+    assert len(windows) == 6
+    assert all(end - start == timedelta(hours=4) for start, end in windows)
+
+
+def test_request_windows_never_cross_midnight():
+    stream = get_stream(start_date="2021-03-01T18:00:00Z")
+    windows = list(stream.get_request_windows(None, datetime(2021, 3, 1, 18), datetime(2021, 3, 3, 6)))
+    assert windows == [
+        (datetime(2021, 3, 1, 18), datetime(2021, 3, 2)),
+        (datetime(2021, 3, 2), datetime(2021, 3, 3)),
+        (datetime(2021, 3, 3), datetime(2021, 3, 3, 6)),
+    ]
+
+
+def test_split_boundaries_stay_put_as_the_estimate_drifts():
+    """Boundaries fall on a grid from midnight, so nearby estimates give the same windows from the same hour."""
+    stream = get_stream(window_target_events=1000)
+    day_start, day_end = datetime(2021, 3, 1, 13, 20), datetime(2021, 3, 2)
+    splits = []
+    for events_per_hour in (700, 900):
+        stream.get_stream_or_partition_state(None)["eventsPerHour"] = events_per_hour
+        splits.append(stream.split_day_window(None, day_start, day_end))
+    assert splits[0] == splits[1]
+    assert splits[0][0] == (day_start, datetime(2021, 3, 1, 14))
+    assert all(end - start == timedelta(hours=2) for start, end in splits[0][1:])
+
+
+def test_lookback_start_is_floored_to_the_hour():
+    stream = get_stream(start_date="2021-03-01T00:00:00Z", lookback_hours=6)
+    lookback_start = stream.get_lookback_start()
+    assert lookback_start.minute == lookback_start.second == lookback_start.microsecond == 0
+    assert timedelta(hours=6) <= datetime.utcnow() - lookback_start < timedelta(hours=7)
@@ -0,0 +1,119 @@
+"""Throttling-aware rate control for tap-powerbi-metadata."""
+
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Mapping, Optional
+
+# Status codes which indicate the API is throttling us, rather than failing.
+THROTTLED_STATUS_CODES = (429, 503)
+# Without a `Retry-After` header, throttled responses back off exponentially from the base pause up to the cap.
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+# How often to re-check for a free concurrency slot.
+SLOT_POLL_SECONDS = 0.05
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Return the number of seconds requested by a `Retry-After` header, given in seconds or as an HTTP date."""
+    retry_after = headers.get("Retry-After")
+    if not retry_after:
+        return None
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateController:
+    """Shared request budget combining a token bucket with an AIMD concurrency limit.
+
+    Every request the tap makes first calls `acquire` (or `acquire_async`) and then `release`
+    with the response status and headers. A throttled response pauses all requests for the
+    `Retry-After` interval (or an exponential backoff, if the response does not say) and halves the
+    concurrency limit; each successful response grows the limit additively back towards
+    `max_concurrency`. Time spent paused by throttling is recorded so it can be reported at the end
+    of the sync; waits for a free slot or for the token bucket to refill are not throttling.
+    """
+
+    def __init__(self, max_concurrency: int, max_requests_per_minute: Optional[float] = None) -> None:
+        self.max_concurrency = max(max_concurrency, 1)
+        self.concurrency_limit = float(self.max_concurrency)
+        self.refill_rate = max_requests_per_minute / 60 if max_requests_per_minute else None
+        self.bucket_capacity = float(self.max_concurrency)
+        self.tokens = self.bucket_capacity
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.throttled_responses = 0
+        self.throttled_seconds = 0.0
+        self.consecutive_throttles = 0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if self.refill_rate:
+            self.tokens = min(self.bucket_capacity, self.tokens + (now - self._last_refill) * self.refill_rate)
+        self._last_refill = now
+
+    def _try_acquire(self) -> float:
+        """Take a request slot and return 0, or return how long to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.concurrency_limit):
+                return SLOT_POLL_SECONDS
+            self._refill(now)
+            if self.refill_rate and self.tokens < 1:
+                return (1 - self.tokens) / self.refill_rate
+            if self.refill_rate:
+                self.tokens -= 1
+            self.in_flight += 1
+            return 0.0
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        wait = self._try_acquire()
+        while wait:
+            time.sleep(wait)
+            wait = self._try_acquire()
+
+    async def acquire_async(self) -> None:
+        """Wait, without blocking the event loop, until a request may be sent."""
+        wait = self._try_acquire()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._try_acquire()
+
+    def release(self, status_code: Optional[int] = None, headers: Optional[Mapping[str, str]] = None) -> bool:
+        """Return a request slot, adjusting the budget from the response.
+
+        Returns True if the response was throttled and the request should be retried.
+        """
+        retry_after = parse_retry_after(headers or {})
+        with self._lock:
+            self.in_flight -= 1
+            if status_code in THROTTLED_STATUS_CODES:
+                self.throttled_responses += 1
+                self.consecutive_throttles += 1
+                self.concurrency_limit = max(self.concurrency_limit / 2, 1.0)
+                self.tokens = 0.0
+                if retry_after is None:
+                    retry_after = min(BACKOFF_BASE_SECONDS * 2 ** (self.consecutive_throttles - 1), BACKOFF_MAX_SECONDS)
+                # Record each pause once, however many callers wait it out; overlapping pauses count once.
+                now = time.monotonic()
+                paused_until = max(self.paused_until, now + retry_after)
+                self.throttled_seconds += paused_until - max(self.paused_until, now)
+                self.paused_until = paused_until
+                return True
+            if status_code is not None and status_code < 400:
+                self.consecutive_throttles = 0
+                self.concurrency_limit = min(
+                    self.concurrency_limit + 1 / self.concurrency_limit, float(self.max_concurrency)
+                )
+            return False